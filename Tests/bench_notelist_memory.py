@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+"""
+Memory benchmark: legacy list-of-lists notes listing vs NoteList.
+
+Run from the package root, outside Sublime Text:
+
+    python Tests/bench_notelist_memory.py [number of notes]
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+from array import array
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+from notelist import NoteList
+
+ROOT = os.path.expanduser("~/Dropbox/Notes")
+FOLDERS = 500
+
+
+def synthetic_notes(count):
+    now = int(time.time())
+    for i in range(count):
+        yield "folder%03d" % (i % FOLDERS), "note number %d.md" % i, now - i * 37
+
+
+def legacy_listing(count):
+    # what find_notes + setup_notes_list used to build
+    note_files = []
+    for folder, name, mtime in synthetic_notes(count):
+        tag = folder + ': '
+        title = os.path.splitext(name)[0]
+        modified_str = time.strftime("Last modified: %d/%m/%Y %H:%M", time.gmtime(mtime))
+        note_files.append([tag + title, os.path.join(ROOT, folder, name), tag, modified_str])
+    rlist = [[item[i] for i in [0]] for item in note_files]
+    return note_files, rlist
+
+
+def notelist_listing(count):
+    dirs, dir_ids, names, mtimes = [], array('I'), [], array('d')
+    dir_index = {}
+    for folder, name, mtime in synthetic_notes(count):
+        if folder not in dir_index:
+            dir_index[folder] = len(dirs)
+            dirs.append(folder)
+        dir_ids.append(dir_index[folder])
+        names.append(name)
+        mtimes.append(mtime)
+    file_list = NoteList.sorted(ROOT, dirs, dir_ids, names, mtimes)
+    return file_list, file_list.captions([0])
+
+
+def measure(build, count):
+    tracemalloc.start()
+    result = build(count)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current, peak
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    print("%d notes in %d folders" % (count, FOLDERS))
+    for label, build in (("list of lists", legacy_listing), ("NoteList", notelist_listing)):
+        current, peak = measure(build, count)
+        print("%-14s retained %7.1f MB   peak %7.1f MB" % (label, current / 1e6, peak / 1e6))
+
+
+if __name__ == '__main__':
+    main()
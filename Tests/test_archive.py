@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tests of the archive policies. The policies are evaluated by the plugin
+modules, which talk to the editor through the `sublime` and
+`sublime_plugin` modules that only exist inside Sublime Text, so the tests
+load them next to a minimal stand-in of that API and run the policies
+against a temporary notes root. Run from the package root, outside
+Sublime Text:
+
+    python -m unittest discover Tests
+"""
+
+import os
+import sys
+import time
+import types
+import shutil
+import tempfile
+import importlib
+import unittest
+
+PACKAGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+DAY = 86400
+
+
+class Settings(object):
+
+    def __init__(self, values):
+        self.values = values
+
+    def get(self, key, default=None):
+        return self.values.get(key, default)
+
+    def add_on_change(self, key, callback):
+        pass
+
+    def clear_on_change(self, key):
+        pass
+
+
+class Window(object):
+
+    def id(self):
+        return 1
+
+    def active_view(self):
+        return None
+
+
+class Command(object):
+
+    def __init__(self, window=None):
+        self.window = window
+
+
+def load_plugin(name, settings, calls):
+    sublime = types.ModuleType('sublime')
+    sublime.version = lambda: '4000'
+    sublime.load_settings = lambda name: settings
+    sublime.active_window = lambda: None
+    sublime.set_timeout = lambda callback, delay=0: calls.append(callback)
+    sublime.set_timeout_async = sublime.set_timeout
+    sublime.status_message = lambda message: calls.append(message)
+    sublime.error_message = lambda message: calls.append(message)
+    sublime_plugin = types.ModuleType('sublime_plugin')
+    for base in ('ApplicationCommand', 'WindowCommand', 'TextCommand', 'EventListener', 'ViewEventListener'):
+        setattr(sublime_plugin, base, type(base, (Command,), {}))
+    package = types.ModuleType('plainnotes')
+    package.__path__ = [PACKAGE_DIR]
+    sys.modules.update({'sublime': sublime, 'sublime_plugin': sublime_plugin, 'plainnotes': package})
+    return importlib.import_module('plainnotes.' + name)
+
+
+class ArchivePoliciesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.settings = Settings({
+            "root": self.root,
+            "archive_dir": "Archive",
+            "note_file_extensions": ["md"],
+        })
+        self.saved_modules = dict((name, sys.modules.get(name)) for name in ('sublime', 'sublime_plugin', 'plainnotes'))
+        self.calls = []
+        self.notes_archive = load_plugin('notes_archive', self.settings, self.calls)
+        notes = sys.modules['plainnotes.notes']
+        notes.catalogs, notes.metadata_caches, notes.watcher = {}, {}, None
+        sys.modules['plainnotes.notes_tags'].tag_indexes = {}
+        now = time.time()
+        self.write(os.path.join('Inbox', 'old.md'), now - 60 * DAY)
+        self.write(os.path.join('Inbox', 'new.md'), now - DAY)
+        self.write('done.md', now - DAY, u'---\ntags: [done]\n---\n')
+        self.write('old done.md', now - 90 * DAY, u'---\ntags: done\n---\n')
+        self.write(os.path.join('Archive', 'Inbox', 'archived.md'), now - 90 * DAY)
+
+    def tearDown(self):
+        for name, module in self.saved_modules.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+        for name in [name for name in sys.modules if name.startswith('plainnotes.')]:
+            del sys.modules[name]
+        shutil.rmtree(self.root)
+
+    def write(self, relpath, mtime, text=u''):
+        path = os.path.join(self.root, relpath)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as f:
+            f.write(text)
+        os.utime(path, (mtime, mtime))
+
+    def candidates(self, policies):
+        return [(policy, sorted(relpaths)) for policy, relpaths
+                in self.notes_archive.archive_candidates(self.root, policies)]
+
+    def test_policies_select_active_notes(self):
+        old_inbox = {"name": "Old inbox", "query": "folder:Inbox modified:>30d"}
+        self.assertEqual(self.candidates([old_inbox, "tag:done"]), [
+            (old_inbox, [os.path.join('Inbox', 'old.md')]),
+            ("tag:done", ['done.md', 'old done.md']),
+        ])
+
+    def test_notes_are_listed_under_the_first_matching_policy(self):
+        self.assertEqual(self.candidates(["modified:>30d", "tag:done", "", {"name": "empty"}]), [
+            ("modified:>30d", [os.path.join('Inbox', 'old.md'), 'old done.md']),
+            ("tag:done", ['done.md']),
+        ])
+
+    def test_archived_notes_are_never_selected(self):
+        self.assertEqual(self.candidates(["archived:yes", "archived:any folder:Inbox"]), [
+            ("archived:yes", []),
+            ("archived:any folder:Inbox", [os.path.join('Inbox', 'new.md'), os.path.join('Inbox', 'old.md')]),
+        ])
+
+    def test_plan_moves_notes_into_the_archive(self):
+        command = self.notes_archive.NotesAutoArchiveCommand(Window())
+        command.root = self.root
+        command.plan(["folder:Inbox modified:>30d"])
+        self.assertEqual(command.moves, [[os.path.join(self.root, 'Inbox', 'old.md'),
+                                          os.path.join(self.root, 'Archive', 'Inbox', 'old.md')]])
+        # nothing moves before the dry run is confirmed
+        self.assertEqual(len(self.calls), 1)
+        self.assertTrue(os.path.isfile(os.path.join(self.root, 'Inbox', 'old.md')))
+
+    def test_invalid_policy(self):
+        command = self.notes_archive.NotesAutoArchiveCommand(Window())
+        command.root = self.root
+        command.plan(["color:red"])
+        self.assertEqual(len(self.calls), 1)
+        self.assertTrue(self.calls[0].startswith("Invalid archive policy"))
+
+
+if __name__ == '__main__':
+    unittest.main()
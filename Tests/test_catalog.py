@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tests of the incremental note catalog. Run from the package root, outside
+Sublime Text:
+
+    python -m unittest discover Tests
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from lib.catalog import NoteCatalog, load_snapshot, save_snapshot
+
+
+class NoteCatalogTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.root = os.path.join(self.dir, 'notes')
+        self.path = os.path.join(self.dir, 'catalog.json')
+        self.clock = 1000000
+        for relpath in ('a.md', 'b.txt', 'skip.png', os.path.join('sub', 'c.md'),
+                        os.path.join('.brain', 'd.md'), os.path.join('Archive', 'e.md')):
+            self.write(relpath)
+        self.catalog = self.new_catalog()
+        self.catalog.refresh()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def new_catalog(self, extensions=('md', 'txt')):
+        return NoteCatalog(self.root, self.path, extensions, ['.brain'], 'Archive')
+
+    def write(self, relpath, text='x'):
+        path = os.path.join(self.root, relpath)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as f:
+            f.write(text)
+        self.tick(path)
+        self.tick(os.path.dirname(path))
+        return path
+
+    def tick(self, path):
+        # distinct mtimes, whatever the timestamp resolution of the filesystem
+        self.clock += 10
+        os.utime(path, (self.clock, self.clock))
+
+    def relpaths(self, catalog=None):
+        return sorted(relpath for relpath, _, _ in (catalog or self.catalog).iter_notes())
+
+    def test_lists_notes_and_skips_excluded_dirs(self):
+        self.assertEqual(self.relpaths(), [os.path.join('Archive', 'e.md'), 'a.md', 'b.txt',
+                                           os.path.join('sub', 'c.md')])
+        self.assertEqual(sorted(relpath for relpath, _ in self.catalog.entries()),
+                         ['a.md', 'b.txt', os.path.join('sub', 'c.md')])
+        self.assertEqual([relpath for relpath, _ in self.catalog.entries(archived=True)],
+                         [os.path.join('Archive', 'e.md')])
+
+    def test_entries_are_most_recent_first(self):
+        self.write('b.txt')
+        self.catalog.touch(os.path.join(self.root, 'b.txt'))
+        mtimes = [mtime for _, mtime in self.catalog.entries()]
+        self.assertEqual(mtimes, sorted(mtimes, reverse=True))
+        self.assertEqual(self.catalog.entries().relpath(0), 'b.txt')
+
+    def test_refresh_lists_changed_dirs_only(self):
+        scanned = []
+        real_scan_dir = self.catalog._scan_dir
+
+        def scan_dir(reldir, absdir, mtime):
+            scanned.append(reldir)
+            return real_scan_dir(reldir, absdir, mtime)
+
+        self.catalog._scan_dir = scan_dir
+        self.catalog.refresh()
+        self.assertEqual(scanned, [])
+        self.write(os.path.join('sub', 'new.md'))
+        os.remove(os.path.join(self.root, 'a.md'))
+        self.tick(self.root)
+        self.catalog.refresh()
+        self.assertEqual(sorted(scanned), ['', 'sub'])
+        self.assertNotIn('a.md', self.relpaths())
+        self.assertIn(os.path.join('sub', 'new.md'), self.relpaths())
+
+    def test_removed_dirs_are_forgotten(self):
+        shutil.rmtree(os.path.join(self.root, 'sub'))
+        self.tick(self.root)
+        self.catalog.refresh()
+        self.assertNotIn('sub', self.catalog.dirs)
+        self.assertNotIn(os.path.join('sub', 'c.md'), self.relpaths())
+
+    def test_refresh_with_a_budget_resumes(self):
+        for i in range(5):
+            self.write(os.path.join('d{0}'.format(i), 'n.md'))
+        catalog = self.new_catalog()
+        passes = 1
+        while not catalog.refresh(budget=2):
+            passes += 1
+        self.assertEqual(passes, 4)
+        self.assertEqual(len(self.relpaths(catalog)), 9)
+
+    def test_rescan_reports_new_dirs(self):
+        self.write(os.path.join('new', 'deeper', 'n.md'))
+        self.assertEqual(sorted(self.catalog.rescan('')), ['new', os.path.join('new', 'deeper')])
+        self.assertIn(os.path.join('new', 'deeper', 'n.md'), self.relpaths())
+        shutil.rmtree(os.path.join(self.root, 'new'))
+        self.tick(self.root)
+        self.assertEqual(self.catalog.rescan(''), [])
+        self.assertNotIn(os.path.join('new', 'deeper'), self.catalog.dirs)
+
+    def test_touch_records_saves(self):
+        before = self.catalog.stat('a.md')
+        path = self.write('a.md', 'longer text')
+        self.assertEqual(self.catalog.stat('a.md'), before)
+        self.catalog.touch(path)
+        self.assertEqual(self.catalog.stat('a.md'), (self.clock - 10, len('longer text')))
+        self.assertTrue(self.catalog.dirty)
+        # unknown notes are left to the next refresh
+        self.catalog.touch(os.path.join(self.root, 'unknown.md'))
+        self.assertIsNone(self.catalog.stat('unknown.md'))
+
+    def test_add_remove_and_move_notify_listeners(self):
+        events = []
+        self.catalog.listeners.append(lambda relpath, added: events.append((relpath, added)))
+        new = self.write(os.path.join('fresh', 'n.md'))
+        self.catalog.add(new)
+        self.catalog.add(self.write('image.png'))
+        self.assertIn(os.path.join('fresh', 'n.md'), self.relpaths())
+        self.assertNotIn('image.png', self.relpaths())
+        moved = os.path.join(self.root, 'Archive', 'a.md')
+        os.rename(os.path.join(self.root, 'a.md'), moved)
+        self.catalog.move(os.path.join(self.root, 'a.md'), moved)
+        os.remove(os.path.join(self.root, 'b.txt'))
+        self.catalog.remove(os.path.join(self.root, 'b.txt'))
+        self.assertEqual(events, [(os.path.join('fresh', 'n.md'), True), ('a.md', False),
+                                  (os.path.join('Archive', 'a.md'), True), ('b.txt', False)])
+        self.assertEqual(sorted(relpath for relpath, _ in self.catalog.entries(archived=True)),
+                         [os.path.join('Archive', 'a.md'), os.path.join('Archive', 'e.md')])
+        # the folder made by `add` is listed by the next refresh
+        del events[:]
+        self.catalog.refresh()
+        self.assertEqual(events, [])
+        self.assertEqual(self.catalog.dirs['fresh'][0], os.stat(os.path.dirname(new)).st_mtime)
+
+    def test_save_and_load(self):
+        self.assertFalse(self.catalog.dirty)
+        loaded = self.new_catalog()
+        self.assertTrue(loaded.load())
+        self.assertEqual(self.relpaths(loaded), self.relpaths())
+        self.assertEqual(loaded.stat('a.md'), self.catalog.stat('a.md'))
+        # a catalog of other extensions starts over
+        self.assertFalse(self.new_catalog(extensions=('md',)).load())
+
+    def test_save_only_when_dirty(self):
+        os.remove(self.path)
+        self.catalog.save()
+        self.assertFalse(os.path.exists(self.path))
+        self.catalog.touch(self.write('a.md', 'changed'))
+        self.catalog.save()
+        self.assertTrue(os.path.exists(self.path))
+
+    def test_snapshot_round_trip(self):
+        path = os.path.join(self.dir, 'snapshot.json')
+        entries = self.catalog.entries()
+        save_snapshot(path, self.root, entries)
+        self.assertEqual(load_snapshot(path, self.root), entries)
+        self.assertIsNone(load_snapshot(path, os.path.join(self.dir, 'other')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tests of the shared settings snapshot. notes_config talks to the editor
+through the `sublime` module, which only exists inside Sublime Text, so
+the tests load it next to a minimal stand-in of the settings and window
+API. Run from the package root, outside Sublime Text:
+
+    python -m unittest discover Tests
+"""
+
+import os
+import sys
+import types
+import importlib
+import unittest
+
+PACKAGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+class Settings(object):
+
+    def __init__(self, values):
+        self.values = values
+        self.callbacks = {}
+
+    def get(self, key, default=None):
+        return self.values.get(key, default)
+
+    def set(self, key, value):
+        self.values[key] = value
+        for callback in list(self.callbacks.values()):
+            callback()
+
+    def add_on_change(self, key, callback):
+        self.callbacks[key] = callback
+
+    def clear_on_change(self, key):
+        self.callbacks.pop(key, None)
+
+
+class View(object):
+
+    def __init__(self, project_settings):
+        self.project_settings = Settings({'PlainNotes': project_settings})
+
+    def settings(self):
+        return self.project_settings
+
+
+class Window(object):
+
+    def __init__(self, window_id, project_settings=None):
+        self.window_id = window_id
+        self.view = View(project_settings)
+
+    def id(self):
+        return self.window_id
+
+    def active_view(self):
+        return self.view
+
+
+def load_notes_config(settings):
+    sublime = types.ModuleType('sublime')
+    sublime.load_settings = lambda name: settings
+    sublime.active_window = lambda: None
+    sys.modules['sublime'] = sublime
+    package = types.ModuleType('plainnotes')
+    package.__path__ = [PACKAGE_DIR]
+    sys.modules['plainnotes'] = package
+    sys.modules.pop('plainnotes.notes_config', None)
+    return importlib.import_module('plainnotes.notes_config')
+
+
+class ConfigTest(unittest.TestCase):
+
+    def setUp(self):
+        self.settings = Settings({
+            "root": "~/Notes/",
+            "roots": ["~/Notes", "/srv/work//notes"],
+            "archive_dir": "Archive",
+            "note_file_extensions": ["md", "txt"],
+            "list_options": {"display_folder": True},
+            "watcher": {"poll_interval": 10},
+        })
+        self.saved_modules = dict((name, sys.modules.get(name)) for name in ('sublime', 'plainnotes'))
+        self.notes_config = load_notes_config(self.settings)
+
+    def tearDown(self):
+        self.notes_config.plugin_unloaded()
+        for name, module in self.saved_modules.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+        for name in [name for name in sys.modules if name.startswith('plainnotes.')]:
+            del sys.modules[name]
+
+    def test_snapshot(self):
+        config = self.notes_config.config()
+        self.assertIs(self.notes_config.config(), config)
+        notes = os.path.normpath(os.path.expanduser('~/Notes'))
+        self.assertEqual(config.root, notes)
+        self.assertEqual(config.roots, (notes, os.path.normpath('/srv/work/notes')))
+        self.assertEqual(config.brain_dir, '.brain')
+        self.assertEqual(config.exclude, frozenset(['.brain']))
+        self.assertTrue(config.is_note('a.txt'))
+        self.assertFalse(config.is_note('a.png'))
+        self.assertEqual(config.list_options, self.notes_config.ListOptions(False, True, False, False))
+        self.assertEqual(config.watcher, self.notes_config.WATCHER_DEFAULTS._replace(poll_interval=10))
+        self.assertEqual(config.worker_threads, 8)
+        self.assertIsNone(config.export_dir)
+
+    def test_settings_change_rebuilds_the_snapshot(self):
+        calls = []
+        self.notes_config.on_config_change('a', lambda: calls.append('first'))
+        self.notes_config.on_config_change('a', lambda: calls.append('replaced'))
+        self.notes_config.on_config_change('b', lambda: calls.append('b'))
+        config = self.notes_config.config()
+        self.settings.set("jotter_dir", ".jotter")
+        self.assertEqual(sorted(calls), ['b', 'replaced'])
+        self.assertEqual(self.notes_config.brain_dir(), '.jotter')
+        self.assertIsNot(self.notes_config.config(), config)
+
+    def test_roots_per_window(self):
+        plain, project = Window(1), Window(2, {'roots': ['/srv/project']})
+        roots = self.notes_config.config().roots
+        self.assertEqual(self.notes_config.get_roots(plain), roots)
+        self.assertEqual(self.notes_config.get_roots(project), (roots[0], os.path.normpath('/srv/project')))
+        self.assertEqual(self.notes_config.get_root(project), roots[0])
+        root_of = self.notes_config.root_index.root_of
+        self.assertEqual(root_of(os.path.join(os.path.normpath('/srv/project'), 'a.md')),
+                         os.path.normpath('/srv/project'))
+        # cached until the window's project or the settings change
+        project.view.project_settings.values['PlainNotes'] = {'root': '/srv/other'}
+        self.assertEqual(self.notes_config.get_root(project), roots[0])
+        self.notes_config.forget_window(project)
+        self.assertEqual(self.notes_config.get_roots(project), (os.path.normpath('/srv/other'),) + roots)
+        self.settings.set("roots", [])
+        self.assertEqual(self.notes_config.window_roots, {})
+        self.assertIsNone(root_of(os.path.join(os.path.normpath('/srv/project'), 'a.md')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tests of the near-duplicate detection. Run from the package root, outside
+Sublime Text:
+
+    python -m unittest discover Tests
+"""
+
+import os
+import sys
+import random
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from lib import duplicates
+from lib.duplicates import Fingerprints, NUM_HASHES, clusters, signature, similarity
+
+
+def words(seed, count=200):
+    rand = random.Random(seed)
+    return [u'w{0}'.format(rand.randrange(5000)) for _ in range(count)]
+
+
+def edited(text_words, *positions):
+    text_words = list(text_words)
+    for i in positions:
+        text_words[i] = u'changed'
+    return u' '.join(text_words)
+
+
+class SignatureTest(unittest.TestCase):
+
+    def test_signatures(self):
+        base = words(1)
+        sig = signature(u' '.join(base))
+        self.assertEqual(len(sig), NUM_HASHES)
+        self.assertEqual(signature(u' '.join(base)), sig)
+        self.assertIsNone(signature(u''))
+        self.assertIsNotNone(signature(u'two words'))
+
+    def test_similarity_estimates_overlap(self):
+        base = words(1)
+        sig = signature(u' '.join(base))
+        self.assertEqual(similarity(sig, sig), 1.0)
+        self.assertGreater(similarity(sig, signature(edited(base, 100))), 0.8)
+        self.assertLess(similarity(sig, signature(u' '.join(words(2)))), 0.2)
+
+
+class ClustersTest(unittest.TestCase):
+
+    def test_groups_near_duplicates(self):
+        base, other = words(1), words(2)
+        signatures = {
+            'a.md': signature(u' '.join(base)),
+            'b.md': signature(edited(base, 50)),
+            'c.md': signature(edited(base, 50, 150)),
+            'd.md': signature(u' '.join(other)),
+            'e.md': signature(u' '.join(other)),
+            'f.md': signature(u' '.join(words(3))),
+        }
+        found = sorted(clusters(signatures), key=lambda cluster: cluster[1])
+        self.assertEqual([relpaths for _, relpaths in found], [['a.md', 'b.md', 'c.md'], ['d.md', 'e.md']])
+        self.assertGreater(found[0][0], 0.8)
+        self.assertEqual(found[1][0], 1.0)
+
+    def test_threshold(self):
+        base = words(1)
+        signatures = {'a.md': signature(u' '.join(base)),
+                      'b.md': signature(edited(base, *range(0, 200, 10)))}
+        self.assertEqual(clusters(signatures, threshold=1.0), [])
+        self.assertEqual(clusters({}), [])
+
+
+class FingerprintsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.path = os.path.join(self.root, 'fingerprints.json')
+        self.notes = {}
+        self.write('a.md', u' '.join(words(1)))
+        self.write('b.md', u'')
+        self.fingerprints = Fingerprints(self.root, self.path).sync(self.listing())
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write(self, relpath, text):
+        with open(os.path.join(self.root, relpath), 'w') as f:
+            f.write(text)
+        self.notes[relpath] = self.notes.get(relpath, 0) + 1
+
+    def listing(self):
+        return [(relpath, mtime, 0) for relpath, mtime in self.notes.items()]
+
+    def test_notes_without_words_are_left_out(self):
+        self.assertEqual(sorted(self.fingerprints.notes), ['a.md', 'b.md'])
+        self.assertEqual(list(self.fingerprints.signatures()), ['a.md'])
+        self.assertEqual(self.fingerprints.signatures(lambda relpath: relpath != 'a.md'), {})
+
+    def test_sync_reads_changed_notes_only(self):
+        read = []
+        real_read_note = duplicates.read_note
+        duplicates.read_note = lambda path: read.append(os.path.basename(path)) or real_read_note(path)
+        try:
+            self.fingerprints.sync(self.listing())
+            self.assertEqual(read, [])
+            self.write('b.md', u'now with words')
+            del self.notes['a.md']
+            self.fingerprints.sync(self.listing())
+        finally:
+            duplicates.read_note = real_read_note
+        self.assertEqual(read, ['b.md'])
+        self.assertEqual(list(self.fingerprints.signatures()), ['b.md'])
+
+    def test_save_and_load(self):
+        self.fingerprints.save()
+        self.assertFalse(self.fingerprints.dirty)
+        loaded = Fingerprints(self.root, self.path)
+        self.assertTrue(loaded.load())
+        self.assertEqual(loaded.signatures(), self.fingerprints.signatures())
+        self.assertFalse(Fingerprints(self.root + 'x', self.path).load())
+
+
+if __name__ == '__main__':
+    unittest.main()
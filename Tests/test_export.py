@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tests of the markdown renderer and of the incremental HTML export. Run
+from the package root, outside Sublime Text:
+
+    python -m unittest discover Tests
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from lib.export import HtmlExport, render
+
+
+class RenderTest(unittest.TestCase):
+
+    def test_headings_paragraphs_and_rules(self):
+        self.assertEqual(render(u'# Title :work:\nsome *text*\nmore\n\n---\n'),
+                         u'<h1>Title</h1>\n<p>some <em>text</em><br>\nmore</p>\n<hr>')
+
+    def test_front_matter_is_skipped(self):
+        self.assertEqual(render(u'---\ntitle: x\n---\nbody\n'), u'<p>body</p>')
+
+    def test_nested_lists_and_tasks(self):
+        html = render(u'- a\n  1. b\n✔ done\n')
+        self.assertEqual(html, u'<ul>\n<li>a\n<ol>\n<li>b\n</li></ol>\n</li>\n'
+                               u'<li class="task done">✔ done\n</li></ul>')
+
+    def test_blank_line_closes_a_list(self):
+        self.assertEqual(render(u'- a\n\nafter\n'), u'<ul>\n<li>a\n</li></ul>\n<p>after</p>')
+        self.assertEqual(render(u'- a\n\n# h\n'), u'<ul>\n<li>a\n</li></ul>\n<h1>h</h1>')
+        self.assertEqual(render(u'- a\n\n'), u'<ul>\n<li>a\n</li></ul>')
+
+    def test_indented_line_after_blank_continues_the_list(self):
+        self.assertEqual(render(u'- a\n\n  more\n- b\n'),
+                         u'<ul>\n<li>a\n<br>more\n</li>\n<li>b\n</li></ul>')
+        self.assertEqual(render(u'- a\n\n  - b\n'),
+                         u'<ul>\n<li>a\n<ul>\n<li>b\n</li></ul>\n</li></ul>')
+
+    def test_fenced_code_and_quotes(self):
+        self.assertEqual(render(u'```py\nx = "<a>"\n```\n> quoted\n'),
+                         u'<pre><code class="language-py">x = "&lt;a&gt;"</code></pre>\n'
+                         u'<blockquote>quoted</blockquote>')
+
+    def test_links_images_and_code_spans(self):
+        rewrite = lambda kind, target: kind + ':' + target
+        self.assertEqual(render(u'[a *b*](x.md) ![i](p.png) `[c](y.md)`', rewrite),
+                         u'<p><a href="link:x.md">a <em>b</em></a> <img src="image:p.png" alt="i"> '
+                         u'<code>[c](y.md)</code></p>')
+
+
+class HtmlExportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.out = os.path.join(self.root, 'out')
+        self.note = os.path.join(self.root, 'a.md')
+        with open(self.note, 'w') as f:
+            f.write('# A\n![p](p.png)\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def run_export(self):
+        exporter = HtmlExport(self.root, self.out, os.path.join(self.root, 'export.json'), ['md'], workers=2)
+        exporter.load()
+        st = os.stat(self.note)
+        result = exporter.run([('a.md', st.st_mtime, st.st_size)])
+        exporter.save()
+        return result
+
+    def test_unchanged_notes_are_skipped(self):
+        self.assertEqual(self.run_export(), (['a.md'], [], []))
+        self.assertEqual(self.run_export(), ([], ['a.md'], []))
+
+    def test_image_added_later(self):
+        self.run_export()
+        with open(os.path.join(self.root, 'p.png'), 'wb') as f:
+            f.write(b'png')
+        self.assertEqual(self.run_export(), (['a.md'], [], []))
+        self.assertTrue(os.path.isfile(os.path.join(self.out, 'p.png')))
+
+    def test_deleted_page_is_rewritten(self):
+        self.run_export()
+        os.remove(os.path.join(self.out, 'a.html'))
+        self.assertEqual(self.run_export(), (['a.md'], [], []))
+        self.assertTrue(os.path.isfile(os.path.join(self.out, 'a.html')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tests of the front matter parser and cache. Run from the package root,
+outside Sublime Text:
+
+    python -m unittest discover Tests
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from lib.frontmatter import MetadataCache, parse_front_matter, tags_of
+
+
+class ParseFrontMatterTest(unittest.TestCase):
+
+    def test_scalars_and_lists(self):
+        text = (u'---\n'
+                u'Title: "My note"\n'
+                u'tags: [work, \'urgent\']\n'
+                u'aliases:\n'
+                u'  - first\n'
+                u'  - second\n'
+                u'# a comment\n'
+                u'date: 2024-01-31 10:00\n'
+                u'---\n'
+                u'# My note\n')
+        self.assertEqual(parse_front_matter(text), {
+            'title': 'My note',
+            'tags': ['work', 'urgent'],
+            'aliases': ['first', 'second'],
+            'date': '2024-01-31 10:00',
+        })
+
+    def test_dots_close_the_header(self):
+        self.assertEqual(parse_front_matter(u'---\ntitle: x\n...\nbody: no\n'), {'title': 'x'})
+
+    def test_no_front_matter(self):
+        self.assertEqual(parse_front_matter(u''), {})
+        self.assertEqual(parse_front_matter(u'# title\n---\ntitle: x\n---\n'), {})
+        # never closed: a horizontal rule, not a header
+        self.assertEqual(parse_front_matter(u'---\ntitle: x\nmore text\n'), {})
+
+    def test_tags_of(self):
+        self.assertEqual(tags_of({'tags': ['#a', ' b ', '']}), ['a', 'b'])
+        self.assertEqual(tags_of({'tags': 'a, #b c'}), ['a', 'b', 'c'])
+        self.assertEqual(tags_of({}), [])
+
+
+class MetadataCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.note = os.path.join(self.root, 'a.md')
+        self.write(u'---\ntitle: one\n---\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write(self, text):
+        with open(self.note, 'w') as f:
+            f.write(text)
+
+    def test_cached_by_mtime(self):
+        cache = MetadataCache(self.root, os.path.join(self.root, 'metadata.json'))
+        self.assertEqual(cache.get('a.md', 1.5)['title'], 'one')
+        self.write(u'---\ntitle: two\n---\n')
+        # same mtime: not read again
+        self.assertEqual(cache.get('a.md', 1.5)['title'], 'one')
+        self.assertEqual(cache.get('a.md', 1.75)['title'], 'two')
+
+    def test_save_load_and_prune(self):
+        path = os.path.join(self.root, 'metadata.json')
+        cache = MetadataCache(self.root, path)
+        cache.get('a.md', 1.5)
+        cache.get('gone.md', 2.0)
+        cache.prune(['a.md'])
+        cache.save()
+        loaded = MetadataCache(self.root, path)
+        self.assertTrue(loaded.load())
+        self.assertEqual(sorted(loaded.entries), ['a.md'])
+        self.assertFalse(MetadataCache(self.root + 'x', path).load())
+
+
+if __name__ == '__main__':
+    unittest.main()
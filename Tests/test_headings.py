@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tests of the heading parser and of the heading index. Run from the
+package root, outside Sublime Text:
+
+    python -m unittest discover Tests
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from lib.headings import HeadingIndex, parse_headings
+
+
+class ParseHeadingsTest(unittest.TestCase):
+
+    def test_levels_and_cleanup(self):
+        text = u'# Title ##\n\n### Plans :work:urgent: \n#hashtag\n####### too deep\n#\n###### Six\n'
+        self.assertEqual(parse_headings(text), [[1, u'Title', 1], [3, u'Plans', 3], [6, u'Six', 7]])
+
+    def test_front_matter_is_skipped(self):
+        self.assertEqual(parse_headings(u'---\n# not a heading\n---\n# Body\n'), [[1, u'Body', 4]])
+        self.assertEqual(parse_headings(u'---\ntitle: x\n...\n## Body\n'), [[2, u'Body', 4]])
+
+    def test_fenced_code_is_skipped(self):
+        text = u'# A\n```sh\n# comment\n~~~\n# still code\n```\n# B\n~~~~\n```\n# code\n~~~~\n# C\n'
+        self.assertEqual(parse_headings(text), [[1, u'A', 1], [1, u'B', 7], [1, u'C', 12]])
+
+
+class HeadingIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.path = os.path.join(self.root, 'headings.json')
+        self.notes = {}
+        self.write('b.md', u'# B\n## B.1\n')
+        self.write('a.md', u'text\n# A\n')
+        self.index = HeadingIndex(self.root, self.path).sync(self.listing())
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write(self, relpath, text):
+        with open(os.path.join(self.root, relpath), 'w') as f:
+            f.write(text)
+        self.notes[relpath] = self.notes.get(relpath, 0) + 1
+
+    def listing(self):
+        return [(relpath, mtime, 0) for relpath, mtime in self.notes.items()]
+
+    def test_headings_by_note_and_line(self):
+        self.assertEqual(self.index.headings(), [('a.md', 1, u'A', 2), ('b.md', 1, u'B', 1), ('b.md', 2, u'B.1', 2)])
+        self.assertEqual(self.index.headings(lambda relpath: relpath == 'a.md'), [('a.md', 1, u'A', 2)])
+
+    def test_sync_reparses_changed_notes_only(self):
+        updated = []
+        update = self.index.update
+        self.index.update = lambda relpath, mtime, text=None: updated.append(relpath) or update(relpath, mtime, text)
+        self.index.sync(self.listing())
+        self.assertEqual(updated, [])
+        self.write('a.md', u'# New A\n')
+        del self.notes['b.md']
+        self.index.sync(self.listing())
+        self.assertEqual(updated, ['a.md'])
+        self.assertEqual(self.index.headings(), [('a.md', 1, u'New A', 1)])
+
+    def test_update_from_text_and_remove(self):
+        self.index.update('c.md', 1, u'# C\n')
+        self.assertIn(('c.md', 1, u'C', 1), self.index.headings())
+        self.index.remove('b.md')
+        self.assertEqual([h[0] for h in self.index.headings()], ['a.md', 'c.md'])
+
+    def test_save_and_load(self):
+        self.index.save()
+        self.assertFalse(self.index.dirty)
+        loaded = HeadingIndex(self.root, self.path)
+        self.assertTrue(loaded.load())
+        self.assertEqual(loaded.headings(), self.index.headings())
+        self.assertFalse(HeadingIndex(self.root + 'x', self.path).load())
+
+
+if __name__ == '__main__':
+    unittest.main()
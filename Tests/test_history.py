@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tests of the note version history. Run from the package root, outside
+Sublime Text:
+
+    python -m unittest discover Tests
+"""
+
+import os
+import sys
+import random
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from lib.history import MAX_DEPTH, SAVE_EVERY, NoteHistory, content_id
+
+
+WORDS = [u'note', u'idée', u'todo', u'link', u'draft', u'meeting', u'plan', u'list']
+BODY = u' '.join(random.Random(0).sample(WORDS * 250, 2000))
+
+
+def version(i):
+    return u'{0}\nedit {1}\n'.format(BODY, i).encode('utf-8')
+
+
+class NoteHistoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.directory = os.path.join(self.dir, 'history')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def loaded(self):
+        history = NoteHistory(self.directory)
+        history.load()
+        return history
+
+    def test_versions_are_read_back(self):
+        history = self.loaded()
+        count = 2 * MAX_DEPTH + 3
+        shas = [history.snapshot('a.md', version(i), when=1000 + i) for i in range(count)]
+        history.save()
+        loaded = self.loaded()
+        self.assertEqual(loaded.history('a.md'), [(1000.0 + i, shas[i]) for i in reversed(range(count))])
+        for i, sha in enumerate(shas):
+            self.assertEqual(sha, content_id(version(i)))
+            self.assertEqual(loaded.read(sha), version(i))
+
+    def test_chains_are_bounded(self):
+        history = self.loaded()
+        shas = [history.snapshot('a.md', version(i)) for i in range(2 * MAX_DEPTH + 3)]
+        depths = [history._depth(sha) for sha in shas]
+        self.assertEqual(depths[:MAX_DEPTH + 1], [0] + list(range(1, MAX_DEPTH)) + [0])
+        self.assertTrue(all(depth < MAX_DEPTH for depth in depths))
+        # a delta costs far less than the note itself
+        full = history.objects.entries[shas[0]][1]
+        delta = history.objects.entries[shas[1]][1]
+        self.assertLess(delta * 5, full)
+
+    def test_unchanged_content_is_not_stored_again(self):
+        history = self.loaded()
+        first = history.snapshot('a.md', b'same', when=1)
+        self.assertIsNone(history.snapshot('a.md', b'same', when=2))
+        self.assertEqual(history.history('a.md'), [(1, first)])
+        # the same content in another note shares the stored object
+        self.assertEqual(history.snapshot('b.md', b'same', when=3), first)
+        self.assertEqual(len(history.objects), 1)
+        # going back to an earlier version is a new entry, but not a new object
+        history.snapshot('a.md', b'other', when=4)
+        self.assertEqual(history.snapshot('a.md', b'same', when=5), first)
+        self.assertEqual(len(history.objects), 2)
+        self.assertEqual([sha for _, sha in history.history('a.md')], [first, content_id(b'other'), first])
+
+    def test_index_is_saved_in_batches(self):
+        history = self.loaded()
+        for i in range(SAVE_EVERY - 1):
+            history.snapshot('a.md', version(i))
+        self.assertTrue(history.objects.dirty)
+        history.snapshot('a.md', version(SAVE_EVERY))
+        self.assertFalse(history.objects.dirty)
+        self.assertEqual(len(self.loaded().history('a.md')), SAVE_EVERY)
+
+    def test_versions_missing_from_the_index_are_dropped(self):
+        history = self.loaded()
+        saved = history.snapshot('a.md', b'saved', when=1)
+        history.save()
+        history.snapshot('a.md', b'lost', when=2)
+        history.snapshot('b.md', b'lost too', when=3)
+        # not saved: the log names versions the index does not know about
+        loaded = self.loaded()
+        self.assertEqual(loaded.history('a.md'), [(1, saved)])
+        self.assertEqual(loaded.history('b.md'), [])
+        self.assertEqual(loaded.read(saved), b'saved')
+        # and new versions still build on what was saved
+        sha = loaded.snapshot('a.md', b'saved again', when=4)
+        loaded.save()
+        self.assertEqual(self.loaded().read(sha), b'saved again')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tests of the journaled store behind the brain. Run from the package root,
+outside Sublime Text:
+
+    python -m unittest discover Tests
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from lib import journal
+from lib.journal import JournaledStore
+
+
+class JournaledStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'brain.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def store(self, compact_bytes=1 << 20):
+        store = JournaledStore(self.path, compact_bytes)
+        store.load()
+        return store
+
+    def test_replays_the_journal_over_the_snapshot(self):
+        with open(self.path, 'w') as f:
+            json.dump({'a.md': {'color_scheme': 'x'}, 'b.md': {'color_scheme': 'y'}}, f)
+        store = self.store()
+        store.set('c.md', {'color_scheme': 'z'})
+        store.pop('a.md')
+        store.flush()
+        loaded = self.store()
+        self.assertEqual(dict((key, loaded[key]) for key in loaded),
+                         {'b.md': {'color_scheme': 'y'}, 'c.md': {'color_scheme': 'z'}})
+        # the snapshot itself is left alone
+        with open(self.path) as f:
+            self.assertEqual(sorted(json.load(f)), ['a.md', 'b.md'])
+
+    def test_torn_and_bad_lines(self):
+        store = self.store()
+        store.set('a.md', {'color_scheme': 'x'})
+        store.flush()
+        with open(store.journal_path, 'ab') as f:
+            f.write(b'5\n[1, 2, 3]\n[["k"], {}]\nnot json\n["b.md", {"color')
+        loaded = self.store()
+        self.assertEqual(list(loaded), ['a.md'])
+        # the torn tail is cut off, so the next change starts a line of its own
+        loaded.set('c.md', {'color_scheme': 'z'})
+        loaded.flush()
+        self.assertEqual(sorted(self.store()), ['a.md', 'c.md'])
+
+    def test_compaction(self):
+        store = self.store(compact_bytes=1 << 20)
+        for i in range(10):
+            store.set('{0}.md'.format(i), {'color_scheme': str(i)})
+        store.flush()
+        store.pop('3.md')
+        store.compact()
+        self.assertEqual(os.path.getsize(store.journal_path), 0)
+        self.assertEqual(store.journal_size, 0)
+        with open(self.path) as f:
+            self.assertEqual(len(json.load(f)), 9)
+        store.set('x.md', {'color_scheme': 'x'})
+        store.flush()
+        loaded = self.store()
+        self.assertEqual(len(loaded), 10)
+        self.assertNotIn('3.md', loaded)
+
+    def test_flushes_while_the_snapshot_is_written(self):
+        store = self.store()
+        store.set('a.md', {'color_scheme': 'x'})
+        store.flush()
+        flusher = []
+
+        def write_atomic(path, text, sync=False):
+            if path == self.path and not flusher:
+                # another thread changes a record meanwhile, without waiting
+                store.set('b.md', {'color_scheme': 'y'})
+                flusher.append(threading.Thread(target=store.flush))
+                flusher[0].start()
+                flusher[0].join(5)
+                self.assertFalse(flusher[0].is_alive())
+            real_write_atomic(path, text, sync)
+
+        real_write_atomic = journal.write_atomic
+        journal.write_atomic = write_atomic
+        try:
+            store.compact()
+        finally:
+            journal.write_atomic = real_write_atomic
+        with open(self.path) as f:
+            self.assertEqual(sorted(json.load(f)), ['a.md'])
+        self.assertEqual(sorted(self.store()), ['a.md', 'b.md'])
+
+    def test_compacts_on_flush_past_the_threshold(self):
+        store = self.store(compact_bytes=100)
+        for i in range(10):
+            store.set('{0}.md'.format(i), {'color_scheme': 'scheme'})
+            store.flush()
+        for _ in range(100):
+            if not store.compacting:
+                break
+            time.sleep(0.01)
+        self.assertTrue(os.path.isfile(self.path))
+        self.assertEqual(len(self.store()), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tests of the link checker, remote checks against a local HTTP server. Run
+from the package root, outside Sublime Text:
+
+    python -m unittest discover Tests
+"""
+
+import os
+import sys
+import shutil
+import socket
+import tempfile
+import threading
+import unittest
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from lib.linkcheck import LinkChecker, check_note, check_url
+
+
+class Handler(BaseHTTPRequestHandler):
+
+    requests = 0
+
+    def do_HEAD(self):
+        Handler.requests += 1
+        if self.path == '/no-head':
+            self.send_response(405)
+        elif self.path == '/ok':
+            self.send_response(200)
+        else:
+            self.send_response(404)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_GET(self):
+        self.send_response(200 if self.path in ('/ok', '/no-head') else 404)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def free_port():
+    s = socket.socket()
+    s.bind(('127.0.0.1', 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+class CheckUrlTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = HTTPServer(('127.0.0.1', 0), Handler)
+        cls.base = 'http://127.0.0.1:{0}'.format(cls.server.server_address[1])
+        cls.thread = threading.Thread(target=cls.server.serve_forever)
+        cls.thread.daemon = True
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_answering_url(self):
+        self.assertIsNone(check_url(self.base + '/ok', 5))
+
+    def test_missing_page(self):
+        self.assertEqual(check_url(self.base + '/gone', 5), 'HTTP 404')
+
+    def test_head_refused_falls_back_to_get(self):
+        self.assertIsNone(check_url(self.base + '/no-head', 5))
+
+    def test_unreachable(self):
+        reason = check_url('http://127.0.0.1:{0}/'.format(free_port()), 5)
+        self.assertTrue(reason.startswith('unreachable'), reason)
+
+    def test_malformed_url(self):
+        self.assertEqual(check_url('http://[::1', 5), 'invalid URL')
+
+    def test_checker_reports_remote_problems(self):
+        root = tempfile.mkdtemp()
+        try:
+            with open(os.path.join(root, 'a.md'), 'w') as f:
+                f.write('[ok]({0}/ok)\n[gone]({0}/gone)\n[bad](http://[::1)\n![img](missing.png)\n'.format(self.base))
+            checker = LinkChecker(root, os.path.join(root, 'linkcheck.json'), workers=2, url_workers=2, timeout=5)
+            notes = [('a.md', 1.0, 10)]
+            self.assertEqual(checker.run(notes), {'a.md': [[4, 'image', 'missing.png', 'missing']]})
+            report = checker.run(notes, check_remote=True)
+            self.assertEqual(report['a.md'], [
+                [2, 'link', self.base + '/gone', 'HTTP 404'],
+                [3, 'link', 'http://[::1', 'invalid URL'],
+                [4, 'image', 'missing.png', 'missing'],
+            ])
+        finally:
+            shutil.rmtree(root)
+
+    def test_url_statuses_expire(self):
+        root = tempfile.mkdtemp()
+        try:
+            with open(os.path.join(root, 'a.md'), 'w') as f:
+                f.write('[ok]({0}/ok)\n'.format(self.base))
+            notes = [('a.md', 1.0, 10)]
+            checker = LinkChecker(root, os.path.join(root, 'linkcheck.json'), timeout=5)
+            checker.run(notes, check_remote=True)
+            before = Handler.requests
+            checker.run(notes, check_remote=True)
+            self.assertEqual(Handler.requests, before)
+            checker.url_ttl = 0
+            checker.run(notes, check_remote=True)
+            self.assertEqual(Handler.requests, before + 1)
+        finally:
+            shutil.rmtree(root)
+
+
+class LocalTargetsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        with open(os.path.join(self.root, 'a.md'), 'w') as f:
+            f.write('[b](b.md)\n')
+        open(os.path.join(self.root, 'b.md'), 'w').close()
+        self.checker = LinkChecker(self.root, os.path.join(self.root, 'linkcheck.json'), workers=2)
+        self.notes = [('a.md', 1.0, 10)]
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_deleted_target_is_reported(self):
+        self.assertEqual(self.checker.run(self.notes), {})
+        os.remove(os.path.join(self.root, 'b.md'))
+        # the linking note did not change
+        self.assertEqual(self.checker.run(self.notes), {'a.md': [[1, 'link', 'b.md', 'missing']]})
+
+    def test_restored_target_is_no_longer_reported(self):
+        os.remove(os.path.join(self.root, 'b.md'))
+        self.assertEqual(len(self.checker.run(self.notes)), 1)
+        self.checker.save()
+        open(os.path.join(self.root, 'b.md'), 'w').close()
+        loaded = LinkChecker(self.root, os.path.join(self.root, 'linkcheck.json'), workers=2)
+        self.assertTrue(loaded.load())
+        self.assertEqual(loaded.run(self.notes), {})
+
+
+class CheckNoteTest(unittest.TestCase):
+
+    def test_local_targets(self):
+        root = tempfile.mkdtemp()
+        try:
+            os.mkdir(os.path.join(root, 'img'))
+            open(os.path.join(root, 'img', 'p.png'), 'w').close()
+            path = os.path.join(root, 'a.md')
+            with open(path, 'w') as f:
+                f.write('![p](img/p.png) [x](x.md#part) [h](#head) [m](mailto:a@b.c) [w](https://e.org)\n')
+            problems, urls = check_note(path)
+            self.assertEqual(problems, [[1, 'link', 'x.md#part', 'missing']])
+            self.assertEqual(urls, [[1, 'link', 'https://e.org']])
+        finally:
+            shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tests of link parsing, of the link graph behind backlinks and of the link
+rewriting done when notes move. Run from the package root, outside Sublime
+Text:
+
+    python -m unittest discover Tests
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from lib.links import LinkGraph, parse_links, resolve, rewrite_links, title_key
+
+
+def p(path):
+    return path.replace('/', os.path.sep)
+
+
+class ResolveTest(unittest.TestCase):
+
+    def test_relative_to_the_note(self):
+        self.assertEqual(resolve(p('a/x.md'), '../b/y.md'), p('b/y.md'))
+        self.assertEqual(resolve(p('a/x.md'), 'y.md#part'), p('a/y.md'))
+        self.assertEqual(resolve(p('a/x.md'), 'my%20note.md'), p('a/my note.md'))
+
+    def test_urls_anchors_and_outside_root(self):
+        self.assertIsNone(resolve('x.md', 'https://example.com/a.md'))
+        self.assertIsNone(resolve('x.md', 'mailto:me@example.com'))
+        self.assertIsNone(resolve('x.md', '#heading'))
+        self.assertIsNone(resolve('x.md', '../outside.md'))
+
+    def test_parse_links(self):
+        links = parse_links('x.md', u'[a](y.md) ![i](img/p.png) [[Other Note|label]] [w](http://e.org)')
+        self.assertEqual(links, [['md', 'y.md', 'y.md'], ['md', 'img/p.png', p('img/p.png')],
+                                 ['wiki', 'Other Note', title_key('Other Note')]])
+
+
+class RewriteLinksTest(unittest.TestCase):
+
+    def test_link_to_moved_note(self):
+        text = u'See [plan](work/plan.md) and [other](other.md).'
+        moves = {p('work/plan.md'): p('archive/work/plan.md')}
+        self.assertEqual(rewrite_links(text, 'index.md', 'index.md', moves),
+                         u'See [plan](archive/work/plan.md) and [other](other.md).')
+
+    def test_moved_note_keeps_its_own_links(self):
+        text = u'[up](../index.md) [sibling](b.md)'
+        moves = {p('work/a.md'): p('done/2020/a.md')}
+        self.assertEqual(rewrite_links(text, p('work/a.md'), p('done/2020/a.md'), moves),
+                         u'[up](../../index.md) [sibling](../../work/b.md)')
+
+    def test_both_ends_move(self):
+        text = u'[b](b.md)'
+        moves = {p('a.md'): p('x/a.md'), p('b.md'): p('y/b.md')}
+        self.assertEqual(rewrite_links(text, 'a.md', p('x/a.md'), moves), u'[b](../y/b.md)')
+
+    def test_fragments_titles_and_quoting(self):
+        text = u'[a](a.md#intro "Title") [b](<b.md>) [c](my%20c.md)'
+        moves = {'a.md': p('n/a.md'), 'b.md': p('n/new b.md'), 'my c.md': p('n/my c.md')}
+        self.assertEqual(rewrite_links(text, 'x.md', 'x.md', moves),
+                         u'[a](n/a.md#intro "Title") [b](<n/new b.md>) [c](n/my%20c.md)')
+
+    def test_images_and_urls(self):
+        text = u'![p](img/p.png) [w](https://e.org/a.md)'
+        moves = {p('img/p.png'): p('media/p.png')}
+        self.assertEqual(rewrite_links(text, 'x.md', 'x.md', moves),
+                         u'![p](media/p.png) [w](https://e.org/a.md)')
+
+    def test_wiki_links_follow_renames(self):
+        text = u'[[Old Name]] [[notes/old name|label]] [[Other]]'
+        moves = {p('notes/Old Name.md'): p('notes/New Name.md')}
+        self.assertEqual(rewrite_links(text, 'x.md', 'x.md', moves),
+                         u'[[New Name]] [[notes/New Name|label]] [[Other]]')
+
+    def test_untouched_text_is_identical(self):
+        text = u'No links\r\nhere [a](a.md)\r\n'
+        self.assertEqual(rewrite_links(text, 'x.md', 'x.md', {'b.md': 'c.md'}), text)
+
+
+class LinkGraphTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.root, 'sub'))
+        self.path = os.path.join(self.root, 'links.json')
+        self.notes = {}
+        self.write('a.md', u'[b](sub/b.md) [[C]]')
+        self.write(p('sub/b.md'), u'[a](../a.md) [[c|see c]] [self](b.md)')
+        self.write('c.md', u'no links')
+        self.graph = LinkGraph(self.root, self.path).sync(self.listing())
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write(self, relpath, text):
+        with open(os.path.join(self.root, relpath), 'w') as f:
+            f.write(text)
+        self.notes[relpath] = self.notes.get(relpath, 0) + 1
+
+    def listing(self):
+        return [(relpath, mtime, 0) for relpath, mtime in self.notes.items()]
+
+    def test_backlinks(self):
+        self.assertEqual(self.graph.backlinks('a.md'), [p('sub/b.md')])
+        self.assertEqual(self.graph.backlinks(p('sub/b.md')), ['a.md'])
+        self.assertEqual(self.graph.backlinks('c.md'), ['a.md', p('sub/b.md')])
+        self.assertEqual(self.graph.links_to(p('sub/b.md'), 'c.md'), [['wiki', 'c', title_key('c')]])
+        self.assertEqual(self.graph.links_to('c.md', 'a.md'), [])
+
+    def test_sync_reparses_changed_notes_only(self):
+        os.remove(os.path.join(self.root, 'a.md'))
+        # same mtime: the graph keeps what it parsed before
+        self.graph.sync(self.listing())
+        self.assertEqual(self.graph.backlinks('c.md'), ['a.md', p('sub/b.md')])
+        self.write('a.md', u'[[B]]')
+        self.graph.sync(self.listing())
+        self.assertEqual(self.graph.backlinks('c.md'), [p('sub/b.md')])
+        self.assertEqual(self.graph.backlinks(p('sub/b.md')), ['a.md'])
+
+    def test_removed_notes_lose_their_links(self):
+        del self.notes[p('sub/b.md')]
+        self.graph.sync(self.listing())
+        self.assertEqual(self.graph.backlinks('a.md'), [])
+        self.assertEqual(self.graph.backlinks('c.md'), ['a.md'])
+        self.graph.remove('a.md')
+        self.assertEqual(self.graph.backlinks('c.md'), [])
+        self.assertEqual(self.graph.incoming, {})
+
+    def test_update_from_text(self):
+        self.graph.update('c.md', 2, u'[a](a.md)')
+        self.assertEqual(self.graph.backlinks('a.md'), ['c.md', p('sub/b.md')])
+
+    def test_save_and_load(self):
+        self.graph.save()
+        self.assertFalse(self.graph.dirty)
+        loaded = LinkGraph(self.root, self.path)
+        self.assertTrue(loaded.load())
+        self.assertEqual(loaded.outgoing, self.graph.outgoing)
+        self.assertEqual(loaded.backlinks('c.md'), ['a.md', p('sub/b.md')])
+        self.assertFalse(LinkGraph(self.root + 'x', self.path).load())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tests of the packed archive storage. Run from the package root, outside
+Sublime Text:
+
+    python -m unittest discover Tests
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from lib import pack
+from lib.pack import NotePack
+
+
+class NotePackTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.index_path = os.path.join(self.dir, 'archive.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def loaded(self):
+        notes = NotePack(self.index_path)
+        self.assertTrue(notes.load())
+        return notes
+
+    def test_round_trip(self):
+        notes = NotePack(self.index_path)
+        self.assertFalse(notes.load())
+        notes.add('a.md', b'# A\n' * 100, 10)
+        notes.add(os.path.join('dir', 'b.md'), u'# Bé\n'.encode('utf-8'), 20)
+        notes.save()
+        loaded = self.loaded()
+        self.assertEqual(sorted(loaded.notes()), [('a.md', 10), (os.path.join('dir', 'b.md'), 20)])
+        self.assertEqual(loaded.read('a.md'), b'# A\n' * 100)
+        self.assertEqual(loaded.read(os.path.join('dir', 'b.md')).decode('utf-8'), u'# Bé\n')
+        # the pack holds the notes compressed
+        self.assertLess(os.path.getsize(loaded.path), 400)
+
+    def test_readding_replaces_the_packed_version(self):
+        notes = NotePack(self.index_path)
+        notes.add('a.md', b'old', 1)
+        notes.add('a.md', b'new', 2)
+        self.assertEqual(len(notes), 1)
+        self.assertEqual(notes.read('a.md'), b'new')
+        self.assertEqual(notes.notes(), [('a.md', 2)])
+        self.assertGreater(notes.dead, 0)
+
+    def test_uncompressed_data(self):
+        notes = NotePack(self.index_path)
+        notes.add('blob', b'raw bytes', 1, compress=False)
+        self.assertEqual(notes.read('blob', compress=False), b'raw bytes')
+
+    def test_remove_compacts_into_a_new_pack(self):
+        notes = NotePack(self.index_path)
+        for i in range(4):
+            notes.add('{0}.md'.format(i), os.urandom(1000), i)
+        keep = notes.read('3.md')
+        notes.save()
+        old_path = notes.path
+        notes.remove('0.md')
+        self.assertEqual(notes.generation, 0)
+        self.assertNotIn('0.md', notes)
+        notes.remove('1.md')
+        notes.remove('2.md')
+        # removed notes took over half the pack, so only 3.md was copied over
+        self.assertEqual(notes.generation, 1)
+        self.assertFalse(os.path.exists(old_path))
+        self.assertEqual(notes.dead, 0)
+        self.assertEqual(os.path.getsize(notes.path), notes.entries['3.md'][1])
+        # and the compacted index was saved before the old pack went away
+        loaded = self.loaded()
+        self.assertEqual(loaded.generation, 1)
+        self.assertEqual(loaded.read('3.md'), keep)
+
+    def test_index_is_replaced_after_the_data_is_written(self):
+        notes = NotePack(self.index_path)
+        notes.add('a.md', b'a', 1)
+        notes.save()
+        notes.add('b.md', b'b', 2)
+        # not saved: the index still describes the pack before b.md
+        loaded = self.loaded()
+        self.assertEqual(loaded.notes(), [('a.md', 1)])
+        self.assertEqual(loaded.read('a.md'), b'a')
+        loaded.add('c.md', b'c', 3)
+        self.assertEqual(loaded.read('c.md'), b'c')
+
+    def test_sync_save(self):
+        synced = []
+        real_fsync = pack.os.fsync
+
+        def fsync(fd):
+            synced.append(os.fstat(fd).st_size)
+            real_fsync(fd)
+
+        notes = NotePack(self.index_path)
+        notes.add('a.md', b'a' * 100, 1)
+        pack.os.fsync = fsync
+        try:
+            notes.save(sync=True)
+        finally:
+            pack.os.fsync = real_fsync
+        # the pack data first, then the index
+        self.assertEqual(synced[0], os.path.getsize(notes.path))
+        self.assertGreaterEqual(len(synced), 2)
+        self.assertFalse(notes.dirty)
+        self.assertEqual(self.loaded().read('a.md'), b'a' * 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tests of the notes query language. Run from the package root, outside
+Sublime Text:
+
+    python -m unittest discover Tests
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from lib.query import Note, QueryError, parse
+
+NOW = 1700000000  # 2023-11-14 22:13:20 UTC
+DAY = 86400
+
+
+def note(relpath='work/plan.md', folder='work', mtime=NOW, size=100, archived=False, tags=()):
+    return Note(relpath, folder, mtime, size, archived, set(tags) | set([folder]))
+
+
+def matches(query, n):
+    predicate, _ = parse(query, now=NOW)
+    return predicate(n)
+
+
+class QueryTest(unittest.TestCase):
+
+    def test_path_substring(self):
+        self.assertTrue(matches('PLAN', note()))
+        self.assertFalse(matches('other', note()))
+
+    def test_terms_are_and_ed(self):
+        self.assertTrue(matches('plan folder:work', note()))
+        self.assertFalse(matches('plan folder:home', note()))
+
+    def test_negation(self):
+        self.assertFalse(matches('-plan', note()))
+        self.assertTrue(matches('-folder:home', note()))
+
+    def test_tag_and_folder_prefix(self):
+        n = note(relpath='work/x/a.md', folder='work/x', tags=['urgent'])
+        self.assertTrue(matches('tag:urgent', n))
+        self.assertTrue(matches('tag:#work', n))
+        self.assertTrue(matches('folder:work', n))
+        self.assertTrue(matches('folder:/work/x/', n))
+        self.assertFalse(matches('folder:wor', n))
+
+    def test_modified_relative(self):
+        self.assertTrue(matches('modified:<7d', note(mtime=NOW - 2 * DAY)))
+        self.assertFalse(matches('modified:<7d', note(mtime=NOW - 8 * DAY)))
+        self.assertTrue(matches('modified:>7d', note(mtime=NOW - 8 * DAY)))
+
+    def test_modified_dates(self):
+        day = 1699920000  # 2023-11-14 00:00 UTC
+        self.assertTrue(matches('modified:2023-11-14', note(mtime=day + 10)))
+        self.assertFalse(matches('modified:2023-11-14', note(mtime=day + DAY)))
+        self.assertTrue(matches('modified:>2023-11-13', note(mtime=day)))
+        self.assertFalse(matches('modified:>2023-11-14', note(mtime=day + 10)))
+        self.assertTrue(matches('modified:<2023-11-14', note(mtime=day - 1)))
+
+    def test_size(self):
+        self.assertTrue(matches('size:>1k', note(size=2048)))
+        self.assertFalse(matches('size:>1k', note(size=1024)))
+        self.assertTrue(matches('size:100', note(size=100)))
+
+    def test_archived(self):
+        predicate, archived_given = parse('archived:yes', now=NOW)
+        self.assertTrue(archived_given)
+        self.assertTrue(predicate(note(archived=True)))
+        self.assertFalse(predicate(note()))
+        self.assertFalse(parse('plan', now=NOW)[1])
+        self.assertTrue(matches('archived:any', note()))
+
+    def test_errors(self):
+        for query in ('foo:bar', 'tag:', 'modified:<7x', 'modified:2023-13-01', 'size:big', 'archived:maybe'):
+            self.assertRaises(QueryError, parse, query, NOW)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tests of the corpus-wide search and replace and of the atomic writes it
+relies on. Run from the package root, outside Sublime Text:
+
+    python -m unittest discover Tests
+"""
+
+import io
+import os
+import sys
+import stat
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from lib.helpers import write_atomic
+from lib.replace import apply, plan_replacement
+
+
+class ReplaceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.paths = [self.write('a.md', u'old name\r\nkeep\r\nold and old\r\n'),
+                      self.write('b.md', u'nothing here\n'),
+                      self.write('c.md', u'old é\n')]
+        self.latin1 = os.path.join(self.root, 'latin1.md')
+        with open(self.latin1, 'wb') as f:
+            f.write(u'old caf\xe9\n'.encode('latin-1'))
+        self.paths.append(self.latin1)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write(self, name, text):
+        path = os.path.join(self.root, name)
+        with io.open(path, 'w', encoding='utf-8', newline='') as f:
+            f.write(text)
+        os.utime(path, (1000, 1000))
+        return path
+
+    def read(self, path):
+        with io.open(path, 'r', encoding='utf-8', newline='') as f:
+            return f.read()
+
+    def plan(self, undecodable=None):
+        plans = plan_replacement(self.paths, u'old', u'new', workers=2, undecodable=undecodable)
+        return dict((os.path.basename(plan.path), plan) for plan in plans)
+
+    def test_plans_notes_with_matches_only(self):
+        undecodable = []
+        plans = self.plan(undecodable)
+        self.assertEqual(sorted(plans), ['a.md', 'c.md'])
+        self.assertEqual(undecodable, [self.latin1])
+        plan = plans['a.md']
+        self.assertEqual(plan.count, 3)
+        self.assertEqual(plan.lines, [(1, u'old name', u'new name'), (3, u'old and old', u'new and new')])
+        # planning writes nothing
+        self.assertEqual(self.read(plan.path), u'old name\r\nkeep\r\nold and old\r\n')
+
+    def test_apply(self):
+        written, skipped = apply(self.plan().values())
+        self.assertEqual(sorted(written), [self.paths[0], self.paths[2]])
+        self.assertEqual(skipped, [])
+        # line endings are kept, untouched notes keep their mtime
+        self.assertEqual(self.read(self.paths[0]), u'new name\r\nkeep\r\nnew and new\r\n')
+        self.assertEqual(self.read(self.paths[2]), u'new é\n')
+        self.assertEqual(os.stat(self.paths[1]).st_mtime, 1000)
+        with open(self.latin1, 'rb') as f:
+            self.assertEqual(f.read(), u'old caf\xe9\n'.encode('latin-1'))
+
+    def test_notes_changed_since_planning_are_skipped(self):
+        plans = self.plan()
+        self.write('c.md', u'old, edited meanwhile\n')
+        os.utime(self.paths[2], (2000, 2000))
+        written, skipped = apply(plans.values())
+        self.assertEqual(written, [self.paths[0]])
+        self.assertEqual(skipped, [self.paths[2]])
+        self.assertEqual(self.read(self.paths[2]), u'old, edited meanwhile\n')
+
+
+class WriteAtomicTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'note.md')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_text_and_bytes(self):
+        write_atomic(self.path, u'é\r\n')
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), u'é\r\n'.encode('utf-8'))
+        write_atomic(self.path, b'\x00\xff', sync=True)
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), b'\x00\xff')
+        self.assertEqual(os.listdir(self.dir), ['note.md'])
+
+    @unittest.skipIf(os.name == 'nt', 'file modes are POSIX only')
+    def test_keeps_the_file_mode(self):
+        write_atomic(self.path, u'a')
+        os.chmod(self.path, 0o640)
+        write_atomic(self.path, u'b')
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o640)
+
+    def test_replaces_rather_than_rewrites(self):
+        write_atomic(self.path, u'old')
+        link = os.path.join(self.dir, 'hardlink.md')
+        os.link(self.path, link)
+        write_atomic(self.path, u'new')
+        # the old inode, still reachable through the link, was never truncated
+        with open(link) as f:
+            self.assertEqual(f.read(), u'old')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tests of the note roots prefix index and of merging the notes lists of
+several roots. Run from the package root, outside Sublime Text:
+
+    python -m unittest discover Tests
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from lib.notelist import NoteList
+from lib.roots import RootIndex
+
+
+class RootIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = os.path.realpath(tempfile.mkdtemp())
+        self.notes = os.path.join(self.dir, 'notes')
+        self.work = os.path.join(self.dir, 'notes', 'work')
+        self.other = os.path.join(self.dir, 'other')
+        for path in (self.work, self.other):
+            os.makedirs(os.path.join(path, 'sub'))
+        self.index = RootIndex()
+        self.index.add([self.notes, self.work])
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_innermost_root(self):
+        self.assertEqual(self.index.root_of(os.path.join(self.notes, 'a.md')), self.notes)
+        self.assertEqual(self.index.root_of(os.path.join(self.notes, 'sub', 'deep', 'a.md')), self.notes)
+        self.assertEqual(self.index.root_of(os.path.join(self.work, 'sub', 'a.md')), self.work)
+        self.assertEqual(self.index.root_of(os.path.join(self.notes, 'x', '..', 'work', 'a.md')), self.work)
+
+    def test_outside_the_roots(self):
+        self.assertIsNone(self.index.root_of(os.path.join(self.other, 'a.md')))
+        self.assertIsNone(self.index.root_of(self.notes))
+        self.assertIsNone(self.index.root_of(self.notes + 'x' + os.path.sep + 'a.md'))
+
+    @unittest.skipUnless(hasattr(os, 'symlink') and os.name != 'nt', 'needs symlinks')
+    def test_symlinks(self):
+        # a root registered through a link is found by the real path ...
+        linked_root = os.path.join(self.dir, 'linked-other')
+        os.symlink(self.other, linked_root)
+        self.index.add([linked_root])
+        self.assertEqual(self.index.root_of(os.path.join(self.other, 'sub', 'a.md')), linked_root)
+        # ... and a path through a link resolves to the root it points into
+        link = os.path.join(self.dir, 'shortcut')
+        os.symlink(os.path.join(self.work, 'sub'), link)
+        self.assertEqual(self.index.root_of(os.path.join(link, 'a.md')), self.work)
+
+    def test_clear(self):
+        self.index.clear()
+        self.assertIsNone(self.index.root_of(os.path.join(self.notes, 'a.md')))
+
+
+class MergeTest(unittest.TestCase):
+
+    def test_rows_of_other_roots_are_tagged_with_their_folder(self):
+        root = os.path.join(os.sep, 'home', 'notes')
+        other = os.path.join(os.sep, 'home', 'work')
+        first = NoteList.from_entries(root, [('a.md', 3), (os.path.join('sub', 'b.md'), 1)])
+        second = NoteList.from_entries(other, [('c.md', 2)])
+        second.titles = [u'C title']
+        merged = NoteList.merge([first, second])
+        self.assertEqual(merged.root, root)
+        self.assertEqual([merged.caption(i) for i in range(len(merged))], [u'a', u'work: C title', u'sub: b'])
+        self.assertEqual([merged.path(i) for i in range(len(merged))],
+                         [os.path.join(root, 'a.md'), os.path.join(other, 'c.md'), os.path.join(root, 'sub', 'b.md')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tests of the full-text search index. Run from the package root, outside
+Sublime Text:
+
+    python -m unittest discover Tests
+"""
+
+import io
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from lib.search import SearchIndex, snippet, tokenize
+
+
+class SearchIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.path = os.path.join(self.root, 'search.json.z')
+        self.notes = {}
+        self.write('garden.md', u'Garden plans: tomatoes, tomatoes and more tomatoes.')
+        self.write('shopping.md', u'Buy tomatoes and basil for the Café.')
+        self.write('long.md', u'tomatoes ' + u'filler words ' * 50)
+        self.write('meeting.md', u'Meeting notes about the budget.')
+        self.index = self.synced()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write(self, relpath, text):
+        with io.open(os.path.join(self.root, relpath), 'w', encoding='utf-8') as f:
+            f.write(text)
+        self.notes[relpath] = self.notes.get(relpath, 0) + 1
+
+    def synced(self, index=None):
+        index = index or SearchIndex(self.root, self.path)
+        index.sync([(relpath, mtime, 0) for relpath, mtime in self.notes.items()])
+        return index
+
+    def hits(self, query):
+        return [relpath for relpath, _ in self.index.search(query)]
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize(u'A Café, x 2024-01!'), [u'café', u'2024', u'01'])
+
+    def test_ranking(self):
+        # more occurrences first, and a long note ranks below a short one
+        self.assertEqual(self.hits(u'tomatoes'), ['garden.md', 'shopping.md', 'long.md'])
+        scores = [score for _, score in self.index.search(u'tomatoes')]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertEqual(len(self.index.search(u'tomatoes', limit=1)), 1)
+
+    def test_every_term_must_match(self):
+        self.assertEqual(self.hits(u'TOMATOES basil'), ['shopping.md'])
+        self.assertEqual(self.hits(u'tomatoes budget'), [])
+        self.assertEqual(self.hits(u'café'), ['shopping.md'])
+        self.assertEqual(self.hits(u'!'), [])
+
+    def test_last_term_matches_as_prefix(self):
+        self.assertEqual(self.hits(u'meeting budg'), ['meeting.md'])
+        self.assertEqual(sorted(self.hits(u'tomat')), ['garden.md', 'long.md', 'shopping.md'])
+        self.assertEqual(self.hits(u'budg meeting'), [])
+
+    def test_changed_and_removed_notes(self):
+        self.write('meeting.md', u'Meeting moved to the garden.')
+        del self.notes['garden.md']
+        self.synced(self.index)
+        self.assertEqual(self.hits(u'budget'), [])
+        self.assertEqual(self.hits(u'garden'), ['meeting.md'])
+        self.assertEqual(sorted(self.hits(u'tomatoes')), ['long.md', 'shopping.md'])
+
+    def test_compaction_keeps_the_results(self):
+        # the second re-index retires more than COMPACT_RATIO of the ids
+        for _ in range(2):
+            self.write('meeting.md', u'Meeting notes about the budget.')
+            self.synced(self.index)
+        self.assertEqual(self.index.retired, 0)
+        self.assertEqual(len(self.index.paths), 4)
+        self.assertEqual(self.hits(u'budget'), ['meeting.md'])
+        self.assertEqual(self.hits(u'tomatoes'), ['garden.md', 'shopping.md', 'long.md'])
+
+    def test_save_and_load(self):
+        self.index.remove('long.md')
+        self.index.save()
+        self.assertFalse(self.index.dirty)
+        loaded = SearchIndex(self.root, self.path)
+        self.assertTrue(loaded.load())
+        self.assertEqual(loaded.search(u'tomatoes'), self.index.search(u'tomatoes'))
+        self.assertEqual(loaded.search(u'tomat'), self.index.search(u'tomat'))
+        self.assertFalse(SearchIndex(self.root + 'x', self.path).load())
+
+    def test_snippet(self):
+        self.write('snippet.md', u'first line\n' + u'x' * 30 + u' the Basil line ' + u'y' * 200 + u'\n')
+        number, text = snippet(os.path.join(self.root, 'snippet.md'), u'basil')
+        self.assertEqual(number, 2)
+        self.assertTrue(text.startswith(u'…') and text.endswith(u'…'))
+        self.assertIn(u'the Basil line', text)
+        self.assertEqual(snippet(os.path.join(self.root, 'snippet.md'), u'absent'), (1, u''))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tests of the note preview cache. Run from the package root, outside
+Sublime Text:
+
+    python -m unittest discover Tests
+"""
+
+import io
+import os
+import sys
+import types
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from lib import snippets
+from lib.snippets import SnippetCache
+
+
+class SnippetCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.opened = []
+        self.real_open = io.open
+        # count the files the cache reads
+        snippets.io = types.SimpleNamespace(open=self.open)
+        self.path = self.write('a.md', u''.join(u'line {0} é\n'.format(n) for n in range(30)))
+
+    def tearDown(self):
+        snippets.io = io
+        shutil.rmtree(self.dir)
+
+    def open(self, path, mode):
+        self.opened.append(os.path.basename(path))
+        return self.real_open(path, mode)
+
+    def write(self, name, text):
+        path = os.path.join(self.dir, name)
+        with self.real_open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return path
+
+    def test_first_lines(self):
+        cache = SnippetCache(max_lines=3)
+        self.assertEqual(cache.get(self.path, 1), u'line 0 é\nline 1 é\nline 2 é')
+        self.assertEqual(cache.get(os.path.join(self.dir, 'missing.md'), 1), u'')
+
+    def test_only_the_head_is_read(self):
+        cache = SnippetCache(head_bytes=25, max_lines=15)
+        # the line cut by the head is dropped
+        self.assertEqual(cache.get(self.path, 1), u'line 0 é\nline 1 é')
+        short = self.write('short.md', u'only line')
+        self.assertEqual(cache.get(short, 1), u'only line')
+
+    def test_cached_by_mtime(self):
+        cache = SnippetCache(max_lines=1)
+        self.assertEqual(cache.get(self.path, 1), u'line 0 é')
+        self.write('a.md', u'changed\n')
+        self.assertEqual(cache.get(self.path, 1), u'line 0 é')
+        self.assertEqual(self.opened, ['a.md'])
+        self.assertEqual(cache.get(self.path, 2), u'changed')
+        self.assertEqual(self.opened, ['a.md', 'a.md'])
+
+    def test_least_recently_used_are_dropped(self):
+        cache = SnippetCache(max_entries=2)
+        paths = [self.write('{0}.md'.format(i), u'note {0}'.format(i)) for i in range(3)]
+        cache.get(paths[0], 1)
+        cache.get(paths[1], 1)
+        cache.get(paths[0], 1)
+        cache.get(paths[2], 1)
+        self.assertEqual(list(cache.entries), [paths[0], paths[2]])
+        del self.opened[:]
+        cache.get(paths[1], 1)
+        self.assertEqual(self.opened, ['1.md'])
+
+
+if __name__ == '__main__':
+    unittest.main()
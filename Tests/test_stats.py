@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tests of the corpus statistics. Run from the package root, outside
+Sublime Text:
+
+    python -m unittest discover Tests
+"""
+
+import io
+import os
+import sys
+import time
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from lib import stats
+from lib.stats import NoteStats, count
+
+NOTE = u'''# Plans for the week
+☐ write report
+  ✔ call Bob
+✘ cancelled thing
+- ☐ not a task bullet
+![a](a.png) and ![b](b.png) [link](c.md)
+'''
+
+
+class CountTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_counters(self):
+        path = os.path.join(self.dir, 'a.md')
+        with io.open(path, 'w', encoding='utf-8') as f:
+            f.write(NOTE)
+        self.assertEqual(count(path), [len(NOTE.split()), 1, 1, 1, 2])
+        self.assertEqual(count(os.path.join(self.dir, 'missing.md')), [0, 0, 0, 0, 0])
+
+
+class NoteStatsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.root, 'work'))
+        self.path = os.path.join(self.root, 'stats.json')
+        self.notes = {}
+        self.write('a.md', NOTE, time.mktime((2024, 1, 15, 12, 0, 0, 0, 0, -1)))
+        self.write(os.path.join('work', 'b.md'), u'three more words', time.mktime((2024, 3, 1, 12, 0, 0, 0, 0, -1)))
+        self.write(os.path.join('work', 'c.md'), u'☐ one', time.mktime((2024, 3, 2, 12, 0, 0, 0, 0, -1)))
+        self.stats = NoteStats(self.root, self.path).sync(self.listing())
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write(self, relpath, text, mtime):
+        with io.open(os.path.join(self.root, relpath), 'w', encoding='utf-8') as f:
+            f.write(text)
+        self.notes[relpath] = mtime
+
+    def listing(self):
+        return [(relpath, mtime, 0) for relpath, mtime in self.notes.items()]
+
+    def test_report(self):
+        words = len(NOTE.split())
+        report = self.stats.report(largest=2)
+        self.assertEqual(report["total"], [3, words + 5, 2, 1, 1, 2])
+        self.assertEqual(report["folders"], {'': [1, words, 1, 1, 1, 2], 'work': [2, 5, 1, 0, 0, 0]})
+        self.assertEqual(report["modified"], [('2024-01', 1), ('2024-03', 2)])
+        self.assertEqual(report["largest"], [(words, 'a.md'), (3, os.path.join('work', 'b.md'))])
+
+    def test_report_of_kept_notes(self):
+        report = self.stats.report(lambda relpath: relpath.startswith('work'))
+        self.assertEqual(report["total"], [2, 5, 1, 0, 0, 0])
+        self.assertEqual(list(report["folders"]), ['work'])
+
+    def test_sync_counts_changed_notes_only(self):
+        counted = []
+        real_count = stats.count
+        stats.count = lambda path: counted.append(os.path.basename(path)) or real_count(path)
+        try:
+            self.stats.sync(self.listing())
+            self.assertEqual(counted, [])
+            self.write(os.path.join('work', 'b.md'), u'now four words here', time.time())
+            del self.notes['a.md']
+            self.stats.sync(self.listing())
+        finally:
+            stats.count = real_count
+        self.assertEqual(counted, ['b.md'])
+        self.assertEqual(self.stats.report()["total"], [2, 6, 1, 0, 0, 0])
+
+    def test_save_and_load(self):
+        self.stats.save()
+        self.assertFalse(self.stats.dirty)
+        loaded = NoteStats(self.root, self.path)
+        self.assertTrue(loaded.load())
+        self.assertEqual(loaded.report(), self.stats.report())
+        self.assertFalse(NoteStats(self.root + 'x', self.path).load())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tests of the tag index. Run from the package root, outside Sublime Text:
+
+    python -m unittest discover Tests
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from lib.tags import TagIndex, folder_of
+
+
+class Metadata(object):
+    """MetadataCache stand-in serving front matter from a dict."""
+
+    def __init__(self, meta):
+        self.meta = meta
+        self.reads = []
+
+    def get(self, relpath, mtime):
+        self.reads.append(relpath)
+        return self.meta.get(relpath, {})
+
+
+class FolderOfTest(unittest.TestCase):
+
+    def test_folders(self):
+        self.assertEqual(folder_of('a.md', 'Archive'), '')
+        self.assertEqual(folder_of(os.path.join('work', 'x', 'a.md'), 'Archive'), 'work/x')
+        self.assertEqual(folder_of(os.path.join('Archive', 'a.md'), 'Archive'), '')
+        self.assertEqual(folder_of(os.path.join('Archive', 'work', 'a.md'), 'Archive'), 'work')
+        self.assertEqual(folder_of(os.path.join('Archived', 'a.md'), 'Archive'), 'Archived')
+
+
+class TagIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.metadata = Metadata({
+            'a.md': {'tags': ['idea', '#todo']},
+            os.path.join('work', 'b.md'): {'tags': 'todo, work'},
+            os.path.join('Archive', 'work', 'c.md'): {'tags': 'idea'},
+        })
+        self.notes = [('a.md', 1, 10), (os.path.join('work', 'b.md'), 2, 10),
+                      (os.path.join('Archive', 'work', 'c.md'), 3, 10), ('plain.md', 4, 10)]
+        self.index = TagIndex('Archive').sync(self.notes, self.metadata)
+
+    def test_front_matter_and_folder_tags(self):
+        self.assertEqual(self.index.counts(), [('idea', 2), ('todo', 2), ('work', 2)])
+        self.assertEqual(self.index.tags_of('a.md'), set(['idea', 'todo']))
+        self.assertEqual(self.index.tags_of('plain.md'), set())
+        self.assertEqual(self.index.notes_with('work'),
+                         set([os.path.join('work', 'b.md'), os.path.join('Archive', 'work', 'c.md')]))
+        self.assertEqual(self.index.notes_with('missing'), set())
+
+    def test_counts_only_kept_notes(self):
+        active = lambda relpath: not relpath.startswith('Archive' + os.path.sep)
+        self.assertEqual(self.index.counts(active), [('idea', 1), ('todo', 2), ('work', 1)])
+        self.assertEqual(self.index.counts(lambda relpath: relpath == 'a.md'), [('idea', 1), ('todo', 1)])
+
+    def test_sync_reads_changed_notes_only(self):
+        del self.metadata.reads[:]
+        self.index.sync(self.notes, self.metadata)
+        self.assertEqual(self.metadata.reads, [])
+        self.metadata.meta['a.md'] = {'tags': 'done'}
+        self.notes[0] = ('a.md', 5, 10)
+        self.index.sync(self.notes, self.metadata)
+        self.assertEqual(self.metadata.reads, ['a.md'])
+        self.assertEqual(self.index.counts(), [('done', 1), ('idea', 1), ('todo', 1), ('work', 2)])
+
+    def test_sync_drops_removed_notes(self):
+        self.index.sync(self.notes[2:], self.metadata)
+        self.assertEqual(self.index.counts(), [('idea', 1), ('work', 1)])
+        self.assertEqual(self.index.tags_of('a.md'), set())
+        self.index.sync([], self.metadata)
+        self.assertEqual(self.index.counts(), [])
+        self.assertEqual(self.index.tags, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tests of the radix tree behind link completions. Run from the package
+root, outside Sublime Text:
+
+    python -m unittest discover Tests
+"""
+
+import os
+import sys
+import random
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from lib.trie import PrefixTrie
+
+
+def brute_find(pairs, prefix):
+    return [value for key, value in sorted(pairs) if key.startswith(prefix)]
+
+
+class PrefixTrieTest(unittest.TestCase):
+
+    def test_find_in_key_order(self):
+        trie = PrefixTrie()
+        for key in ('team', 'test', 'tea', 'toast', 'te', 'apple'):
+            trie.insert(key, key.upper())
+        self.assertEqual(trie.find('te'), ['TE', 'TEA', 'TEAM', 'TEST'])
+        self.assertEqual(trie.find(''), ['APPLE', 'TE', 'TEA', 'TEAM', 'TEST', 'TOAST'])
+        self.assertEqual(trie.find('tes'), ['TEST'])
+        self.assertEqual(trie.find('teams'), [])
+        self.assertEqual(trie.find('x'), [])
+
+    def test_limit(self):
+        trie = PrefixTrie()
+        for i in range(20):
+            trie.insert('note %02d' % i, i)
+        self.assertEqual(trie.find('note', limit=3), [0, 1, 2])
+        self.assertEqual(trie.find('note 1', limit=100), list(range(10, 20)))
+
+    def test_several_values_per_key(self):
+        trie = PrefixTrie()
+        trie.insert('plan', 'a/plan.md')
+        trie.insert('plan', 'b/plan.md')
+        trie.insert('plan', 'a/plan.md')
+        self.assertEqual(trie.find('pl'), ['a/plan.md', 'b/plan.md'])
+        trie.remove('plan', 'a/plan.md')
+        self.assertEqual(trie.find('pl'), ['b/plan.md'])
+
+    def test_remove_prunes_and_merges(self):
+        trie = PrefixTrie()
+        trie.insert('team', 1)
+        trie.insert('tea', 2)
+        trie.insert('test', 3)
+        trie.remove('tea', 2)
+        trie.remove('test', 3)
+        # a single 'team' edge is left below the root
+        self.assertEqual(list(trie.root.edges.values())[0][0], 'team')
+        trie.remove('team', 1)
+        self.assertIsNone(trie.root.edges)
+        trie.remove('missing', 1)
+        self.assertEqual(trie.find(''), [])
+
+    def test_matches_a_sorted_list(self):
+        rand = random.Random(7)
+        trie = PrefixTrie()
+        pairs = set()
+        alphabet = u'abcé '
+        for step in range(3000):
+            key = u''.join(rand.choice(alphabet) for _ in range(rand.randint(1, 6)))
+            value = rand.randint(0, 3)
+            if rand.random() < 0.3 and pairs:
+                key, value = rand.choice(sorted(pairs))
+                trie.remove(key, value)
+                pairs.discard((key, value))
+            else:
+                trie.insert(key, value)
+                pairs.add((key, value))
+            if step % 100 == 0:
+                for prefix in (u'', u'a', u'ab', u'é', u'c b'):
+                    self.assertEqual(sorted(trie.find(prefix)), sorted(brute_find(pairs, prefix)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tests of the shared directory walker. Run from the package root, outside
+Sublime Text:
+
+    python -m unittest discover Tests
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from lib import walker
+from lib.walker import extension_matcher, scan_dir, walk
+
+
+class ExtensionMatcherTest(unittest.TestCase):
+
+    def test_matches_the_extensions_only(self):
+        is_note = extension_matcher(['md', 'txt', 'c++'])
+        self.assertTrue(is_note('a.md'))
+        self.assertTrue(is_note('a.b.txt'))
+        self.assertTrue(is_note('x.c++'))
+        self.assertFalse(is_note('a.mdx'))
+        self.assertFalse(is_note('md'))
+        self.assertFalse(is_note('a.md\n'))
+        self.assertFalse(is_note('a.cxx'))
+
+    def test_case_follows_the_platform(self):
+        self.assertEqual(extension_matcher(['md'])('A.MD'), os.path.normcase('A') == 'a')
+
+
+class WalkerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        for relpath in ('a.md', 'b.png', os.path.join('sub', 'c.md'), os.path.join('sub', 'deep', 'd.md'),
+                        os.path.join('.git', 'e.md'), os.path.join('other', 'f.md')):
+            path = os.path.join(self.root, relpath)
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            open(path, 'w').close()
+        os.makedirs(os.path.join(self.root, 'dir.md'))
+        self.is_note = extension_matcher(['md'])
+        self.scandir = walker.scandir
+
+    def tearDown(self):
+        walker.scandir = self.scandir
+        shutil.rmtree(self.root)
+
+    def listing(self, topdown=True, prune=()):
+        result = []
+        for dirpath, subdirs, notes in walk(self.root, self.is_note, ['.git'], topdown):
+            subdirs[:] = [d for d in subdirs if d not in prune]
+            result.append((os.path.relpath(dirpath, self.root), sorted(subdirs),
+                           sorted(entry.name for entry in notes)))
+        return result
+
+    def test_scan_dir(self):
+        subdirs, notes = scan_dir(self.root, self.is_note, ['.git'])
+        self.assertEqual(sorted(subdirs), ['dir.md', 'other', 'sub'])
+        self.assertEqual([entry.name for entry in notes], ['a.md'])
+        self.assertEqual(notes[0].path, os.path.join(self.root, 'a.md'))
+        self.assertEqual(notes[0].stat().st_size, 0)
+        self.assertEqual(scan_dir(os.path.join(self.root, 'missing'), self.is_note), ([], []))
+
+    def test_walk(self):
+        self.assertEqual(sorted(self.listing()), [
+            ('.', ['dir.md', 'other', 'sub'], ['a.md']),
+            ('dir.md', [], []),
+            ('other', [], ['f.md']),
+            ('sub', ['deep'], ['c.md']),
+            (os.path.join('sub', 'deep'), [], ['d.md']),
+        ])
+
+    def test_pruning_top_down(self):
+        self.assertEqual(sorted(dirpath for dirpath, _, _ in self.listing(prune=['sub'])), ['.', 'dir.md', 'other'])
+
+    def test_bottom_up(self):
+        dirpaths = [dirpath for dirpath, _, _ in self.listing(topdown=False)]
+        self.assertEqual(dirpaths[-1], '.')
+        self.assertLess(dirpaths.index(os.path.join('sub', 'deep')), dirpaths.index('sub'))
+
+    def test_without_scandir(self):
+        expected = sorted(self.listing())
+        walker.scandir = None
+        self.assertEqual(sorted(self.listing()), expected)
+        _, notes = scan_dir(self.root, self.is_note)
+        self.assertEqual(notes[0].stat().st_size, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tests of the background catalog watcher. Run from the package root,
+outside Sublime Text:
+
+    python -m unittest discover Tests
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from lib.catalog import NoteCatalog
+from lib.watcher import Inotify, NotesWatcher
+
+
+def has_inotify():
+    inotify = Inotify.create()
+    if inotify is None:
+        return False
+    inotify.close()
+    return True
+
+
+class WatcherTestMixin(object):
+
+    use_inotify = False
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.root = os.path.join(self.dir, 'notes')
+        os.makedirs(os.path.join(self.root, 'sub'))
+        self.write('a.md')
+        self.catalog = NoteCatalog(self.root, os.path.join(self.dir, 'catalog.json'), ['md'], [], 'Archive')
+        self.watcher = NotesWatcher(self.catalog, poll_interval=0.02, full_scan_interval=300,
+                                    use_inotify=self.use_inotify)
+        self.watcher.start()
+        self.assertTrue(self.watcher.ready.wait(5))
+
+    def tearDown(self):
+        self.watcher.stop()
+        self.watcher.join(5)
+        shutil.rmtree(self.dir)
+
+    def write(self, relpath, text='x'):
+        path = os.path.join(self.root, relpath)
+        with open(path, 'w') as f:
+            f.write(text)
+        return path
+
+    def relpaths(self):
+        return sorted(relpath for relpath, _, _ in self.catalog.iter_notes())
+
+    def wait_for(self, condition):
+        deadline = time.time() + 5
+        while not condition():
+            if time.time() > deadline:
+                self.fail('the watcher did not pick up the change')
+            time.sleep(0.01)
+
+    def test_initial_scan(self):
+        self.assertEqual(self.relpaths(), ['a.md'])
+        self.assertTrue(self.watcher.watches(self.catalog))
+        self.assertFalse(self.watcher.watches(NoteCatalog(self.root, '', ['md'], [], 'Archive')))
+
+    def test_picks_up_new_and_removed_notes(self):
+        self.write(os.path.join('sub', 'b.md'))
+        self.wait_for(lambda: os.path.join('sub', 'b.md') in self.relpaths())
+        os.remove(os.path.join(self.root, 'a.md'))
+        self.wait_for(lambda: 'a.md' not in self.relpaths())
+
+    def test_picks_up_new_folders(self):
+        os.makedirs(os.path.join(self.root, 'new', 'deeper'))
+        self.write(os.path.join('new', 'deeper', 'c.md'))
+        self.wait_for(lambda: os.path.join('new', 'deeper', 'c.md') in self.relpaths())
+        # notes created later in the new folder are seen too
+        self.write(os.path.join('new', 'deeper', 'd.md'))
+        self.wait_for(lambda: os.path.join('new', 'deeper', 'd.md') in self.relpaths())
+
+    def test_stops(self):
+        self.watcher.stop()
+        self.watcher.join(5)
+        self.assertFalse(self.watcher.is_alive())
+        self.assertFalse(self.watcher.watches(self.catalog))
+
+
+class PollingWatcherTest(WatcherTestMixin, unittest.TestCase):
+
+    def test_polls_within_the_budget(self):
+        budgets = []
+        refresh = self.catalog.refresh
+        self.catalog.refresh = lambda budget=None: budgets.append(budget) or refresh(budget)
+        self.wait_for(lambda: len(budgets) >= 2)
+        self.assertEqual(set(budgets), set([self.watcher.max_dirs_per_poll]))
+
+
+@unittest.skipUnless(has_inotify(), 'inotify is not available')
+class InotifyWatcherTest(WatcherTestMixin, unittest.TestCase):
+
+    use_inotify = True
+
+    def test_saves_in_place_are_recorded(self):
+        self.write('a.md', 'much longer text')
+        self.wait_for(lambda: self.catalog.stat('a.md')[1] == len('much longer text'))
+
+
+if __name__ == '__main__':
+    unittest.main()
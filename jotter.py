@@ -3,24 +3,22 @@
 import sublime, sublime_plugin
 import os, time
 
+from .notes_config import settings, get_root, brain_dir
+
 ST3 = int(sublime.version()) >= 3000
 if not ST3:
     from codecs import open
 
 
-def settings():
-    return sublime.load_settings('Notes.sublime-settings')
-
-
-def get_root():
-    return os.path.normpath(os.path.expanduser(settings().get("root")))
-
-def brain_dir():
-    brain_settings = settings().get("jotter_dir")
-    if brain_settings:
-        return brain_settings
-    else:
-        return ".brain"
+def ensure_inbox(root):
+    """Path of the Inbox of `root`, created with its brain directory if missing."""
+    brain = os.path.join(root, brain_dir())
+    inbox = os.path.join(brain, 'Inbox.note')
+    if not os.path.exists(brain):
+        os.makedirs(brain)
+    if not os.path.isfile(inbox):
+        open(inbox, mode='a', encoding='utf-8').close()
+    return inbox
 
 
 class JotterCommand(sublime_plugin.TextCommand):
@@ -53,7 +51,8 @@ class SaveJotAndHidePanelCommand(sublime_plugin.TextCommand):
 
         jot = '# ' + time.strftime(settings().get("jotter_date_format")) + u' — ' + time.strftime(settings().get("jotter_time_format")) + u'\n' + text.rstrip(u'\r\n') + u'\n\n'
 
-        with open(os.path.join(get_root(), brain_dir(), "Inbox.note"), mode='r+', encoding='utf-8') as f:
+        # a project root may have no Inbox yet
+        with open(ensure_inbox(get_root(w)), mode='r+', encoding='utf-8') as f:
             content = f.read()
             f.seek(0, 0)
             f.write(jot + content)
@@ -63,7 +62,5 @@ class SaveJotAndHidePanelCommand(sublime_plugin.TextCommand):
 
 class OpenInboxCommand(sublime_plugin.ApplicationCommand):
     def run(self):
-        root = get_root()
-        inbox = os.path.join(root, brain_dir(), 'Inbox.note')
-        sublime.active_window().open_file(inbox)
+        sublime.active_window().open_file(ensure_inbox(get_root()))
 
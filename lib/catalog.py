@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+
+"""
+Persistent catalog of the notes living under a notes root.
+
+The catalog remembers the mtime of every directory it has listed together
+with the mtime and size of every note in it. A refresh only lists the
+directories whose mtime changed since the last refresh, so an untouched
+tree costs one stat per directory.
+
+Notes are stored per directory: the directory path is kept once, and the
+mtimes (float seconds, as os.stat reports them, so two edits within the
+same second still differ) and sizes of its notes live in arrays next to
+their names.
+
+Editing a note in place does not change the mtime of its directory, so
+callers are expected to report saves through `touch`. Commands that create
+or move notes report them through `add`, `remove` and `move` so the change
+is visible before the next refresh. All public methods are thread safe.
+
+Callables in `listeners` are told about every note that appears or goes
+away, whichever way it was noticed, as `listener(relpath, added)`. They
+run with the catalog locked and should return quickly.
+"""
+
+import os
+import threading
+from array import array
+
+from .helpers import load_json, save_json
+from .walker import extension_matcher, scan_dir
+from .notelist import NoteList
+
+CATALOG_VERSION = 3
+
+# indices into a directory record
+MTIME, SUBDIRS, NAMES, MTIMES, SIZES = range(5)
+
+
+def new_record(mtime=None):
+    return [mtime, [], [], array('d'), array('q')]
+
+
+class NoteCatalog(object):
+
+    def __init__(self, root, path, extensions, exclude, archive_dir):
+        self.root = root
+        self.path = path
+        self.extensions = list(extensions)
+        self.exclude = set(exclude)
+        self.archive_dir = archive_dir
+        self.is_note = extension_matcher(self.extensions)
+        self.dirs = {}  # reldir -> [mtime, subdirs, names, mtimes, sizes]
+        self.dirty = False
+        self.lock = threading.RLock()
+        self.listeners = []
+        self._pending = None
+        self._seen = None
+
+    def is_archived(self, relpath):
+        return relpath == self.archive_dir or relpath.startswith(self.archive_dir + os.path.sep)
+
+    def load(self):
+        with self.lock:
+            return self._load()
+
+    def _load(self):
+        data = load_json(self.path, CATALOG_VERSION, root=self.root, extensions=self.extensions)
+        if data is None:
+            return False
+        self.dirs = dict((reldir, [r[MTIME], r[SUBDIRS], r[NAMES], array('d', r[MTIMES]), array('q', r[SIZES])])
+                         for reldir, r in data.get("dirs", {}).items())
+        return True
+
+    def save(self):
+        with self.lock:
+            self._save()
+
+    def _save(self):
+        if not self.dirty:
+            return
+        data = {
+            "version": CATALOG_VERSION,
+            "root": self.root,
+            "extensions": self.extensions,
+            "dirs": dict((reldir, [r[MTIME], r[SUBDIRS], r[NAMES], r[MTIMES].tolist(), r[SIZES].tolist()])
+                         for reldir, r in self.dirs.items()),
+        }
+        save_json(self.path, data)
+        self.dirty = False
+
+    def refresh(self, budget=None):
+        """Bring the catalog up to date, listing only changed directories.
+
+        With a budget at most that many directories are visited; the walk
+        resumes on the next call. Returns True once a full pass completed.
+        """
+        with self.lock:
+            if self._pending is None:
+                self._pending = ['']
+                self._seen = set()
+            visited = 0
+            while self._pending:
+                if budget is not None and visited >= budget:
+                    return False
+                visited += 1
+                reldir = self._pending.pop()
+                absdir = os.path.join(self.root, reldir)
+                try:
+                    mtime = os.stat(absdir).st_mtime
+                except OSError:
+                    continue
+                self._seen.add(reldir)
+                known = self.dirs.get(reldir)
+                if known is None or known[MTIME] != mtime:
+                    known = self._scan_dir(reldir, absdir, mtime)
+                self._pending.extend(os.path.join(reldir, d) for d in known[SUBDIRS])
+
+            for reldir in [d for d in self.dirs if d not in self._seen]:
+                self._forget_dir(reldir)
+            self._pending = self._seen = None
+            self._save()
+            return True
+
+    def rescan(self, reldir):
+        """Re-list a single directory, e.g. after a filesystem event.
+
+        Returns the directories that became known as a result.
+        """
+        with self.lock:
+            absdir = os.path.join(self.root, reldir)
+            try:
+                mtime = os.stat(absdir).st_mtime
+            except OSError:
+                self._forget_tree(reldir)
+                return []
+            old = self.dirs.get(reldir)
+            old_subdirs = set(old[SUBDIRS]) if old else set()
+            known = self._scan_dir(reldir, absdir, mtime)
+            for name in old_subdirs - set(known[SUBDIRS]):
+                self._forget_tree(os.path.join(reldir, name))
+            # a record made by `add` for a note in a new folder was never listed
+            added = [] if old is not None and old[MTIME] is not None else [reldir]
+            for name in known[SUBDIRS]:
+                subdir = os.path.join(reldir, name)
+                if subdir not in self.dirs or self.dirs[subdir][MTIME] is None:
+                    added.extend(self.rescan(subdir))
+            return added
+
+    def _notify(self, reldir, names, added):
+        for listener in self.listeners:
+            for name in names:
+                listener(os.path.join(reldir, name), added)
+
+    def _scan_dir(self, reldir, absdir, mtime):
+        old = self.dirs.get(reldir)
+        record = new_record(mtime)
+        subdirs, entries = scan_dir(absdir, self.is_note, self.exclude)
+        record[SUBDIRS] = subdirs
+        for entry in entries:
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            record[NAMES].append(entry.name)
+            record[MTIMES].append(st.st_mtime)
+            record[SIZES].append(st.st_size)
+        self.dirs[reldir] = record
+        self.dirty = True
+        if self.listeners:
+            old_names = set(old[NAMES]) if old else set()
+            new_names = set(record[NAMES])
+            self._notify(reldir, old_names - new_names, False)
+            self._notify(reldir, new_names - old_names, True)
+        return record
+
+    def _forget_dir(self, reldir):
+        record = self.dirs.pop(reldir)
+        self.dirty = True
+        self._notify(reldir, record[NAMES], False)
+
+    def _forget_tree(self, reldir):
+        prefix = reldir + os.path.sep
+        for d in [d for d in self.dirs if d == reldir or d.startswith(prefix)]:
+            self._forget_dir(d)
+
+    def _locate(self, abspath):
+        reldir, name = os.path.split(os.path.relpath(abspath, self.root))
+        record = self.dirs.get(reldir)
+        if record is None or name not in record[NAMES]:
+            return reldir, name, record, None
+        return reldir, name, record, record[NAMES].index(name)
+
+    def stat(self, relpath):
+        """Return the recorded (mtime, size) of a note, or None."""
+        with self.lock:
+            _, _, record, i = self._locate(os.path.join(self.root, relpath))
+            if i is None:
+                return None
+            return record[MTIMES][i], record[SIZES][i]
+
+    def touch(self, abspath):
+        """Record a note written in place, e.g. after a save."""
+        with self.lock:
+            _, _, record, i = self._locate(abspath)
+            if i is None:
+                return
+            try:
+                st = os.stat(abspath)
+            except OSError:
+                return
+            record[MTIMES][i] = st.st_mtime
+            record[SIZES][i] = st.st_size
+            self.dirty = True
+
+    def add(self, abspath):
+        """Record a note created (or moved in) under the root."""
+        with self.lock:
+            reldir, name, record, i = self._locate(abspath)
+            if not self.is_note(name):
+                return
+            if i is not None:
+                return self.touch(abspath)
+            try:
+                st = os.stat(abspath)
+            except OSError:
+                return
+            # a directory we have not listed yet gets picked up by the next
+            # refresh, since creating it changed the parent's mtime
+            if record is None:
+                record = self.dirs[reldir] = new_record()
+            record[NAMES].append(name)
+            record[MTIMES].append(st.st_mtime)
+            record[SIZES].append(st.st_size)
+            self.dirty = True
+            self._notify(reldir, [name], True)
+
+    def remove(self, abspath):
+        """Forget a note deleted (or moved away) from the root."""
+        with self.lock:
+            reldir, name, record, i = self._locate(abspath)
+            if i is None:
+                return
+            del record[NAMES][i]
+            del record[MTIMES][i]
+            del record[SIZES][i]
+            self.dirty = True
+            self._notify(reldir, [name], False)
+
+    def move(self, old_abspath, new_abspath):
+        with self.lock:
+            self.remove(old_abspath)
+            self.add(new_abspath)
+
+    def iter_notes(self):
+        """Yield (relpath, mtime, size) for every note, archived or not."""
+        with self.lock:
+            records = [(reldir, r[NAMES][:], r[MTIMES][:], r[SIZES][:]) for reldir, r in self.dirs.items()]
+        for reldir, names, mtimes, sizes in records:
+            for i, name in enumerate(names):
+                yield os.path.join(reldir, name), mtimes[i], sizes[i]
+
+    def entries(self, archived=False):
+        """Return a NoteList of the active (or archived) notes."""
+        dirs, dir_ids, names, mtimes = [], array('I'), [], array('d')
+        with self.lock:
+            for reldir, record in self.dirs.items():
+                if not record[NAMES] or self.is_archived(reldir) != archived:
+                    continue
+                dir_ids.extend(array('I', [len(dirs)]) * len(record[NAMES]))
+                dirs.append(reldir)
+                names.extend(record[NAMES])
+                mtimes.extend(record[MTIMES])
+        return NoteList.sorted(self.root, dirs, dir_ids, names, mtimes,
+                               self.archive_dir if archived else '')
+
+
+def load_snapshot(path, root):
+    """Load the NoteList persisted by `save_snapshot`."""
+    data = load_json(path, CATALOG_VERSION, root=root)
+    if data is None:
+        return None
+    return NoteList.from_json(root, data)
+
+
+def save_snapshot(path, root, entries):
+    """Persist a NoteList, most recent first, column by column."""
+    data = entries.to_json()
+    data["version"] = CATALOG_VERSION
+    data["root"] = root
+    save_json(path, data)
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+
+"""
+Near-duplicate detection with MinHash signatures and LSH banding.
+
+A note is reduced to the set of its word shingles (runs of SHINGLE_SIZE
+words). Its signature keeps, for each of NUM_HASHES hash functions, the
+smallest hash of any shingle; two signatures agree in a slot with a
+probability equal to the Jaccard similarity of the shingle sets.
+
+Instead of comparing every pair of notes, signatures are cut into bands
+and notes sharing a whole band land in the same bucket. Only notes sharing
+a bucket are compared, and pairs whose estimated similarity reaches the
+threshold are merged into clusters.
+
+Signatures are cached per note and mtime, so only changed notes are read.
+"""
+
+import os
+import zlib
+import random
+import threading
+
+from .helpers import load_json, dump_json, write_atomic
+from .search import read_note, tokenize
+
+FINGERPRINTS_VERSION = 1
+SHINGLE_SIZE = 3
+NUM_HASHES = 64
+BANDS = 16
+ROWS = NUM_HASHES // BANDS
+PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+# fixed seed: signatures have to stay comparable across runs
+_rand = random.Random(0x5eed)
+PERMUTATIONS = [(_rand.randrange(1, PRIME), _rand.randrange(0, PRIME)) for _ in range(NUM_HASHES)]
+
+
+def shingles(text):
+    words = tokenize(text)
+    if len(words) < SHINGLE_SIZE:
+        return set([u' '.join(words)]) if words else set()
+    return set(u' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1))
+
+
+def signature(text):
+    """MinHash signature of `text`, None for notes without words."""
+    hashes = [zlib.crc32(s.encode('utf-8')) & MAX_HASH for s in shingles(text)]
+    if not hashes:
+        return None
+    return [min((a * h + b) % PRIME for h in hashes) & MAX_HASH for a, b in PERMUTATIONS]
+
+
+def similarity(a, b):
+    return sum(1 for x, y in zip(a, b) if x == y) / float(NUM_HASHES)
+
+
+def clusters(signatures, threshold=0.8):
+    """Group notes whose estimated similarity reaches `threshold`.
+
+    `signatures` maps relpaths to signatures. Returns lists of relpaths,
+    each with more than one note, along with the best similarity found
+    between two of its members: [(similarity, relpaths)].
+    """
+    buckets = {}
+    for relpath, sig in signatures.items():
+        for band in range(BANDS):
+            key = (band,) + tuple(sig[band * ROWS:(band + 1) * ROWS])
+            buckets.setdefault(key, []).append(relpath)
+
+    parent = {}
+
+    def find(x):
+        while parent.get(x, x) != x:
+            parent[x] = parent.get(parent[x], parent[x])
+            x = parent[x]
+        return x
+
+    compared = set()
+    best = {}
+    for members in buckets.values():
+        if len(members) < 2:
+            continue
+        members.sort()
+        for i, a in enumerate(members):
+            for b in members[i + 1:]:
+                if (a, b) in compared:
+                    continue
+                compared.add((a, b))
+                score = similarity(signatures[a], signatures[b])
+                if score >= threshold:
+                    ra, rb = find(a), find(b)
+                    if ra != rb:
+                        parent[rb] = ra
+                    best[a] = max(best.get(a, 0), score)
+                    best[b] = max(best.get(b, 0), score)
+
+    groups = {}
+    for relpath in best:
+        groups.setdefault(find(relpath), []).append(relpath)
+    return [(max(best.get(p, 0) for p in group), sorted(group)) for group in groups.values()]
+
+
+class Fingerprints(object):
+
+    def __init__(self, root, path):
+        self.root = root
+        self.path = path
+        self.notes = {}  # relpath -> [mtime, signature or None]
+        self.dirty = False
+        self.lock = threading.Lock()
+
+    def load(self):
+        data = load_json(self.path, FINGERPRINTS_VERSION, root=self.root)
+        if data is None:
+            return False
+        with self.lock:
+            self.notes = data["notes"]
+            self.dirty = False
+        return True
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            data = {"version": FINGERPRINTS_VERSION, "root": self.root, "notes": self.notes}
+            blob = dump_json(data)
+            self.dirty = False
+        write_atomic(self.path, blob)
+
+    def sync(self, notes):
+        """Fingerprint new and changed notes, drop removed ones."""
+        seen = set()
+        for relpath, mtime, _ in notes:
+            seen.add(relpath)
+            known = self.notes.get(relpath)
+            if known is None or known[0] != mtime:
+                sig = signature(read_note(os.path.join(self.root, relpath)) or u'')
+                with self.lock:
+                    self.notes[relpath] = [mtime, sig]
+                    self.dirty = True
+        with self.lock:
+            for relpath in [p for p in self.notes if p not in seen]:
+                del self.notes[relpath]
+                self.dirty = True
+        return self
+
+    def signatures(self, keep=None):
+        """relpath -> signature of the fingerprinted notes with words."""
+        with self.lock:
+            return dict((relpath, sig) for relpath, (_, sig) in self.notes.items()
+                        if sig is not None and (keep is None or keep(relpath)))
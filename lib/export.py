@@ -0,0 +1,416 @@
+# -*- coding: utf-8 -*-
+
+"""
+Incremental HTML export of the notes.
+
+Every note is rendered to `<out>/<relpath>.html` with a small markdown
+renderer covering the PlainNotes markup (headings, lists and tasks, fenced
+code, quotes, emphasis, links and images). Links to other notes point to
+their HTML pages; local images are copied next to the pages, those inside
+the root at the same relative path and the others under `_media`.
+
+A manifest in the brain dir records, per note, its mtime and size, the
+SHA-1 of its content and the mtime and size of the local images it refers
+to, null for the missing ones. Notes whose stat is unchanged are skipped
+without being read, notes whose content hash is unchanged without being
+rendered, unless one of their images changed, appeared or disappeared, or
+their page is gone from the output. Each image is copied once, when it
+changed.
+"""
+
+import os
+import io
+import re
+import zlib
+import shutil
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from html import escape
+except ImportError:
+    from cgi import escape
+
+try:
+    from urllib.parse import quote
+except ImportError:
+    from urllib import quote
+
+from .helpers import load_json, dump_json, write_atomic
+from .links import MARKDOWN_LINK_RE, URL_RE
+from .linkcheck import local_path
+
+EXPORT_VERSION = 1
+MEDIA_DIR = '_media'
+
+HEADING_RE = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+FENCE_RE = re.compile(r'^\s*(`{3,}|~{3,})\s*([\w+-]*)')
+RULE_RE = re.compile(r'^\s*([-*_])(\s*\1){2,}\s*$')
+ITEM_RE = re.compile(u'^(\\s*)([-*+]|\\d+[.)]|☐|✔|✘)\\s+(.*)$')
+TAGS_RE = re.compile(r'\s:[^ ]+:\s*$')
+CODE_SPAN_RE = re.compile(r'(`+)(.+?)\1')
+STRONG_RE = re.compile(r'(\*\*|__)(?=\S)(.+?)(?<=\S)\1')
+EM_RE = re.compile(r'(?<![\w*])([*_])(?=\S)(.+?)(?<=\S)\1(?![\w*])')
+STRIKE_RE = re.compile(r'~~(?=\S)(.+?)(?<=\S)~~')
+
+TASKS = {u'☐': 'open', u'✔': 'done', u'✘': 'cancelled'}
+
+PAGE = u'''<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ max-width: 46em; margin: 2em auto; padding: 0 1em; font: 16px/1.5 sans-serif; color: #333; }}
+pre {{ background: #f6f6f6; padding: .5em; overflow: auto; }}
+blockquote {{ border-left: 3px solid #ddd; margin-left: 0; padding-left: 1em; color: #666; }}
+li.task {{ list-style: none; }}
+li.done, li.cancelled {{ color: #999; }}
+li.cancelled {{ text-decoration: line-through; }}
+img {{ max-width: 100%; }}
+</style>
+</head>
+<body>
+{body}
+</body>
+</html>
+'''
+
+
+def render_inline(text, rewrite):
+    """HTML of one line of markdown; `rewrite(kind, target)` maps the
+    targets of links ('link') and images ('image')."""
+    parts = []
+    last = 0
+    # code spans are copied verbatim, everything around them is marked up
+    for m in CODE_SPAN_RE.finditer(text):
+        parts.append(_markup(text[last:m.start()], rewrite))
+        parts.append(u'<code>' + escape(m.group(2).strip(), quote=False) + u'</code>')
+        last = m.end()
+    parts.append(_markup(text[last:], rewrite))
+    return u''.join(parts)
+
+
+def _markup(text, rewrite):
+    out = []
+    last = 0
+    for m in MARKDOWN_LINK_RE.finditer(text):
+        out.append(_emphasis(escape(text[last:m.start()], quote=False)))
+        whole = m.group(0)
+        target = m.group(1) or m.group(2)
+        label = whole[whole.index('[') + 1:whole.index(']')]
+        if whole.startswith('!'):
+            out.append(u'<img src="{0}" alt="{1}">'.format(escape(rewrite('image', target)), escape(label)))
+        else:
+            out.append(u'<a href="{0}">{1}</a>'.format(escape(rewrite('link', target)),
+                                                      _emphasis(escape(label, quote=False))))
+        last = m.end()
+    out.append(_emphasis(escape(text[last:], quote=False)))
+    return u''.join(out)
+
+
+def _emphasis(text):
+    text = STRONG_RE.sub(r'<strong>\2</strong>', text)
+    text = EM_RE.sub(r'<em>\2</em>', text)
+    return STRIKE_RE.sub(r'<del>\1</del>', text)
+
+
+def render(text, rewrite=lambda kind, target: target):
+    """Render a note to an HTML fragment."""
+    html = []
+    lines = text.splitlines()
+    start = 0
+    if lines and lines[0].strip() == '---':
+        for n, line in enumerate(lines[1:]):
+            if line.strip() in ('---', '...'):
+                start = n + 2
+                break
+    paragraph, quote_lines, lists = [], [], []  # lists: stack of (indent, tag)
+
+    def close_paragraph():
+        if paragraph:
+            html.append(u'<p>' + u'<br>\n'.join(render_inline(l, rewrite) for l in paragraph) + u'</p>')
+            del paragraph[:]
+
+    def close_quote():
+        if quote_lines:
+            html.append(u'<blockquote>' + u'<br>\n'.join(render_inline(l, rewrite) for l in quote_lines) + u'</blockquote>')
+            del quote_lines[:]
+
+    def close_lists(indent=-1):
+        while lists and lists[-1][0] > indent:
+            html.append(u'</li></{0}>'.format(lists.pop()[1]))
+
+    def close_all():
+        close_paragraph()
+        close_quote()
+        close_lists()
+
+    i = start
+    while i < len(lines):
+        line = lines[i]
+        i += 1
+        fence = FENCE_RE.match(line)
+        if fence:
+            close_all()
+            marker = fence.group(1)
+            code = []
+            while i < len(lines):
+                closing = FENCE_RE.match(lines[i])
+                i += 1
+                if closing and closing.group(1)[0] == marker[0] and len(closing.group(1)) >= len(marker):
+                    break
+                code.append(lines[i - 1])
+            language = u' class="language-{0}"'.format(fence.group(2)) if fence.group(2) else u''
+            html.append(u'<pre><code{0}>{1}</code></pre>'.format(language, escape(u'\n'.join(code), quote=False)))
+            continue
+        if not line.strip():
+            close_paragraph()
+            close_quote()
+            if lists and not _indented_next(lines, i):
+                close_lists()
+            continue
+        heading = HEADING_RE.match(line)
+        if heading:
+            close_all()
+            level = len(heading.group(1))
+            title = TAGS_RE.sub(u'', u' ' + heading.group(2)).strip()
+            html.append(u'<h{0}>{1}</h{0}>'.format(level, render_inline(title, rewrite)))
+            continue
+        if RULE_RE.match(line):
+            close_all()
+            html.append(u'<hr>')
+            continue
+        if line.lstrip().startswith('>'):
+            close_paragraph()
+            close_lists()
+            quote_lines.append(line.lstrip()[1:].strip())
+            continue
+        item = ITEM_RE.match(line)
+        if item:
+            close_paragraph()
+            close_quote()
+            indent = len(item.group(1).expandtabs(4))
+            bullet = item.group(2)
+            tag = u'ol' if bullet[0].isdigit() else u'ul'
+            close_lists(indent)
+            if lists and lists[-1][0] == indent:
+                html.append(u'</li>')
+            else:
+                lists.append((indent, tag))
+                html.append(u'<{0}>'.format(tag))
+            content = render_inline(item.group(3), rewrite)
+            if bullet in TASKS:
+                html.append(u'<li class="task {0}">{1} {2}'.format(TASKS[bullet], bullet, content))
+            else:
+                html.append(u'<li>' + content)
+            continue
+        if lists and not paragraph:
+            # continuation of a list item
+            html.append(u'<br>' + render_inline(line.strip(), rewrite))
+            continue
+        close_quote()
+        paragraph.append(line.strip())
+    close_all()
+    return u'\n'.join(html)
+
+
+def _indented_next(lines, i):
+    """True when the next non-blank line from `i` on is indented, i.e. a
+    list goes on past the blank lines."""
+    for line in lines[i:]:
+        if line.strip():
+            return line[:1].isspace()
+    return False
+
+
+def page(title, body):
+    return PAGE.format(title=escape(title), body=body)
+
+
+def html_relpath(relpath):
+    return os.path.splitext(relpath)[0] + '.html'
+
+
+def url(source, relpath):
+    """Relative URL from the page of `source` (an output relpath) to `relpath`."""
+    target = os.path.relpath(relpath, os.path.dirname(source) or os.curdir)
+    return quote(target.replace(os.path.sep, '/'))
+
+
+def makedirs(path):
+    # pages are written from several threads at once
+    try:
+        os.makedirs(path)
+    except OSError:
+        if not os.path.isdir(path):
+            raise
+
+
+def file_stat(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime, st.st_size]
+
+
+class HtmlExport(object):
+
+    def __init__(self, root, out_dir, path, extensions, workers=8):
+        self.root = root
+        self.out_dir = out_dir
+        self.path = path
+        self.extensions = tuple('.' + ext.lower() for ext in extensions)
+        self.workers = workers
+        self.notes = {}   # relpath -> [mtime, size, sha, {image path: [mtime, size]}]
+        self.images = {}  # output relpath -> [mtime, size] of the copied image
+        self.copied = set()
+        self.dirty = False
+        self.lock = threading.Lock()
+
+    def load(self):
+        data = load_json(self.path, EXPORT_VERSION, root=self.root, out=self.out_dir)
+        if data is None:
+            return False
+        with self.lock:
+            self.notes = data["notes"]
+            self.images = data["images"]
+            self.dirty = False
+        return True
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            data = {"version": EXPORT_VERSION, "root": self.root, "out": self.out_dir,
+                    "notes": self.notes, "images": self.images}
+            blob = dump_json(data)
+            self.dirty = False
+        write_atomic(self.path, blob)
+
+    def run(self, notes):
+        """Export `notes`, (relpath, mtime, size) tuples, and delete the
+        pages of notes no longer exported.
+
+        Returns (exported, unchanged, removed) relpath lists.
+        """
+        if not os.path.isdir(self.out_dir):
+            # nothing on disk to be incremental about
+            self.notes, self.images = {}, {}
+        self.copied = set()
+        stats = dict((relpath, [mtime, size]) for relpath, mtime, size in notes)
+        stale = [relpath for relpath, stat in stats.items() if not self._unchanged(relpath, stat)]
+        exported = []
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for relpath, written in zip(stale, pool.map(lambda p: self.export(p, stats[p]), stale)):
+                if written:
+                    exported.append(relpath)
+        removed = [relpath for relpath in self.notes if relpath not in stats]
+        for relpath in removed:
+            try:
+                os.remove(os.path.join(self.out_dir, html_relpath(relpath)))
+            except OSError:
+                pass
+            with self.lock:
+                del self.notes[relpath]
+                self.dirty = True
+        if exported or removed or not os.path.exists(os.path.join(self.out_dir, 'index.html')):
+            self.write_index()
+        unchanged = [relpath for relpath in stats if relpath not in exported]
+        return sorted(exported), sorted(unchanged), sorted(removed)
+
+    def _unchanged(self, relpath, stat):
+        entry = self.notes.get(relpath)
+        return (entry is not None and entry[:2] == stat and self._images_unchanged(entry[3]) and
+                self._page_exists(relpath))
+
+    def _page_exists(self, relpath):
+        return os.path.isfile(os.path.join(self.out_dir, html_relpath(relpath)))
+
+    def _images_unchanged(self, images):
+        return all(file_stat(path) == stat for path, stat in images.items())
+
+    def export(self, relpath, stat):
+        """Render one note unless only its stat changed; True when written."""
+        path = os.path.join(self.root, relpath)
+        try:
+            with io.open(path, 'rb') as f:
+                data = f.read()
+        except (IOError, OSError):
+            return False
+        sha = hashlib.sha1(data).hexdigest()
+        entry = self.notes.get(relpath)
+        if (entry is not None and entry[2] == sha and self._images_unchanged(entry[3]) and
+                self._page_exists(relpath)):
+            with self.lock:
+                self.notes[relpath] = stat + entry[2:]
+                self.dirty = True
+            return False
+
+        images = {}
+        out_relpath = html_relpath(relpath)
+
+        def rewrite(kind, target):
+            if URL_RE.match(target) or target.startswith('#'):
+                return target
+            source = local_path(path, target)
+            if source is None:
+                return target
+            if kind == 'image':
+                dest = self.copy_image(source)
+                if dest is None:
+                    # rendered again once the image shows up
+                    images[source] = None
+                    return target
+                images[source] = file_stat(source)
+                return url(out_relpath, dest)
+            fragment = u'#' + target.split('#', 1)[1] if '#' in target else u''
+            if source.lower().endswith(self.extensions):
+                return url(out_relpath, html_relpath(os.path.relpath(source, self.root))) + fragment
+            return target
+
+        body = render(data.decode('utf-8', 'replace'), rewrite)
+        title = os.path.splitext(os.path.basename(relpath))[0]
+        out_path = os.path.join(self.out_dir, out_relpath)
+        makedirs(os.path.dirname(out_path))
+        with io.open(out_path, 'w', encoding='utf-8') as f:
+            f.write(page(title, body))
+        with self.lock:
+            self.notes[relpath] = stat + [sha, images]
+            self.dirty = True
+        return True
+
+    def copy_image(self, source):
+        """Copy an image to the output once; returns its output relpath."""
+        stat = file_stat(source)
+        if stat is None:
+            return None
+        inside = os.path.relpath(source, self.root)
+        if inside.startswith(os.pardir + os.path.sep):
+            name = os.path.basename(source)
+            dest = os.path.join(MEDIA_DIR, '{0:08x}-{1}'.format(zlib.crc32(source.encode('utf-8')) & 0xffffffff, name))
+        else:
+            dest = inside
+        with self.lock:
+            if dest in self.copied or self.images.get(dest) == stat:
+                return dest
+            self.copied.add(dest)
+        dest_path = os.path.join(self.out_dir, dest)
+        makedirs(os.path.dirname(dest_path))
+        shutil.copy2(source, dest_path)
+        with self.lock:
+            self.images[dest] = stat
+            self.dirty = True
+        return dest
+
+    def write_index(self):
+        with self.lock:
+            relpaths = sorted(self.notes)
+        items = [u'<li><a href="{0}">{1}</a></li>'.format(url('index.html', html_relpath(relpath)),
+                                                        escape(os.path.splitext(relpath)[0].replace(os.path.sep, '/')))
+                 for relpath in relpaths]
+        makedirs(self.out_dir)
+        with io.open(os.path.join(self.out_dir, 'index.html'), 'w', encoding='utf-8') as f:
+            f.write(page(u'Notes', u'<h1>Notes</h1>\n<ul>\n' + u'\n'.join(items) + u'\n</ul>'))
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+"""
+YAML front matter of notes, as written by NoteInsertTitleCommand.
+
+Only the head of each file is read, and the parser understands the small
+subset of YAML used in note headers: `key: value` pairs, inline lists
+(`[a, b]`) and block lists (`- a`). Parsed headers are cached by path and
+mtime, so listing notes again never re-reads a file that did not change.
+"""
+
+import os
+import io
+import threading
+
+from .helpers import load_json, dump_json, write_atomic
+
+HEAD_BYTES = 4096
+METADATA_VERSION = 1
+
+
+def _scalar(value):
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in '"\'':
+        value = value[1:-1]
+    return value
+
+
+def parse_front_matter(text):
+    """Return the front matter of `text` as a dict, {} if there is none."""
+    lines = text.splitlines()
+    if not lines or lines[0].strip() != '---':
+        return {}
+    meta = {}
+    key = None
+    for line in lines[1:]:
+        stripped = line.strip()
+        if stripped in ('---', '...'):
+            return meta
+        if not stripped or stripped.startswith('#'):
+            continue
+        if stripped.startswith('- ') and key is not None:
+            if not isinstance(meta[key], list):
+                meta[key] = [meta[key]] if meta[key] else []
+            meta[key].append(_scalar(stripped[2:]))
+            continue
+        if ':' not in line:
+            continue
+        key, value = line.split(':', 1)
+        key = key.strip().lower()
+        value = value.strip()
+        if value.startswith('[') and value.endswith(']'):
+            meta[key] = [_scalar(v) for v in value[1:-1].split(',') if v.strip()]
+        else:
+            meta[key] = _scalar(value)
+    # no closing marker within the head of the file: not a front matter
+    return {}
+
+
+def read_front_matter(path, head_bytes=HEAD_BYTES):
+    try:
+        with io.open(path, 'rb') as f:
+            head = f.read(head_bytes)
+    except (IOError, OSError):
+        return {}
+    return parse_front_matter(head.decode('utf-8', 'replace'))
+
+
+def tags_of(meta):
+    """Normalize the `tags` entry to a list of strings."""
+    tags = meta.get("tags") or []
+    if not isinstance(tags, list):
+        tags = tags.replace(',', ' ').split()
+    return [t.strip().strip('#') for t in tags if t.strip().strip('#')]
+
+
+class MetadataCache(object):
+    """Front matter of the notes under a root, keyed by relpath and mtime."""
+
+    def __init__(self, root, path, head_bytes=HEAD_BYTES):
+        self.root = root
+        self.path = path
+        self.head_bytes = head_bytes
+        self.entries = {}  # relpath -> [mtime, meta]
+        self.dirty = False
+        self.lock = threading.Lock()
+
+    def load(self):
+        data = load_json(self.path, METADATA_VERSION, root=self.root)
+        if data is None:
+            return False
+        with self.lock:
+            self.entries = data.get("entries", {})
+        return True
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            data = {"version": METADATA_VERSION, "root": self.root, "entries": self.entries}
+            blob = dump_json(data)
+            self.dirty = False
+        write_atomic(self.path, blob)
+
+    def get(self, relpath, mtime):
+        """Return the front matter of a note whose current mtime is known."""
+        cached = self.entries.get(relpath)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        meta = read_front_matter(os.path.join(self.root, relpath), self.head_bytes)
+        with self.lock:
+            self.entries[relpath] = [mtime, meta]
+            self.dirty = True
+        return meta
+
+    def prune(self, relpaths):
+        """Drop the cached headers of notes that are not in `relpaths`."""
+        relpaths = set(relpaths)
+        with self.lock:
+            for relpath in [p for p in self.entries if p not in relpaths]:
+                del self.entries[relpath]
+                self.dirty = True
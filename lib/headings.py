@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+
+"""
+Heading index over all the notes of a root.
+
+Every `#` heading outside fenced code blocks and front matter is recorded
+as [level, text, line], per note, along with the note's mtime. Text is
+cleaned up the way the Symbol List preferences do it (closing hashes and
+`:tags:` removed). Syncing only re-parses notes whose mtime changed.
+"""
+
+import os
+import re
+import threading
+
+from .helpers import load_json, dump_json, write_atomic
+from .search import read_note
+
+HEADINGS_VERSION = 1
+HEADING_RE = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+FENCE_RE = re.compile(r'^\s*(`{3,}|~{3,})')
+TAGS_RE = re.compile(r':[^ ]+:')
+
+
+def parse_headings(text):
+    """Return [level, text, line number] lists for the headings of `text`."""
+    headings = []
+    fence = None
+    lines = text.splitlines()
+    start = 0
+    if lines and lines[0].strip() == '---':
+        for n, line in enumerate(lines[1:]):
+            if line.strip() in ('---', '...'):
+                start = n + 2
+                break
+    for number in range(start, len(lines)):
+        line = lines[number]
+        m = FENCE_RE.match(line)
+        if m:
+            marker = m.group(1)
+            if fence is None:
+                fence = marker
+            elif marker[0] == fence[0] and len(marker) >= len(fence):
+                fence = None
+            continue
+        if fence is not None or not line.startswith('#'):
+            continue
+        m = HEADING_RE.match(line)
+        if m:
+            title = TAGS_RE.sub('', m.group(2)).strip()
+            if title:
+                headings.append([len(m.group(1)), title, number + 1])
+    return headings
+
+
+class HeadingIndex(object):
+
+    def __init__(self, root, path):
+        self.root = root
+        self.path = path
+        self.notes = {}  # relpath -> [mtime, headings]
+        self.dirty = False
+        self.lock = threading.Lock()
+
+    def load(self):
+        data = load_json(self.path, HEADINGS_VERSION, root=self.root)
+        if data is None:
+            return False
+        with self.lock:
+            self.notes = data["notes"]
+            self.dirty = False
+        return True
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            data = {"version": HEADINGS_VERSION, "root": self.root, "notes": self.notes}
+            blob = dump_json(data)
+            self.dirty = False
+        write_atomic(self.path, blob)
+
+    def sync(self, notes):
+        """Re-parse the headings of new and changed notes, drop removed ones."""
+        seen = set()
+        for relpath, mtime, _ in notes:
+            seen.add(relpath)
+            known = self.notes.get(relpath)
+            if known is None or known[0] != mtime:
+                self.update(relpath, mtime)
+        with self.lock:
+            for relpath in [p for p in self.notes if p not in seen]:
+                del self.notes[relpath]
+                self.dirty = True
+        return self
+
+    def update(self, relpath, mtime, text=None):
+        """Re-parse one note, from `text` when the caller already has it."""
+        if text is None:
+            text = read_note(os.path.join(self.root, relpath)) or u''
+        headings = parse_headings(text)
+        with self.lock:
+            self.notes[relpath] = [mtime, headings]
+            self.dirty = True
+
+    def remove(self, relpath):
+        with self.lock:
+            if self.notes.pop(relpath, None) is not None:
+                self.dirty = True
+
+    def headings(self, keep=None):
+        """Return (relpath, level, text, line) for every heading, sorted by
+        note and line; `keep` filters on the relpath."""
+        with self.lock:
+            notes = sorted(self.notes.items())
+        return [(relpath, level, text, line)
+                for relpath, (_, headings) in notes if keep is None or keep(relpath)
+                for level, text, line in headings]
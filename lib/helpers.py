@@ -2,6 +2,68 @@
 
 # Helper functions
 
+import io
+import os
+import json
+import zlib
+import shutil
+
+
 def return_sublist(main_list, indices ):
     sublist = [[item[i] for i in indices] for item in main_list]
-    return sublist
\ No newline at end of file
+    return sublist
+
+
+def read_text(path):
+    # newline='' keeps the line endings of the file as they are. Decoding
+    # is strict: a note that is not UTF-8 raises UnicodeDecodeError rather
+    # than being rewritten with its other bytes replaced
+    with io.open(path, 'r', encoding='utf-8', newline='') as f:
+        return f.read()
+
+
+def write_atomic(path, text, sync=False):
+    # write next to the target and rename over it, so readers (and sync
+    # clients) never see a half written note. `sync` makes the content
+    # durable before the rename, for files a crash must not leave empty.
+    # Bytes are written as they are
+    tmp_path = path + '.tmp'
+    if isinstance(text, bytes):
+        f = io.open(tmp_path, 'wb')
+    else:
+        f = io.open(tmp_path, 'w', encoding='utf-8', newline='')
+    with f:
+        f.write(text)
+        if sync:
+            f.flush()
+            os.fsync(f.fileno())
+    if os.path.exists(path):
+        shutil.copymode(path, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def load_json(path, version, compressed=False, **expected):
+    """Data of a store written by `save_json`, or None when it is missing,
+    unreadable, of another version or when one of the `expected` values
+    (e.g. root=...) differs."""
+    try:
+        with io.open(path, 'rb') as f:
+            blob = f.read()
+        data = json.loads((zlib.decompress(blob) if compressed else blob).decode('utf-8'))
+    except (IOError, OSError, ValueError, zlib.error):
+        return None
+    if not isinstance(data, dict) or data.get("version") != version:
+        return None
+    if any(data.get(key) != value for key, value in expected.items()):
+        return None
+    return data
+
+
+def dump_json(data, compressed=False):
+    # stores dump their data under their lock and write it outside
+    blob = json.dumps(data, separators=(',', ':'))
+    return zlib.compress(blob.encode('utf-8'), 1) if compressed else blob
+
+
+def save_json(path, data, compressed=False, sync=False):
+    write_atomic(path, dump_json(data, compressed), sync)
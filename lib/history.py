@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+"""
+Content-addressed version history of notes.
+
+Every version of a note is stored once, keyed by the SHA-1 of its bytes,
+in a NotePack. A version is compressed with the previous version of the
+same note as zlib dictionary, so it costs roughly the bytes that changed;
+every MAX_DEPTH versions a full copy bounds the chain to replay when
+reading. Saving a note whose content did not change costs nothing.
+
+Which note had which content when is kept in an append-only log of
+`time <tab> sha <tab> relpath` lines. The pack index is only rewritten
+every SAVE_EVERY new versions and on `save()`; log lines whose version
+did not make it into the index are dropped when loading.
+"""
+
+import os
+import io
+import zlib
+import time
+import hashlib
+import threading
+
+from .pack import NotePack
+
+MAX_DEPTH = 16
+SAVE_EVERY = 20
+FULL, DELTA = b'F', b'D'
+
+
+def content_id(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+class NoteHistory(object):
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.objects = NotePack(os.path.join(directory, 'objects.json'))
+        self.log_path = os.path.join(directory, 'log.txt')
+        self.versions = None  # relpath -> [(time, sha)], oldest first
+        self.unsaved = 0
+        self.lock = threading.Lock()
+
+    def load(self):
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        self.objects.load()
+        versions = {}
+        try:
+            with io.open(self.log_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    parts = line.rstrip('\n').split('\t', 2)
+                    if len(parts) == 3 and parts[1] in self.objects:
+                        versions.setdefault(parts[2], []).append((float(parts[0]), parts[1]))
+        except (IOError, OSError):
+            pass
+        self.versions = versions
+
+    def snapshot(self, relpath, data, when=None):
+        """Record `data` as the current content of a note.
+
+        Returns the content id, or None when it matches the last version.
+        """
+        sha = content_id(data)
+        with self.lock:
+            known = self.versions.setdefault(relpath, [])
+            if known and known[-1][1] == sha:
+                return None
+            if sha not in self.objects:
+                self._store(sha, data, known[-1][1] if known else None)
+            when = time.time() if when is None else when
+            with io.open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(u'{0:.0f}\t{1}\t{2}\n'.format(when, sha, relpath))
+            known.append((when, sha))
+        return sha
+
+    def _store(self, sha, data, base):
+        depth = self._depth(base) + 1 if base in self.objects else MAX_DEPTH
+        if depth < MAX_DEPTH:
+            compressor = zlib.compressobj(9, zlib.DEFLATED, 15, 9, zlib.Z_DEFAULT_STRATEGY, self._read(base))
+            blob = DELTA + bytearray([depth]) + base.encode('ascii') + compressor.compress(data) + compressor.flush()
+        else:
+            blob = FULL + bytes(bytearray([0])) + zlib.compress(data, 9)
+        self.objects.add(sha, bytes(blob), int(time.time()), compress=False)
+        self.unsaved += 1
+        if self.unsaved >= SAVE_EVERY:
+            self._save()
+
+    def save(self):
+        with self.lock:
+            self._save()
+
+    def _save(self):
+        self.objects.save()
+        self.unsaved = 0
+
+    def _depth(self, sha):
+        return bytearray(self.objects.read(sha, compress=False)[1:2])[0]
+
+    def _read(self, sha):
+        blob = self.objects.read(sha, compress=False)
+        if blob[:1] == FULL:
+            return zlib.decompress(blob[2:])
+        base = blob[2:42].decode('ascii')
+        decompressor = zlib.decompressobj(15, self._read(base))
+        return decompressor.decompress(blob[42:]) + decompressor.flush()
+
+    def read(self, sha):
+        with self.lock:
+            return self._read(sha)
+
+    def history(self, relpath):
+        """Return the (time, sha) versions of a note, newest first."""
+        with self.lock:
+            return list(reversed(self.versions.get(relpath, [])))
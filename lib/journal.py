@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+
+"""
+Journaled key -> record store, used for the brain (per-note color schemes).
+
+The records live in a JSON snapshot, in the same format brain.json always
+had. Changes are not written by rewriting the snapshot: `flush()` appends
+one `[key, record]` line per changed key (a null record for a removed
+one) to a journal next to it, and loading replays the journal over the
+snapshot. A line cut short by a crash is dropped when loading.
+
+Once the journal outgrows the snapshot (and COMPACT_BYTES), it is folded
+into a new snapshot on a background thread: the records are copied under
+the lock, then written to a temporary file, synced and swapped in without
+holding it. Only then is the folded part of the journal dropped, keeping
+the lines appended meanwhile; replaying folded lines over the new
+snapshot again is harmless, so a crash at any point leaves a consistent
+store.
+"""
+
+import os
+import io
+import json
+import threading
+
+from .helpers import write_atomic
+
+COMPACT_BYTES = 64 * 1024
+
+
+class JournaledStore(object):
+
+    def __init__(self, path, compact_bytes=COMPACT_BYTES):
+        self.path = path
+        self.journal_path = os.path.splitext(path)[0] + '.journal'
+        self.compact_bytes = compact_bytes
+        self.records = {}
+        self.pending = set()
+        self.journal_size = 0
+        self.snapshot_size = 0
+        self.compacting = False
+        self.lock = threading.RLock()
+
+    def load(self):
+        records = {}
+        try:
+            with open(self.path, 'r') as f:
+                records = json.load(f)
+            self.snapshot_size = os.path.getsize(self.path)
+        except (IOError, OSError, ValueError):
+            self.snapshot_size = 0
+        self.journal_size = 0
+        try:
+            with open(self.journal_path, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break  # torn write
+                    self.journal_size += len(line)
+                    try:
+                        key, record = json.loads(line.decode('utf-8'))
+                        if record is None:
+                            records.pop(key, None)
+                        else:
+                            records[key] = record
+                    except (ValueError, TypeError):
+                        continue  # not a [key, record] line
+            if os.path.getsize(self.journal_path) != self.journal_size:
+                # drop the torn tail, or the next change would be appended to it
+                with open(self.journal_path, 'r+b') as f:
+                    f.truncate(self.journal_size)
+        except (IOError, OSError):
+            pass
+        with self.lock:
+            self.records = records
+            self.pending = set()
+
+    def get(self, key, default=None):
+        return self.records.get(key, default)
+
+    def __getitem__(self, key):
+        return self.records[key]
+
+    def __contains__(self, key):
+        return key in self.records
+
+    def __iter__(self):
+        return iter(list(self.records))
+
+    def __len__(self):
+        return len(self.records)
+
+    def set(self, key, record):
+        with self.lock:
+            self.records[key] = record
+            self.pending.add(key)
+
+    def pop(self, key, default=None):
+        with self.lock:
+            if key not in self.records:
+                return default
+            self.pending.add(key)
+            return self.records.pop(key)
+
+    def flush(self):
+        """Append the changes since the last flush to the journal."""
+        with self.lock:
+            if not self.pending:
+                return
+            blob = u''.join(json.dumps([key, self.records.get(key)], sort_keys=True) + u'\n'
+                            for key in sorted(self.pending))
+            self.pending = set()
+            with io.open(self.journal_path, 'a', encoding='utf-8') as f:
+                f.write(blob)
+            self.journal_size += len(blob.encode('utf-8'))
+            if (self.journal_size > max(self.compact_bytes, self.snapshot_size) and
+                    not self.compacting):
+                self.compacting = True
+                threading.Thread(target=self.compact).start()
+
+    def compact(self):
+        """Fold the journal into a new snapshot."""
+        try:
+            with self.lock:
+                self.flush()
+                records = dict(self.records)
+                folded = self.journal_size
+            write_atomic(self.path, json.dumps(records, indent=4, sort_keys=True), sync=True)
+            snapshot_size = os.path.getsize(self.path)
+            with self.lock:
+                # keep what was flushed while the snapshot was being written
+                with open(self.journal_path, 'rb') as f:
+                    f.seek(folded)
+                    tail = f.read()
+                write_atomic(self.journal_path, tail.decode('utf-8'), sync=True)
+                self.snapshot_size = snapshot_size
+                self.journal_size = len(tail)
+        finally:
+            self.compacting = False
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+
+"""
+Dead link and missing image checker for the whole notes corpus.
+
+Every markdown link and image of every note is resolved the way
+note_support.Path does it (relative to the note, backslashes removed);
+local targets must exist on disk. Remote URLs are optionally checked with
+HEAD requests on a separate, smaller pool with a per-request timeout, each
+distinct URL once per run.
+
+The references of each note are cached per mtime in the brain dir, so a
+rerun only re-reads the notes edited since the previous run; their local
+targets are looked up again on every run, as a target can disappear or
+show up without the linking note changing. URL statuses are cached for
+`url_ttl` seconds.
+"""
+
+import os
+import time
+import socket
+from concurrent.futures import ThreadPoolExecutor
+
+import threading
+from http.client import HTTPException
+from urllib import request
+from urllib.error import HTTPError, URLError
+from urllib.parse import unquote
+
+from .helpers import load_json, dump_json, write_atomic
+from .links import MARKDOWN_LINK_RE, URL_RE
+from .search import read_note
+
+LINKCHECK_VERSION = 2
+URL_TTL = 24 * 3600
+
+
+def is_url(target):
+    return target.startswith('http://') or target.startswith('https://')
+
+
+def references(text):
+    """Yield (line number, kind, target) for the links and images of a note."""
+    for number, line in enumerate(text.splitlines()):
+        if '](' not in line:
+            continue
+        for m in MARKDOWN_LINK_RE.finditer(line):
+            kind = 'image' if m.group(0).startswith('!') else 'link'
+            yield number + 1, kind, m.group(1) or m.group(2)
+
+
+def local_path(note_path, target):
+    target = unquote(target.replace('\\', '').split('#', 1)[0])
+    if not target:
+        return None
+    return os.path.normpath(os.path.join(os.path.dirname(note_path), os.path.expanduser(target)))
+
+
+def parse_note(path):
+    """Return (local, urls) references of one note.
+
+    local are [line, kind, target, resolved path] lists, urls the
+    [line, kind, target] references left for the remote check.
+    """
+    text = read_note(path)
+    if text is None:
+        return [], []
+    local, urls = [], []
+    for line, kind, target in references(text):
+        if is_url(target):
+            urls.append([line, kind, target])
+        elif target.startswith('#') or URL_RE.match(target):
+            continue  # anchors, mailto: and other schemes
+        else:
+            resolved = local_path(path, target)
+            if resolved is not None:
+                local.append([line, kind, target, resolved])
+    return local, urls
+
+
+def missing(local, exists=os.path.exists):
+    """[line, kind, target, 'missing'] for the local references whose target is gone."""
+    return [[line, kind, target, 'missing'] for line, kind, target, resolved in local if not exists(resolved)]
+
+
+def check_note(path):
+    """Return (problems, urls) of one note, see `parse_note` and `missing`."""
+    local, urls = parse_note(path)
+    return missing(local), urls
+
+
+def check_url(url, timeout, proxies=None):
+    """Return None when `url` answers, else a short reason."""
+    opener = request.build_opener(request.ProxyHandler(proxies)) if proxies else request.build_opener()
+    for method in ('HEAD', 'GET'):
+        try:
+            req = request.Request(url, method=method, headers={'User-Agent': 'PlainNotes link checker'})
+            opener.open(req, timeout=timeout).close()
+            return None
+        except HTTPError as e:
+            # some servers refuse HEAD; retry those with GET
+            if method == 'HEAD' and e.code in (400, 403, 405, 501):
+                continue
+            return 'HTTP {0}'.format(e.code)
+        except (URLError, socket.timeout, IOError) as e:
+            return 'unreachable ({0})'.format(getattr(e, 'reason', e))
+        except HTTPException as e:
+            return 'bad response ({0})'.format(e.__class__.__name__)
+        except ValueError:
+            # malformed, e.g. "http://[::1"
+            return 'invalid URL'
+    return None
+
+
+class LinkChecker(object):
+
+    def __init__(self, root, path, workers=8, url_workers=4, timeout=5, proxies=None, url_ttl=URL_TTL):
+        self.root = root
+        self.path = path
+        self.workers = workers
+        self.url_workers = url_workers
+        self.timeout = timeout
+        self.proxies = proxies
+        self.url_ttl = url_ttl
+        self.cache = {}  # relpath -> [mtime, local references, url references]
+        self.urls = {}   # url -> [checked at, reason or None]
+        self.dirty = False
+        self.lock = threading.Lock()
+
+    def load(self):
+        data = load_json(self.path, LINKCHECK_VERSION, root=self.root)
+        if data is None:
+            return False
+        with self.lock:
+            self.cache = data["cache"]
+            self.urls = data["urls"]
+        return True
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            data = {"version": LINKCHECK_VERSION, "root": self.root, "cache": self.cache, "urls": self.urls}
+            blob = dump_json(data)
+            self.dirty = False
+        write_atomic(self.path, blob)
+
+    def run(self, notes, check_remote=False):
+        """Check `notes`, (relpath, mtime, size) tuples; returns
+        {relpath: sorted problems} for the notes that have any."""
+        mtimes = dict((relpath, mtime) for relpath, mtime, _ in notes)
+        stale = [relpath for relpath, mtime in mtimes.items()
+                 if relpath not in self.cache or self.cache[relpath][0] != mtime]
+        paths = [os.path.join(self.root, relpath) for relpath in stale]
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for relpath, (local, urls) in zip(stale, pool.map(parse_note, paths)):
+                with self.lock:
+                    self.cache[relpath] = [mtimes[relpath], local, urls]
+                    self.dirty = True
+        with self.lock:
+            for relpath in [p for p in self.cache if p not in mtimes]:
+                del self.cache[relpath]
+                self.dirty = True
+
+        # targets are looked up again, once per run however many notes link them
+        targets = set(ref[3] for relpath in mtimes for ref in self.cache[relpath][1])
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            found = set(target for target, exists in zip(targets, pool.map(os.path.exists, targets)) if exists)
+        if check_remote:
+            self._check_remote(set(ref[2] for relpath in mtimes for ref in self.cache[relpath][2]))
+
+        report = {}
+        for relpath in mtimes:
+            _, local, urls = self.cache[relpath]
+            problems = missing(local, found.__contains__)
+            if check_remote:
+                problems += [[line, kind, url, self.urls[url][1]] for line, kind, url in urls if self.urls[url][1]]
+            if problems:
+                report[relpath] = sorted(problems)
+        return report
+
+    def _check_remote(self, urls):
+        """Check the `urls` not checked in the last `url_ttl` seconds."""
+        now = time.time()
+        with self.lock:
+            for url in [u for u in self.urls if u not in urls]:
+                del self.urls[url]
+                self.dirty = True
+            due = sorted(url for url in urls if url not in self.urls or now - self.urls[url][0] >= self.url_ttl)
+        with ThreadPoolExecutor(max_workers=self.url_workers) as pool:
+            status = list(pool.map(lambda url: check_url(url, self.timeout, self.proxies), due))
+        with self.lock:
+            for url, reason in zip(due, status):
+                self.urls[url] = [now, reason]
+                self.dirty = True
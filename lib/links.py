@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+
+"""
+Link graph between notes.
+
+Two kinds of links are recognised:
+
+- markdown links and images, `[text](path/to/note.md)`, resolved relative
+  to the linking note; URLs are ignored
+- wiki links, `[[Title]]` or `[[Title|label]]`, matching a note whose file
+  name without extension is Title (case-insensitive)
+
+The graph keeps the outgoing links of every note along with its mtime and
+an inverted target -> sources map for backlinks. Syncing only re-parses
+notes whose mtime changed, and `update` re-parses a single note.
+"""
+
+import os
+import io
+import re
+import threading
+
+try:
+    from urllib.parse import quote, unquote
+except ImportError:
+    from urllib import quote, unquote
+
+from .helpers import load_json, dump_json, write_atomic
+
+LINKS_VERSION = 1
+MARKDOWN_LINK_RE = re.compile(r'!?\[[^\]\n]*\]\(\s*(?:<([^>\n]+)>|([^)\s]+))(?:\s+["\'][^)\n]*["\'])?\s*\)')
+WIKI_LINK_RE = re.compile(r'\[\[([^\]\|#\n]+)(?:#[^\]\|\n]*)?(?:\|[^\]\n]*)?\]\]')
+URL_RE = re.compile(r'^[a-zA-Z][a-zA-Z0-9+.-]*:')
+
+
+def title_key(title):
+    return u'title:' + title.strip().lower()
+
+
+def note_title_key(relpath):
+    return title_key(os.path.splitext(os.path.basename(relpath))[0])
+
+
+def resolve(source, target):
+    """Relpath a markdown link of `source` points to, or None."""
+    if URL_RE.match(target) or target.startswith('#'):
+        return None
+    target = unquote(target.split('#', 1)[0].replace('\\', ''))
+    if not target:
+        return None
+    relpath = os.path.normpath(os.path.join(os.path.dirname(source), target))
+    if relpath.startswith(os.pardir + os.path.sep) or os.path.isabs(relpath):
+        return None
+    return relpath
+
+
+def parse_links(source, text):
+    """Return [kind, raw target, key] lists for the links in `text`.
+
+    `key` is the relpath of the target for markdown links and a title key
+    for wiki links; links to URLs are dropped.
+    """
+    links = []
+    for m in MARKDOWN_LINK_RE.finditer(text):
+        target = m.group(1) or m.group(2)
+        relpath = resolve(source, target)
+        if relpath is not None:
+            links.append(['md', target, relpath])
+    for m in WIKI_LINK_RE.finditer(text):
+        title = m.group(1).strip()
+        if title:
+            links.append(['wiki', title, title_key(os.path.basename(title))])
+    return links
+
+
+def relative_link(source, relpath):
+    """Markdown link target from note `source` to `relpath`."""
+    target = os.path.relpath(relpath, os.path.dirname(source) or os.curdir)
+    return target.replace(os.path.sep, '/')
+
+
+def rewrite_links(text, old_source, new_source, moves):
+    """Update the links of a note for a batch of moves.
+
+    `moves` maps old relpaths to new ones; the note itself moves from
+    `old_source` to `new_source` (which may be the same). Markdown links
+    are re-relativised, wiki links follow renamed file names.
+    """
+    def markdown(m):
+        group = 1 if m.group(1) is not None else 2
+        target = m.group(group)
+        relpath = resolve(old_source, target)
+        if relpath is None:
+            return m.group(0)
+        new_relpath = moves.get(relpath, relpath)
+        if new_relpath == relpath and new_source == old_source:
+            return m.group(0)
+        new_target = relative_link(new_source, new_relpath)
+        if '%' in target or (group == 2 and ' ' in new_target):
+            new_target = quote(new_target)
+        if '#' in target:
+            new_target += '#' + target.split('#', 1)[1]
+        start, end = m.start(group) - m.start(0), m.end(group) - m.start(0)
+        return m.group(0)[:start] + new_target + m.group(0)[end:]
+
+    renamed = {}
+    for old, new in moves.items():
+        old_title = os.path.splitext(os.path.basename(old))[0]
+        new_title = os.path.splitext(os.path.basename(new))[0]
+        if old_title != new_title:
+            renamed[old_title.lower()] = new_title
+
+    def wiki(m):
+        title = m.group(1).strip()
+        head, base = title.rsplit('/', 1) if '/' in title else ('', title)
+        new_title = renamed.get(base.lower())
+        if new_title is None:
+            return m.group(0)
+        new_title = head + '/' + new_title if head else new_title
+        start, end = m.start(1) - m.start(0), m.end(1) - m.start(0)
+        return m.group(0)[:start] + new_title + m.group(0)[end:]
+
+    text = MARKDOWN_LINK_RE.sub(markdown, text)
+    if renamed:
+        text = WIKI_LINK_RE.sub(wiki, text)
+    return text
+
+
+class LinkGraph(object):
+
+    def __init__(self, root, path):
+        self.root = root
+        self.path = path
+        self.outgoing = {}  # relpath -> [mtime, links]
+        self.incoming = {}  # key -> set of source relpaths
+        self.dirty = False
+        self.lock = threading.RLock()
+
+    def load(self):
+        data = load_json(self.path, LINKS_VERSION, root=self.root)
+        if data is None:
+            return False
+        with self.lock:
+            self.outgoing = {}
+            self.incoming = {}
+            for relpath, (mtime, links) in data["outgoing"].items():
+                self._set(relpath, mtime, links)
+            self.dirty = False
+        return True
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            data = {"version": LINKS_VERSION, "root": self.root, "outgoing": self.outgoing}
+            blob = dump_json(data)
+            self.dirty = False
+        write_atomic(self.path, blob)
+
+    def sync(self, notes):
+        """Re-parse the links of new and changed notes, drop removed ones."""
+        seen = set()
+        for relpath, mtime, _ in notes:
+            seen.add(relpath)
+            known = self.outgoing.get(relpath)
+            if known is None or known[0] != mtime:
+                self.update(relpath, mtime)
+        with self.lock:
+            for relpath in [p for p in self.outgoing if p not in seen]:
+                self._unset(relpath)
+        return self
+
+    def update(self, relpath, mtime, text=None):
+        """Re-parse one note, from `text` when the caller already has it."""
+        if text is None:
+            try:
+                with io.open(os.path.join(self.root, relpath), 'r', encoding='utf-8', errors='replace') as f:
+                    text = f.read()
+            except (IOError, OSError):
+                text = u''
+        links = parse_links(relpath, text)
+        with self.lock:
+            self._unset(relpath)
+            self._set(relpath, mtime, links)
+
+    def remove(self, relpath):
+        with self.lock:
+            self._unset(relpath)
+
+    def _set(self, relpath, mtime, links):
+        self.outgoing[relpath] = [mtime, links]
+        for _, _, key in links:
+            self.incoming.setdefault(key, set()).add(relpath)
+        self.dirty = True
+
+    def _unset(self, relpath):
+        known = self.outgoing.pop(relpath, None)
+        if known is None:
+            return
+        for _, _, key in known[1]:
+            sources = self.incoming.get(key)
+            if sources is not None:
+                sources.discard(relpath)
+                if not sources:
+                    del self.incoming[key]
+        self.dirty = True
+
+    def backlinks(self, relpath):
+        """Sorted relpaths of the notes linking to `relpath`."""
+        with self.lock:
+            sources = set(self.incoming.get(relpath, ()))
+            sources.update(self.incoming.get(note_title_key(relpath), ()))
+        sources.discard(relpath)
+        return sorted(sources)
+
+    def links_to(self, source, relpath):
+        """The links of `source` that point to `relpath`."""
+        keys = (relpath, note_title_key(relpath))
+        with self.lock:
+            known = self.outgoing.get(source)
+            return [link for link in known[1] if link[2] in keys] if known else []
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+
+"""
+Column-wise, most-recent-first list of notes backing the quick panels.
+
+Each directory is stored once and referenced by index, mtimes are kept as
+floats in an `array`, and the display strings ("Folder: Title", "Last
+modified: ...") are only formatted for the columns that are displayed.
+Indexing a NoteList still returns the legacy `[caption, path, tag,
+modified]` row, built on demand. `titles`, when set, overrides the
+file-name title of each row (e.g. with the front matter title).
+"""
+
+import os
+import time
+from array import array
+
+CAPTION, PATH, TAG, MODIFIED = range(4)
+
+
+class NoteList(object):
+
+    def __init__(self, root, dirs, dir_ids, names, mtimes, tag_base=''):
+        self.root = root
+        self.dirs = dirs
+        self.dir_ids = dir_ids
+        self.names = names
+        self.mtimes = mtimes
+        self.tag_base = tag_base
+        self.titles = None
+        self._tags = None
+
+    @classmethod
+    def sorted(cls, root, dirs, dir_ids, names, mtimes, tag_base=''):
+        order = sorted(range(len(names)), key=mtimes.__getitem__, reverse=True)
+        return cls(root, dirs,
+                   array('I', (dir_ids[i] for i in order)),
+                   [names[i] for i in order],
+                   array('d', (mtimes[i] for i in order)),
+                   tag_base)
+
+    @classmethod
+    def from_entries(cls, root, entries, tag_base=''):
+        """Build a NoteList from (relpath, mtime) pairs."""
+        dirs, dir_index = [], {}
+        dir_ids, names, mtimes = array('I'), [], array('d')
+        for relpath, mtime in entries:
+            reldir, name = os.path.split(relpath)
+            if reldir not in dir_index:
+                dir_index[reldir] = len(dirs)
+                dirs.append(reldir)
+            dir_ids.append(dir_index[reldir])
+            names.append(name)
+            mtimes.append(mtime)
+        return cls.sorted(root, dirs, dir_ids, names, mtimes, tag_base)
+
+    @classmethod
+    def merge(cls, lists):
+        """Merge NoteLists into one, relative to the root and tag base of the
+        first. Rows of other roots are tagged with their root's folder."""
+        root = lists[0].root
+        dirs, dir_ids, names, mtimes, titles = [], array('I'), [], array('d'), []
+        for notes in lists:
+            offset = len(dirs)
+            if notes.root == root:
+                dirs.extend(notes.dirs)
+            else:
+                dirs.extend(os.path.relpath(os.path.join(notes.root, d), root) for d in notes.dirs)
+            dir_ids.extend(array('I', (offset + d for d in notes.dir_ids)))
+            names.extend(notes.names)
+            mtimes.extend(notes.mtimes)
+            titles.extend(notes.titles or [None] * len(notes))
+        order = sorted(range(len(names)), key=mtimes.__getitem__, reverse=True)
+        merged = cls(root, dirs,
+                     array('I', (dir_ids[i] for i in order)),
+                     [names[i] for i in order],
+                     array('d', (mtimes[i] for i in order)),
+                     lists[0].tag_base)
+        if any(titles):
+            merged.titles = [titles[i] for i in order]
+        return merged
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        """Yield (relpath, mtime) pairs."""
+        for i in range(len(self.names)):
+            yield self.relpath(i), self.mtimes[i]
+
+    def __eq__(self, other):
+        return (isinstance(other, NoteList) and len(self) == len(other) and
+                list(self) == list(other) and self.titles == other.titles)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __getitem__(self, i):
+        return [self.caption(i), self.path(i), self.tag(i), self.modified(i)]
+
+    def relpath(self, i):
+        return os.path.join(self.dirs[self.dir_ids[i]], self.names[i])
+
+    def path(self, i):
+        return os.path.normpath(os.path.join(self.root, self.relpath(i)))
+
+    def title(self, i):
+        if self.titles and self.titles[i]:
+            return self.titles[i]
+        return os.path.splitext(self.names[i])[0]
+
+    def tag(self, i):
+        if self._tags is None:
+            self._tags = [self._format_tag(reldir) for reldir in self.dirs]
+        return self._tags[self.dir_ids[i]]
+
+    def _format_tag(self, reldir):
+        if self.tag_base:
+            reldir = os.path.relpath(reldir, self.tag_base)
+            if reldir == os.curdir:
+                reldir = ''
+        # dirs of other roots (see merge) start with '..'
+        tag = ''.join(part for part in reldir.split(os.path.sep) if part != os.pardir)
+        return tag + ': ' if tag else ''
+
+    def caption(self, i):
+        return self.tag(i) + self.title(i)
+
+    def modified(self, i):
+        return time.strftime("Last modified: %d/%m/%Y %H:%M", time.gmtime(self.mtimes[i]))
+
+    def captions(self, columns):
+        """Quick panel items made of the given columns only."""
+        getters = [(self.caption, self.path, self.tag, self.modified)[c] for c in columns]
+        if len(getters) == 1:
+            return [getters[0](i) for i in range(len(self.names))]
+        return [[get(i) for get in getters] for i in range(len(self.names))]
+
+    def select(self, keep):
+        """Return a NoteList of the rows `i` for which `keep(i)` is true."""
+        rows = [i for i in range(len(self.names)) if keep(i)]
+        notes = NoteList(self.root, self.dirs,
+                         array('I', (self.dir_ids[i] for i in rows)),
+                         [self.names[i] for i in rows],
+                         array('d', (self.mtimes[i] for i in rows)),
+                         self.tag_base)
+        notes._tags = self._tags
+        if self.titles:
+            notes.titles = [self.titles[i] for i in rows]
+        return notes
+
+    def to_json(self):
+        return {
+            "dirs": self.dirs,
+            "dir_ids": self.dir_ids.tolist(),
+            "names": self.names,
+            "mtimes": self.mtimes.tolist(),
+            "tag_base": self.tag_base,
+            "titles": self.titles,
+        }
+
+    @classmethod
+    def from_json(cls, root, data):
+        notes = cls(root, data["dirs"], array('I', data["dir_ids"]), data["names"],
+                    array('d', data["mtimes"]), data.get("tag_base", ''))
+        notes.titles = data.get("titles")
+        return notes
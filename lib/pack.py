@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+
+"""
+Packed storage for archived notes (and the note history objects).
+
+Notes are appended, zlib-compressed, to a single pack file. A JSON index
+next to it maps each note (relative to the archive directory) to its
+offset, compressed length and mtime, so listing the archive reads only
+the index and extracting a note reads only that note's bytes.
+
+Removing a note only drops it from the index; once removed notes make up
+a large part of the pack it is compacted into a new pack file, which the
+index then switches to. Data is always written before the index is
+replaced, so an interrupted write leaves at worst unreferenced bytes
+behind. `save(sync=True)` also makes both durable, for callers about to
+delete the files they packed.
+"""
+
+import os
+import zlib
+import threading
+
+from .helpers import load_json, save_json
+
+PACK_VERSION = 1
+COMPACT_RATIO = 0.5
+
+
+class NotePack(object):
+
+    def __init__(self, index_path):
+        self.index_path = index_path
+        self.generation = 0
+        self.entries = {}  # relpath -> [offset, length, mtime]
+        self.dead = 0      # bytes taken by removed notes
+        self.dirty = False
+        self.lock = threading.RLock()
+
+    def load(self):
+        data = load_json(self.index_path, PACK_VERSION)
+        if data is None:
+            return False
+        with self.lock:
+            self.generation = data["generation"]
+            self.entries = data["entries"]
+            self.dead = data["dead"]
+            self.dirty = False
+        return True
+
+    @property
+    def path(self):
+        """The pack file the index currently refers to."""
+        return '{0}.{1}.pack'.format(os.path.splitext(self.index_path)[0], self.generation)
+
+    def save(self, sync=False):
+        with self.lock:
+            if not self.dirty:
+                return
+            if sync and os.path.exists(self.path):
+                with open(self.path, 'ab') as f:
+                    os.fsync(f.fileno())
+            data = {"version": PACK_VERSION, "generation": self.generation,
+                    "entries": self.entries, "dead": self.dead}
+            save_json(self.index_path, data, sync=sync)
+            self.dirty = False
+
+    def __contains__(self, relpath):
+        return relpath in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def notes(self):
+        """Return (relpath, mtime) pairs of the packed notes."""
+        with self.lock:
+            return [(relpath, entry[2]) for relpath, entry in self.entries.items()]
+
+    def add(self, relpath, data, mtime, compress=True):
+        """Append a note's bytes, replacing any packed version of it.
+
+        Callers storing data they already compressed pass compress=False,
+        and read it back with the same flag.
+        """
+        blob = zlib.compress(data) if compress else data
+        with self.lock:
+            with open(self.path, 'ab') as f:
+                f.seek(0, os.SEEK_END)
+                offset = f.tell()
+                f.write(blob)
+            self._drop(relpath)
+            self.entries[relpath] = [offset, len(blob), mtime]
+            self.dirty = True
+
+    def read(self, relpath, compress=True):
+        with self.lock:
+            offset, length, _ = self.entries[relpath]
+            with open(self.path, 'rb') as f:
+                f.seek(offset)
+                blob = f.read(length)
+        return zlib.decompress(blob) if compress else blob
+
+    def remove(self, relpath):
+        with self.lock:
+            self._drop(relpath)
+            if self.dead > COMPACT_RATIO * max(self._size(), 1):
+                self.compact()
+
+    def _drop(self, relpath):
+        entry = self.entries.pop(relpath, None)
+        if entry is not None:
+            self.dead += entry[1]
+            self.dirty = True
+
+    def _size(self):
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def compact(self):
+        """Rewrite the pack with the live notes only."""
+        with self.lock:
+            old_path = self.path
+            entries = {}
+            self.generation += 1
+            with open(old_path, 'rb') as src, open(self.path, 'wb') as dst:
+                for relpath, (offset, length, mtime) in sorted(self.entries.items(), key=lambda e: e[1][0]):
+                    src.seek(offset)
+                    entries[relpath] = [dst.tell(), length, mtime]
+                    dst.write(src.read(length))
+                dst.flush()
+                os.fsync(dst.fileno())
+            self.entries, self.dead, self.dirty = entries, 0, True
+            # the old pack holds the only copy until the new index is durable
+            self.save(sync=True)
+            os.remove(old_path)
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+
+"""
+Query language for the notes list.
+
+A query is a list of whitespace separated terms, all of which must match:
+
+    tag:work              folder or front matter tag (prefix match on folders)
+    folder:projects/x     folder the note lives in (prefix match)
+    modified:<7d          modified less than 7 days ago (also >, s/m/h/d/w)
+    modified:>2024-01-31  modified after a date (also <)
+    archived:yes          archived notes only (no: active only, any: both)
+    size:>10k             size in bytes (k/m suffixes)
+    -term                 negates any of the above
+    word                  case-insensitive substring of the note's path
+
+Any other `field:value` term is an error rather than a path substring, so
+a mistyped field does not silently match nothing.
+
+Terms are evaluated against columns precomputed by the catalog (mtime,
+size, folder, archive flag) and the tag index, so a query stats nothing
+and only reads the front matter of notes changed since the last sync.
+"""
+
+import re
+import time
+import calendar
+
+UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 7 * 86400}
+SIZES = {'': 1, 'b': 1, 'k': 1024, 'm': 1024 * 1024}
+FIELD_RE = re.compile(r'^(-?)(\w+):(.*)$')
+
+
+class QueryError(ValueError):
+    pass
+
+
+class Note(object):
+    """The columns a query is evaluated against."""
+    __slots__ = ('relpath', 'folder', 'mtime', 'size', 'archived', 'tags')
+
+    def __init__(self, relpath, folder, mtime, size, archived, tags):
+        self.relpath = relpath
+        self.folder = folder
+        self.mtime = mtime
+        self.size = size
+        self.archived = archived
+        self.tags = tags
+
+
+def _compare(op, value, limit):
+    if op == '<':
+        return value < limit
+    if op == '>':
+        return value > limit
+    return value == limit
+
+
+def _split_op(text):
+    if text[:1] in '<>=':
+        return text[0], text[1:]
+    return '=', text
+
+
+def _parse_modified(text, now):
+    op, value = _split_op(text)
+    m = re.match(r'^(\d+)([smhdw])$', value)
+    if m:
+        # "<7d" means newer than 7 days ago, i.e. a later mtime
+        age = int(m.group(1)) * UNITS[m.group(2)]
+        op = {'<': '>', '>': '<', '=': '>'}[op]
+        limit = now - age
+        return lambda note: _compare(op, note.mtime, limit)
+    try:
+        day = calendar.timegm(time.strptime(value, "%Y-%m-%d"))
+    except ValueError:
+        raise QueryError("bad date in 'modified:{0}'".format(text))
+    if op == '=':
+        return lambda note: day <= note.mtime < day + 86400
+    if op == '>':
+        # after the whole day, from midnight on
+        return lambda note: note.mtime >= day + 86400
+    return lambda note: _compare(op, note.mtime, day)
+
+
+def _parse_size(text):
+    op, value = _split_op(text)
+    m = re.match(r'^(\d+)([bkm]?)$', value.lower())
+    if not m:
+        raise QueryError("bad size in 'size:{0}'".format(text))
+    limit = int(m.group(1)) * SIZES[m.group(2)]
+    return lambda note: _compare(op, note.size, limit)
+
+
+def _parse_archived(text):
+    value = text.lower()
+    if value in ('yes', 'true', '1'):
+        return lambda note: note.archived
+    if value in ('no', 'false', '0'):
+        return lambda note: not note.archived
+    if value in ('any', 'all'):
+        return lambda note: True
+    raise QueryError("archived: expects yes, no or any")
+
+
+def _prefix_of(value, folder):
+    return folder == value or folder.startswith(value + '/')
+
+
+def parse(query, now=None):
+    """Compile a query into a `Note -> bool` predicate.
+
+    Returns (predicate, archived_given), the latter telling whether the
+    query said anything about archived notes; callers default to active
+    notes otherwise.
+    """
+    if now is None:
+        now = time.time()
+    predicates = []
+    archived_given = False
+    for term in query.split():
+        negate = False
+        m = FIELD_RE.match(term)
+        if m:
+            negate = bool(m.group(1))
+            field, value = m.group(2).lower(), m.group(3)
+            if not value:
+                raise QueryError("'{0}:' needs a value".format(field))
+            if field == 'tag':
+                tag = value.lower().strip('#')
+                predicate = (lambda tag: lambda note: tag in note.tags or any(_prefix_of(tag, t) for t in note.tags))(tag)
+            elif field == 'folder':
+                folder = value.strip('/').lower()
+                predicate = (lambda folder: lambda note: _prefix_of(folder, note.folder))(folder)
+            elif field == 'modified':
+                predicate = _parse_modified(value, now)
+            elif field == 'size':
+                predicate = _parse_size(value)
+            elif field == 'archived':
+                predicate = _parse_archived(value)
+                archived_given = True
+            else:
+                raise QueryError("unknown field '{0}:'".format(field))
+        else:
+            if term.startswith('-') and len(term) > 1:
+                negate, term = True, term[1:]
+            text = term.lower()
+            predicate = (lambda text: lambda note: text in note.relpath.lower())(text)
+        if negate:
+            predicate = (lambda p: lambda note: not p(note))(predicate)
+        predicates.append(predicate)
+    return (lambda note: all(p(note) for p in predicates)), archived_given
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+"""
+Corpus-wide literal search and replace, planned on a thread pool.
+
+Planning reads every candidate note on a worker and yields a plan for the
+notes that contain the search string; nothing is written until `apply`,
+which re-checks each note's mtime and rewrites it atomically. Notes
+without a match are never opened for writing, so their mtimes stay as
+they were. Notes that are not valid UTF-8 are reported, never rewritten.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .helpers import read_text, write_atomic
+
+
+class Plan(object):
+    __slots__ = ('path', 'mtime', 'text', 'count', 'lines')
+
+    def __init__(self, path, mtime, text, count, lines):
+        self.path = path
+        self.mtime = mtime
+        self.text = text
+        self.count = count
+        self.lines = lines  # [(line number, old line, new line)]
+
+
+def plan_file(path, find, replace):
+    try:
+        mtime = os.stat(path).st_mtime
+        text = read_text(path)
+    except (IOError, OSError):
+        return None
+    count = text.count(find)
+    if not count:
+        return None
+    lines = [(n + 1, line, line.replace(find, replace))
+             for n, line in enumerate(text.splitlines()) if find in line]
+    return Plan(path, mtime, text.replace(find, replace), count, lines)
+
+
+def plan_replacement(paths, find, replace, workers=8, undecodable=None):
+    """Yield a Plan for every note containing `find`, as workers finish.
+
+    The paths of notes that do not decode as UTF-8 are appended to
+    `undecodable`.
+    """
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = dict((pool.submit(plan_file, path, find, replace), path) for path in paths)
+        for future in as_completed(futures):
+            try:
+                plan = future.result()
+            except UnicodeDecodeError:
+                if undecodable is not None:
+                    undecodable.append(futures[future])
+                continue
+            if plan is not None:
+                yield plan
+
+
+def apply(plans):
+    """Write the planned notes; returns (written, skipped) paths.
+
+    A note modified since it was planned is skipped rather than clobbered.
+    """
+    written, skipped = [], []
+    for plan in plans:
+        try:
+            if os.stat(plan.path).st_mtime != plan.mtime:
+                skipped.append(plan.path)
+                continue
+            write_atomic(plan.path, plan.text)
+        except (IOError, OSError):
+            skipped.append(plan.path)
+            continue
+        written.append(plan.path)
+    return written, skipped
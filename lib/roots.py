@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+"""
+Realpath prefix index of the note roots.
+
+Every root is registered under its normalized path and its realpath, so
+telling whether a file is a note walks up the file's directories with
+dictionary lookups and only resolves symlinks in the file's own path when
+that walk finds nothing.
+"""
+
+import os
+import threading
+
+
+class RootIndex(object):
+
+    def __init__(self):
+        self.prefixes = {}  # root or its realpath -> root
+        self.lock = threading.Lock()
+
+    def add(self, roots):
+        prefixes = dict((os.path.realpath(root), root) for root in roots)
+        prefixes.update((root, root) for root in roots)
+        with self.lock:
+            self.prefixes.update(prefixes)
+
+    def clear(self):
+        with self.lock:
+            self.prefixes = {}
+
+    def _lookup(self, path):
+        prefixes = self.prefixes
+        directory = os.path.dirname(path)
+        while True:
+            root = prefixes.get(directory)
+            if root is not None:
+                return root
+            parent = os.path.dirname(directory)
+            if parent == directory:
+                return None
+            directory = parent
+
+    def root_of(self, path):
+        """The root `path` lives under, or None."""
+        path = os.path.normpath(path)
+        root = self._lookup(path)
+        if root is None:
+            real = os.path.realpath(path)
+            if real != path:
+                root = self._lookup(real)
+        return root
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+
+"""
+Full-text inverted index over the notes of a root.
+
+Each indexed version of a note gets a document id; postings map a term to
+the ids of the documents containing it and the term frequencies, both in
+arrays. Re-indexing a changed note retires its old id and appends the new
+postings, so an update only reads the edited file. Once retired ids make
+up a large part of the postings they are compacted away.
+
+The index is persisted as zlib-compressed JSON and ranks hits with BM25.
+"""
+
+import os
+import io
+import re
+import math
+import heapq
+import bisect
+import threading
+from array import array
+
+from .helpers import load_json, save_json
+
+SEARCH_INDEX_VERSION = 1
+TOKEN_RE = re.compile(r'\w{2,40}', re.UNICODE)
+COMPACT_RATIO = 0.3
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def read_note(path):
+    try:
+        with io.open(path, 'r', encoding='utf-8', errors='replace') as f:
+            return f.read()
+    except (IOError, OSError):
+        return None
+
+
+class SearchIndex(object):
+
+    def __init__(self, root, path):
+        self.root = root
+        self.path = path
+        self.paths = []             # doc id -> relpath, None once retired
+        self.lengths = array('I')   # doc id -> number of terms
+        self.live = {}              # relpath -> [doc id, mtime]
+        self.postings = {}          # term -> [array of doc ids, array of tfs]
+        self.retired = 0
+        self.total_length = 0
+        self.dirty = False
+        self.lock = threading.RLock()
+        self._terms = None          # sorted terms, for prefix lookups
+
+    def load(self):
+        data = load_json(self.path, SEARCH_INDEX_VERSION, compressed=True, root=self.root)
+        if data is None:
+            return False
+        with self.lock:
+            self.paths = data["paths"]
+            self.lengths = array('I', data["lengths"])
+            self.live = data["live"]
+            self.postings = dict((term, [array('I', p[0]), array('I', p[1])])
+                                 for term, p in data["postings"].items())
+            self.retired = data["retired"]
+            self.total_length = sum(self.lengths[known[0]] for known in self.live.values())
+            self._terms = None
+        return True
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            data = {
+                "version": SEARCH_INDEX_VERSION,
+                "root": self.root,
+                "paths": self.paths,
+                "lengths": self.lengths.tolist(),
+                "live": self.live,
+                "postings": dict((term, [p[0].tolist(), p[1].tolist()]) for term, p in self.postings.items()),
+                "retired": self.retired,
+            }
+            self.dirty = False
+        save_json(self.path, data, compressed=True)
+
+    def sync(self, notes):
+        """Index new and changed notes, drop removed ones.
+
+        `notes` are NoteCatalog.iter_notes() tuples, as for the other stores.
+        """
+        seen = set()
+        for relpath, mtime, _ in notes:
+            seen.add(relpath)
+            known = self.live.get(relpath)
+            if known is None or known[1] != mtime:
+                self.update(relpath, mtime)
+        with self.lock:
+            for relpath in [p for p in self.live if p not in seen]:
+                self._retire(relpath)
+            if self.retired > COMPACT_RATIO * max(len(self.paths), 1):
+                self._compact()
+
+    def update(self, relpath, mtime):
+        text = read_note(os.path.join(self.root, relpath))
+        with self.lock:
+            self._retire(relpath)
+            if text is None:
+                return
+            counts = {}
+            for term in tokenize(text):
+                counts[term] = counts.get(term, 0) + 1
+            doc_id = len(self.paths)
+            length = sum(counts.values())
+            self.paths.append(relpath)
+            self.lengths.append(length)
+            self.total_length += length
+            self.live[relpath] = [doc_id, mtime]
+            for term, tf in counts.items():
+                posting = self.postings.get(term)
+                if posting is None:
+                    posting = self.postings[term] = [array('I'), array('I')]
+                    self._terms = None
+                posting[0].append(doc_id)
+                posting[1].append(tf)
+            self.dirty = True
+
+    def remove(self, relpath):
+        with self.lock:
+            self._retire(relpath)
+
+    def _retire(self, relpath):
+        known = self.live.pop(relpath, None)
+        if known is not None:
+            self.paths[known[0]] = None
+            self.total_length -= self.lengths[known[0]]
+            self.retired += 1
+            self.dirty = True
+
+    def _compact(self):
+        remap = {}
+        paths, lengths = [], array('I')
+        for doc_id, relpath in enumerate(self.paths):
+            if relpath is not None:
+                remap[doc_id] = len(paths)
+                paths.append(relpath)
+                lengths.append(self.lengths[doc_id])
+        postings = {}
+        for term, (ids, tfs) in self.postings.items():
+            new_ids, new_tfs = array('I'), array('I')
+            for doc_id, tf in zip(ids, tfs):
+                if doc_id in remap:
+                    new_ids.append(remap[doc_id])
+                    new_tfs.append(tf)
+            if new_ids:
+                postings[term] = [new_ids, new_tfs]
+        for relpath, known in self.live.items():
+            known[0] = remap[known[0]]
+        self.paths, self.lengths, self.postings = paths, lengths, postings
+        self.retired = 0
+        self._terms = None
+        self.dirty = True
+
+    def search(self, query, limit=50):
+        """Return [(relpath, score)] of the notes containing every query term.
+
+        The last term also matches as a prefix, so results show up while a
+        word is still being typed.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return []
+        with self.lock:
+            doc_count = max(len(self.live), 1)
+            avg_len = float(self.total_length) / doc_count or 1.0
+            scores = None
+            for n, term in enumerate(terms):
+                if n == len(terms) - 1 and term not in self.postings:
+                    matching = [self.postings[t] for t in self._prefixed(term)]
+                else:
+                    matching = [self.postings[term]] if term in self.postings else []
+                term_scores = {}
+                for ids, tfs in matching:
+                    live_ids = [(d, tf) for d, tf in zip(ids, tfs) if self.paths[d] is not None]
+                    if not live_ids:
+                        continue
+                    idf = math.log(1 + (doc_count - len(live_ids) + 0.5) / (len(live_ids) + 0.5))
+                    for doc_id, tf in live_ids:
+                        norm = tf + K1 * (1 - B + B * self.lengths[doc_id] / avg_len)
+                        term_scores[doc_id] = term_scores.get(doc_id, 0) + idf * tf * (K1 + 1) / norm
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = dict((d, s + term_scores[d]) for d, s in scores.items() if d in term_scores)
+                if not scores:
+                    return []
+            best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            return [(self.paths[doc_id], score) for doc_id, score in best]
+
+
+    def _prefixed(self, prefix):
+        if self._terms is None:
+            self._terms = sorted(self.postings)
+        start = bisect.bisect_left(self._terms, prefix)
+        end = bisect.bisect_left(self._terms, prefix + u'\uffff')
+        return self._terms[start:end]
+
+
+def snippet(path, query, max_len=120):
+    """Return (line number, text) of the first line matching the query."""
+    terms = tokenize(query)
+    text = read_note(path) or u''
+    for number, line in enumerate(text.splitlines()):
+        lowered = line.lower()
+        found = [lowered.find(term) for term in terms if term in lowered]
+        if not found:
+            continue
+        start = max(min(found) - 20, 0)
+        excerpt = line[start:start + max_len].strip()
+        if start:
+            excerpt = u'…' + excerpt
+        if start + max_len < len(line):
+            excerpt = excerpt + u'…'
+        return number + 1, excerpt
+    return 1, u''
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+"""
+Bounded cache of the first lines of notes, for previews.
+
+Only the head of a file is ever read, and entries are keyed by path and
+the mtime the caller already knows (from the catalog), so moving back and
+forth over the same notes reads nothing and checks nothing on disk. The
+least recently used entries are dropped past `max_entries`.
+"""
+
+import io
+import threading
+from collections import OrderedDict
+
+HEAD_BYTES = 4096
+
+
+class SnippetCache(object):
+
+    def __init__(self, max_entries=500, head_bytes=HEAD_BYTES, max_lines=15):
+        self.max_entries = max_entries
+        self.head_bytes = head_bytes
+        self.max_lines = max_lines
+        self.entries = OrderedDict()  # path -> (mtime, snippet)
+        self.lock = threading.Lock()
+
+    def get(self, path, mtime):
+        with self.lock:
+            cached = self.entries.get(path)
+            if cached is not None and cached[0] == mtime:
+                self.entries.move_to_end(path)
+                return cached[1]
+        try:
+            with io.open(path, 'rb') as f:
+                head = f.read(self.head_bytes)
+        except (IOError, OSError):
+            return u''
+        text = head.decode('utf-8', 'replace')
+        lines = text.splitlines()
+        if len(head) == self.head_bytes and lines:
+            lines = lines[:-1]  # likely cut in the middle
+        snippet = u'\n'.join(lines[:self.max_lines])
+        with self.lock:
+            self.entries[path] = (mtime, snippet)
+            self.entries.move_to_end(path)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return snippet
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+
+"""
+Corpus statistics of the notes.
+
+Each note is streamed line by line, so memory does not grow with its size,
+and reduced to a few counters: words, open, done and cancelled tasks (the
+☐ ✔ ✘ bullets of note_todo) and images. Counters are cached per note and
+mtime in the brain dir; a report only re-reads the notes edited since the
+previous one and aggregates the rest from the cache.
+"""
+
+import io
+import os
+import time
+import heapq
+import threading
+
+from .helpers import load_json, dump_json, write_atomic
+from .links import MARKDOWN_LINK_RE
+
+STATS_VERSION = 1
+WORDS, OPEN, DONE, CANCELLED, IMAGES = range(5)
+TASKS = {u'☐': OPEN, u'✔': DONE, u'✘': CANCELLED}
+
+
+def count(path):
+    """Return the [words, open, done, cancelled, images] counters of a note."""
+    counters = [0, 0, 0, 0, 0]
+    try:
+        with io.open(path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                counters[WORDS] += len(line.split())
+                task = TASKS.get(line.lstrip()[:1])
+                if task is not None:
+                    counters[task] += 1
+                if '![' in line:
+                    counters[IMAGES] += sum(1 for m in MARKDOWN_LINK_RE.finditer(line) if m.group(0)[0] == '!')
+    except (IOError, OSError):
+        pass
+    return counters
+
+
+class NoteStats(object):
+
+    def __init__(self, root, path):
+        self.root = root
+        self.path = path
+        self.notes = {}  # relpath -> [mtime, size, counters]
+        self.dirty = False
+        self.lock = threading.Lock()
+
+    def load(self):
+        data = load_json(self.path, STATS_VERSION, root=self.root)
+        if data is None:
+            return False
+        with self.lock:
+            self.notes = data["notes"]
+            self.dirty = False
+        return True
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            data = {"version": STATS_VERSION, "root": self.root, "notes": self.notes}
+            blob = dump_json(data)
+            self.dirty = False
+        write_atomic(self.path, blob)
+
+    def sync(self, notes):
+        """Count new and changed notes, drop removed ones."""
+        seen = set()
+        for relpath, mtime, size in notes:
+            seen.add(relpath)
+            known = self.notes.get(relpath)
+            if known is None or known[0] != mtime:
+                counters = count(os.path.join(self.root, relpath))
+                with self.lock:
+                    self.notes[relpath] = [mtime, size, counters]
+                    self.dirty = True
+        with self.lock:
+            for relpath in [p for p in self.notes if p not in seen]:
+                del self.notes[relpath]
+                self.dirty = True
+        return self
+
+    def report(self, keep=None, largest=10):
+        """Aggregate the cached counters of the notes `keep` accepts.
+
+        Returns a dict with the "total" and per "folders" counters (notes
+        count first), the notes "modified" per month and the `largest`
+        notes as (words, relpath).
+        """
+        with self.lock:
+            notes = [(relpath, entry) for relpath, entry in self.notes.items() if keep is None or keep(relpath)]
+        total = [0] * 6
+        folders = {}
+        months = {}
+        for relpath, (mtime, _, counters) in notes:
+            folder = folders.setdefault(os.path.dirname(relpath), [0] * 6)
+            for row in (total, folder):
+                row[0] += 1
+                for i, value in enumerate(counters):
+                    row[i + 1] += value
+            month = time.strftime('%Y-%m', time.localtime(mtime))
+            months[month] = months.get(month, 0) + 1
+        return {
+            "total": total,
+            "folders": folders,
+            "modified": sorted(months.items()),
+            "largest": heapq.nlargest(largest, ((entry[2][WORDS], relpath) for relpath, entry in notes)),
+        }
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tag -> notes index.
+
+A note is tagged with the folder it lives in (relative to the root, or to
+the archive directory for archived notes) and with the `tags:` of its
+front matter. Front matter comes from a MetadataCache, so syncing the index
+only reads notes whose mtime changed since they were last parsed.
+"""
+
+import os
+import threading
+
+from .frontmatter import tags_of
+
+
+def folder_of(relpath, archive_dir):
+    """Folder of a note relative to the root, or to the archive directory."""
+    reldir = os.path.dirname(relpath)
+    if reldir == archive_dir or reldir.startswith(archive_dir + os.path.sep):
+        reldir = os.path.relpath(reldir, archive_dir)
+        if reldir == os.curdir:
+            reldir = ''
+    return reldir.replace(os.path.sep, '/')
+
+
+class TagIndex(object):
+
+    def __init__(self, archive_dir):
+        self.archive_dir = archive_dir
+        self.tags = {}   # tag -> set of relpaths
+        self.notes = {}  # relpath -> [mtime, tags]
+        self.lock = threading.Lock()
+
+    def note_tags(self, relpath, meta):
+        tags = set(tags_of(meta))
+        folder = folder_of(relpath, self.archive_dir)
+        if folder:
+            tags.add(folder)
+        return tags
+
+    def sync(self, notes, metadata):
+        """Re-tag new and changed notes, drop removed ones."""
+        seen = set()
+        with self.lock:
+            for relpath, mtime, _ in notes:
+                seen.add(relpath)
+                known = self.notes.get(relpath)
+                if known is not None and known[0] == mtime:
+                    continue
+                self._untag(relpath)
+                tags = self.note_tags(relpath, metadata.get(relpath, mtime))
+                self.notes[relpath] = [mtime, tags]
+                for tag in tags:
+                    self.tags.setdefault(tag, set()).add(relpath)
+            for relpath in [p for p in self.notes if p not in seen]:
+                self._untag(relpath)
+        return self
+
+    def _untag(self, relpath):
+        known = self.notes.pop(relpath, None)
+        if known is None:
+            return
+        for tag in known[1]:
+            tagged = self.tags.get(tag)
+            tagged.discard(relpath)
+            if not tagged:
+                del self.tags[tag]
+
+    def counts(self, keep=None):
+        """Return (tag, number of notes) pairs sorted by tag, counting the
+        notes `keep` accepts; tags left without notes are dropped."""
+        with self.lock:
+            counts = [(tag, len(relpaths) if keep is None else sum(1 for p in relpaths if keep(p)))
+                      for tag, relpaths in self.tags.items()]
+        return sorted((tag, count) for tag, count in counts if count)
+
+    def notes_with(self, tag):
+        with self.lock:
+            return set(self.tags.get(tag, ()))
+
+    def tags_of(self, relpath):
+        with self.lock:
+            known = self.notes.get(relpath)
+            return set(known[1]) if known else set()
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+
+"""
+Prefix trie of note titles and paths, for link completions.
+
+The trie is a radix tree: an edge carries a whole run of characters, so a
+key costs at most one extra node however long it is, and looking up a
+prefix walks one edge per branching point before collecting values below
+it, in key order, up to a limit.
+
+NoteTitles keys every note by its lowercased title and root relative path
+and follows a NoteCatalog through its listeners, so notes created, moved
+or removed are reflected without ever walking the filesystem.
+"""
+
+import os
+import threading
+
+
+class _Node(object):
+    __slots__ = ('edges', 'values')
+
+    def __init__(self):
+        self.edges = None   # first char -> [label, child]
+        self.values = None  # list of values stored at this key
+
+
+def _common_length(a, b):
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+class PrefixTrie(object):
+
+    def __init__(self):
+        self.root = _Node()
+
+    def insert(self, key, value):
+        node = self.root
+        while key:
+            edge = node.edges.get(key[0]) if node.edges else None
+            if edge is None:
+                child = _Node()
+                if node.edges is None:
+                    node.edges = {}
+                node.edges[key[0]] = [key, child]
+                node = child
+                break
+            label, child = edge
+            common = _common_length(label, key)
+            if common < len(label):
+                # split the edge at the first differing character
+                middle = _Node()
+                middle.edges = {label[common]: [label[common:], child]}
+                edge[0], edge[1] = label[:common], middle
+                child = middle
+            node, key = child, key[common:]
+        if node.values is None:
+            node.values = []
+        if value not in node.values:
+            node.values.append(value)
+
+    def remove(self, key, value):
+        path = []  # (parent, first char of the edge taken)
+        node = self.root
+        while key:
+            edge = node.edges.get(key[0]) if node.edges else None
+            if edge is None or not key.startswith(edge[0]):
+                return
+            path.append((node, key[0]))
+            node, key = edge[1], key[len(edge[0]):]
+        if not node.values or value not in node.values:
+            return
+        node.values.remove(value)
+        if not node.values:
+            node.values = None
+        # prune the emptied leaf, then merge a parent left with one edge
+        while path and node.values is None and not node.edges:
+            parent, char = path.pop()
+            del parent.edges[char]
+            if not parent.edges:
+                parent.edges = None
+            node = parent
+        if path and node.values is None and node.edges and len(node.edges) == 1:
+            parent, char = path[-1]
+            edge = parent.edges[char]
+            label, child = list(node.edges.values())[0]
+            edge[0], edge[1] = edge[0] + label, child
+
+    def find(self, prefix, limit=None):
+        """Values whose key starts with `prefix`, in key order."""
+        node = self.root
+        while prefix:
+            edge = node.edges.get(prefix[0]) if node.edges else None
+            if edge is None:
+                return []
+            label, child = edge
+            if label.startswith(prefix):
+                prefix = ''
+            elif prefix.startswith(label):
+                prefix = prefix[len(label):]
+            else:
+                return []
+            node = child
+        found = []
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node.values:
+                found.extend(node.values)
+                if limit is not None and len(found) >= limit:
+                    return found[:limit]
+            if node.edges:
+                stack.extend(node.edges[c][1] for c in sorted(node.edges, reverse=True))
+        return found
+
+
+def note_title(relpath):
+    return os.path.splitext(os.path.basename(relpath))[0]
+
+
+class NoteTitles(object):
+
+    def __init__(self):
+        self.trie = PrefixTrie()
+        self.catalog = None
+        self.lock = threading.Lock()
+
+    def keys(self, relpath):
+        return note_title(relpath).lower(), relpath.replace(os.path.sep, '/').lower()
+
+    def on_change(self, relpath, added):
+        """NoteCatalog listener."""
+        with self.lock:
+            for key in self.keys(relpath):
+                if added:
+                    self.trie.insert(key, relpath)
+                else:
+                    self.trie.remove(key, relpath)
+
+    def follow(self, catalog):
+        """Index the notes of `catalog` and track its changes from now on."""
+        with catalog.lock:
+            for relpath, _, _ in catalog.iter_notes():
+                self.on_change(relpath, True)
+            catalog.listeners.append(self.on_change)
+        self.catalog = catalog
+        return self
+
+    def unfollow(self):
+        if self.catalog is not None:
+            with self.catalog.lock:
+                self.catalog.listeners.remove(self.on_change)
+            self.catalog = None
+
+    def find(self, prefix, limit=100):
+        """Relpaths of the notes whose title or path starts with `prefix`."""
+        with self.lock:
+            found = self.trie.find(prefix.lower(), limit)
+        seen = set()
+        return [relpath for relpath in found if not (relpath in seen or seen.add(relpath))]
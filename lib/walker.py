@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+"""
+Directory traversal shared by the notes list, the catalog and the Notes Index.
+
+Built on `os.scandir` so the type and stat information of each entry comes
+from the directory listing itself; `DirEntry.stat()` caches its result, so
+a note is stat'ed at most once per scan. Exclude rules prune whole
+directories before they are entered.
+"""
+
+import os
+import re
+
+try:
+    from os import scandir
+except ImportError:
+    scandir = None
+
+
+class _Entry(object):
+    """Minimal DirEntry stand-in for Pythons without os.scandir."""
+
+    def __init__(self, dirpath, name):
+        self.name = name
+        self.path = os.path.join(dirpath, name)
+        self._stat = None
+
+    def is_dir(self):
+        return os.path.isdir(self.path)
+
+    def stat(self):
+        if self._stat is None:
+            self._stat = os.stat(self.path)
+        return self._stat
+
+
+def _scandir(path):
+    if scandir is not None:
+        return scandir(path)
+    return [_Entry(path, name) for name in os.listdir(path)]
+
+
+def extension_matcher(extensions):
+    """Compile the note extensions into a single `name -> bool` predicate."""
+    flags = re.IGNORECASE if os.path.normcase('A') == 'a' else 0
+    pattern = re.compile(r'.*\.(?:' + '|'.join(re.escape(ext) for ext in extensions) + r')\Z', flags | re.DOTALL)
+    return lambda name: pattern.match(name) is not None
+
+
+def scan_dir(path, is_note, exclude=()):
+    """List a single directory.
+
+    Returns the names of the subdirectories not in `exclude` and the
+    entries of the notes it contains.
+    """
+    subdirs, notes = [], []
+    try:
+        entries = _scandir(path)
+    except OSError:
+        return subdirs, notes
+    for entry in entries:
+        try:
+            if entry.is_dir():
+                if entry.name not in exclude:
+                    subdirs.append(entry.name)
+                continue
+        except OSError:
+            continue
+        if is_note(entry.name):
+            notes.append(entry)
+    return subdirs, notes
+
+
+def walk(root, is_note, exclude=(), topdown=True):
+    """Yield (dirpath, subdir names, note entries) for every directory.
+
+    Like `os.walk`, subdirs can be pruned in place when walking top-down.
+    """
+    subdirs, notes = scan_dir(root, is_note, exclude)
+    if topdown:
+        yield root, subdirs, notes
+    for name in subdirs:
+        for item in walk(os.path.join(root, name), is_note, exclude, topdown):
+            yield item
+    if not topdown:
+        yield root, subdirs, notes
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+
+"""
+Background thread keeping a NoteCatalog current between listings.
+
+On Linux the watcher uses inotify (through ctypes) and only re-lists the
+directories that reported an event. Everywhere else, or when inotify is
+unavailable or runs out of watches, it polls directory mtimes through
+`NoteCatalog.refresh`, visiting at most `max_dirs_per_poll` directories per
+tick so the cost of a poll stays bounded on very large roots.
+"""
+
+import os
+import sys
+import time
+import select
+import struct
+import threading
+import ctypes
+import ctypes.util
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE |
+              IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+EVENT_HEADER = struct.Struct('iIII')
+
+
+class Inotify(object):
+
+    def __init__(self, libc, fd):
+        self.libc = libc
+        self.fd = fd
+
+    @classmethod
+    def create(cls):
+        """Return an Inotify instance, or None where it is not supported."""
+        if not sys.platform.startswith('linux'):
+            return None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+            fd = libc.inotify_init1(IN_CLOEXEC)
+        except (OSError, AttributeError):
+            return None
+        if fd < 0:
+            return None
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return cls(libc, fd)
+
+    def add_watch(self, path):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        return wd if wd >= 0 else None
+
+    def read_events(self, timeout):
+        """Yield (wd, mask, name) tuples, waiting at most `timeout` seconds."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return
+        data = os.read(self.fd, 64 * 1024)
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            yield wd, mask, os.fsdecode(name)
+
+    def close(self):
+        os.close(self.fd)
+
+
+class NotesWatcher(threading.Thread):
+
+    def __init__(self, catalog, poll_interval=5, full_scan_interval=300,
+                 max_dirs_per_poll=2000, use_inotify=True):
+        threading.Thread.__init__(self, name="PlainNotes watcher")
+        self.daemon = True
+        self.catalog = catalog
+        self.poll_interval = poll_interval
+        self.full_scan_interval = full_scan_interval
+        self.max_dirs_per_poll = max_dirs_per_poll
+        self.use_inotify = use_inotify
+        self.ready = threading.Event()
+        self._stopped = threading.Event()
+        self._wds = {}  # wd -> reldir
+
+    def watches(self, catalog):
+        """True when listings of `catalog` can skip their own refresh."""
+        return catalog is self.catalog and self.is_alive() and self.ready.is_set()
+
+    def stop(self):
+        self._stopped.set()
+
+    def run(self):
+        self.catalog.refresh()
+        inotify = Inotify.create() if self.use_inotify else None
+        if inotify is not None:
+            try:
+                if self._watch_dirs(inotify, list(self.catalog.dirs)):
+                    # changes made while the watches were being added
+                    self.catalog.refresh()
+                    self.ready.set()
+                    self._run_inotify(inotify)
+            finally:
+                inotify.close()
+        self.ready.set()
+        self._run_polling()
+
+    def _watch_dirs(self, inotify, reldirs):
+        for reldir in reldirs:
+            wd = inotify.add_watch(os.path.join(self.catalog.root, reldir))
+            if wd is None:
+                # most likely fs.inotify.max_user_watches was reached
+                return False
+            self._wds[wd] = reldir
+        return True
+
+    def _run_inotify(self, inotify):
+        scanned = time.time()
+        while not self._stopped.is_set():
+            dirty, touched = set(), set()
+            for wd, mask, name in inotify.read_events(self.poll_interval):
+                if mask & IN_Q_OVERFLOW:
+                    self.catalog.refresh()
+                    continue
+                reldir = self._wds.get(wd)
+                if reldir is None:
+                    continue
+                if mask & IN_IGNORED:
+                    self._wds.pop(wd, None)
+                elif mask & IN_CLOSE_WRITE:
+                    touched.add(os.path.join(self.catalog.root, reldir, name))
+                else:
+                    dirty.add(reldir)
+            for reldir in dirty:
+                if not self._watch_dirs(inotify, self.catalog.rescan(reldir)):
+                    return
+            for path in touched:
+                self.catalog.touch(path)
+            # inotify can silently miss changes, e.g. on network mounts. The
+            # full scan also saves what the events changed meanwhile; the
+            # listings save the catalog too, events only mark it dirty
+            if time.time() - scanned >= self.full_scan_interval:
+                watched = set(self._wds.values())
+                if not self._watch_dirs(inotify, [d for d in self.catalog.dirs if d not in watched]):
+                    return
+                self.catalog.refresh()
+                scanned = time.time()
+
+    def _run_polling(self):
+        while not self._stopped.wait(self.poll_interval):
+            self.catalog.refresh(self.max_dirs_per_poll)
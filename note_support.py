@@ -12,13 +12,12 @@ import urllib
 from urllib import request
 from collections import defaultdict
 
+from .notes_config import settings
+
 ST3072 = int(sublime.version()) >= 3072
 LOADING_IMAGE_TIMEOUT = 5
 CACHE = defaultdict(lambda: defaultdict(dict))
 
-def settings():
-    return sublime.load_settings('Notes.sublime-settings')
-
 def get_view_cache(view):
     return CACHE[view.id()]
 
@@ -1,11 +1,18 @@
 # -*- coding: utf-8 -*-
 
 import sublime, sublime_plugin
-import os, fnmatch, re, time
-import copy
-import json
-
-from .lib import helpers
+import os, time
+from concurrent.futures import ThreadPoolExecutor
+
+from .lib.catalog import NoteCatalog, load_snapshot, save_snapshot
+from .lib.watcher import NotesWatcher
+from .lib.frontmatter import MetadataCache
+from .lib.notelist import NoteList
+from .lib.pack import NotePack
+from .lib.snippets import SnippetCache
+from .lib.journal import JournaledStore
+from .notes_config import config, settings, brain_dir, get_roots, get_root, forget_window, root_index, on_config_change
+from .jotter import ensure_inbox
 
 ST3 = int(sublime.version()) >= 3000
 
@@ -13,114 +20,276 @@ if not ST3:
     from codecs import open
 
 
-def settings():
-    return sublime.load_settings('Notes.sublime-settings')
+def file_id(path):
+    # brain keys are relative to the root the brain was loaded for, whatever
+    # the window: notes of other roots get stable '../' keys
+    return os.path.relpath(path, brain_root)
+
+
+def get_catalog(root=None):
+    if root is None:
+        root = get_root()
+    catalog = catalogs.get(root)
+    if catalog is None:
+        brain = os.path.join(root, brain_dir())
+        if not os.path.isdir(brain):
+            os.makedirs(brain)
+        cfg = config()
+        catalog = NoteCatalog(root, os.path.join(root, cfg.brain_dir, 'catalog.json'),
+                              cfg.extensions, cfg.exclude, cfg.archive_dir)
+        catalog.load()
+        catalogs[root] = catalog
+    return catalog
+
+
+def get_metadata(root=None):
+    if root is None:
+        root = get_root()
+    metadata = metadata_caches.get(root)
+    if metadata is None:
+        metadata = MetadataCache(root, os.path.join(root, brain_dir(), 'metadata.json'))
+        metadata.load()
+        metadata_caches[root] = metadata
+    return metadata
 
 
-def get_root():
-    project_settings = sublime.active_window().active_view().settings().get('PlainNotes')
-    if project_settings:
-        return os.path.normpath(os.path.expanduser(project_settings.get('root', settings().get("root"))))
+def get_archive_pack(root=None):
+    if root is None:
+        root = get_root()
+    pack = archive_packs.get(root)
+    if pack is None:
+        pack = NotePack(os.path.join(root, brain_dir(), 'archive.json'))
+        pack.load()
+        archive_packs[root] = pack
+    return pack
+
+
+def pack_notes(root, paths):
+    """Move archived notes from the archive directory into the pack."""
+    archive_root = os.path.join(root, config().archive_dir)
+    pack = get_archive_pack(root)
+    catalog = get_catalog(root)
+    packed = []
+    for path in paths:
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            mtime = os.stat(path).st_mtime
+        except (IOError, OSError):
+            continue
+        pack.add(os.path.relpath(path, archive_root), data, mtime)
+        packed.append(path)
+    # the files go only once their copies and the index referring to them
+    # are on disk
+    pack.save(sync=True)
+    for path in packed:
+        os.remove(path)
+        catalog.remove(path)
+        # drop the folders this emptied, up to the archive directory
+        directory = os.path.dirname(path)
+        while directory != archive_root and not os.listdir(directory):
+            os.rmdir(directory)
+            directory = os.path.dirname(directory)
+    catalog.save()
+    return packed
+
+
+def unpack_note(root, path):
+    """Extract a packed note back to its place in the archive directory."""
+    archive_root = os.path.join(root, config().archive_dir)
+    pack = get_archive_pack(root)
+    relpath = os.path.relpath(path, archive_root)
+    mtime = pack.entries[relpath][2]
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    with open(path, 'wb') as f:
+        f.write(pack.read(relpath))
+        # on disk before the pack drops it
+        f.flush()
+        os.fsync(f.fileno())
+    os.utime(path, (mtime, mtime))
+    pack.remove(relpath)
+    pack.save()
+    get_catalog(root).add(path)
+
+
+def apply_yaml_titles(root, file_list):
+    metadata = get_metadata(root)
+    file_list.titles = [metadata.get(relpath, mtime).get("title") or None for relpath, mtime in file_list]
+    metadata.prune(relpath for relpath, _, _ in get_catalog(root).iter_notes())
+    metadata.save()
+
+
+def snapshot_file(root):
+    return os.path.join(root, brain_dir(), 'notes_list.json')
+
+
+def fresh_catalog(root):
+    catalog = get_catalog(root)
+    if watcher and watcher.watches(catalog):
+        catalog.save()  # what the watcher and saves touched since
     else:
-        return os.path.normpath(os.path.expanduser(settings().get("root")))
+        catalog.refresh()
+    return catalog
 
 
-def file_id(path):
-    return os.path.relpath(path, root)
+def list_entries(root, archived=False):
+    catalog = fresh_catalog(root)
+    file_list = catalog.entries(archived)
+    if config().list_options.display_yaml_title:
+        apply_yaml_titles(root, file_list)
+    return file_list
+
+
+def list_all_entries(roots):
+    """Active notes of several roots, scanned concurrently, as one NoteList."""
+    if len(roots) == 1:
+        return list_entries(roots[0])
+    with ThreadPoolExecutor(max_workers=len(roots)) as pool:
+        return NoteList.merge(list(pool.map(list_entries, roots)))
 
-def brain_dir():
-    brain_settings = settings().get("jotter_dir")
-    if brain_settings:
-        return brain_settings
-    else:
-        return ".brain"
-
-
-def find_notes(self, root, exclude):
-    note_files = []
-    for path, subdirs, files in os.walk(root, topdown=True):
-        if exclude:
-            subdirs[:] = [d for d in subdirs if d not in exclude]
-        relpath = os.path.relpath(path, root)
-        for name in files:
-            for ext in settings().get("note_file_extensions"):
-                if (not relpath.startswith(brain_dir())) and fnmatch.fnmatch(name, "*." + ext):
-                    title = re.sub('\.' + ext + '$', '', name)
-                    tag = path.replace(root, '').replace(os.path.sep, '')
-                    if not tag == '':
-                        tag = tag + ': '
-                    modified_str = time.strftime("Last modified: %d/%m/%Y %H:%M", time.gmtime(os.path.getmtime(os.path.join(path, name))))
-                    # created_str = time.strftime("Created: %d/%m/%Y %H:%M", time.gmtime(os.path.getctime(os.path.join(path, name))));
-                    note_files.append([re.sub('\.' + ext + '$', '', tag + title), os.path.join(path, name), tag, modified_str])
-
-    note_files.sort(key=lambda item: os.path.getmtime(item[1]), reverse=True)
-    return note_files
+
+def find_notes(self, root, archived=False):
+    return list_entries(root, archived)
 
 
 def setup_notes_list(file_list):
     # list display options
-    try:
-        display_modified_date = settings().get("list_options").get("display_modified_date")
-        display_folder = settings().get("list_options").get("display_folder")
-        display_full_path = settings().get("list_options").get("display_full_path")
-    except:
-        display_modified_date = True
-        display_folder = True
-        display_full_path = False
+    list_options = config().list_options
 
     indices = [0]
-    if display_modified_date:
+    if list_options.display_modified_date:
         indices.append(3)
-    if display_folder:
+    if list_options.display_folder:
         indices.append(2)
-    if display_full_path:
+    if list_options.display_full_path:
         indices.append(1)
 
-    return helpers.return_sublist(file_list, indices)
+    return file_list.captions(indices)
 
 
-def update_color(old_file_path, new_file_path):
+def update_color(old_file_path, new_file_path, save=True):
     # update color scheme db
     f_id_old = file_id(old_file_path)
 
     if db.get(f_id_old):
-        f_id_new = file_id(new_file_path)
-        if not db.get(f_id_new):
-            db[f_id_new] = {}
-
-        db[f_id_new]["color_scheme"] = db[f_id_old]["color_scheme"]
+        set_color_scheme(new_file_path, db[f_id_old]["color_scheme"])
 
         # delete old
         db.pop(f_id_old, None)
 
-        save_to_brain()
+        if save:
+            save_to_brain()
+
+
+class NotePreview(object):
+    """Shows the head of the highlighted note of a quick panel.
+
+    The snippet is shown in an output panel below the quick panel, so a
+    note is never opened (or read past its first few KB) just for a
+    preview, and nothing is written to disk. Highlights are debounced,
+    snippets cached by path and mtime.
+    """
+
+    DELAY = 80
+    PANEL = "notes_preview"
+
+    def __init__(self, window, file_list):
+        self.window = window
+        self.file_list = file_list
+        self.highlighted = None
+        self.closed = False
+
+    def highlight(self, index):
+        self.highlighted = index
+        sublime.set_timeout_async(lambda: self.load(index), self.DELAY)
+
+    def load(self, index):
+        if index != self.highlighted or self.closed:
+            return
+        file_list = self.file_list
+        snippet = snippets.get(file_list.path(index), file_list.mtimes[index])
+        text = file_list.caption(index) + u"\n\n" + snippet
+        sublime.set_timeout(lambda: self.show(index, text), 0)
+
+    def show(self, index, text):
+        if index != self.highlighted or self.closed:
+            return
+        panel = self.window.create_output_panel(self.PANEL)
+        panel.set_syntax_file("Packages/PlainNotes/Note.tmLanguage")
+        panel.run_command("append", {"characters": text})
+        panel.set_read_only(True)
+        self.window.run_command("show_panel", {"panel": "output." + self.PANEL})
+
+    def close(self):
+        self.closed = True
+        if self.window.active_panel() == "output." + self.PANEL:
+            self.window.run_command("hide_panel", {"panel": "output." + self.PANEL})
 
 
 class NotesListCommand(sublime_plugin.ApplicationCommand):
 
     def run(self):
-        exclude = set([settings().get("archive_dir"), brain_dir()])
-        root = get_root()
+        roots = get_roots()
+        root = roots[0]
         self.notes_dir = root
-        self.file_list = find_notes(self, root, exclude)
+        # show the last listing right away and revalidate it in the background
+        snapshot = load_snapshot(snapshot_file(root), root)
+        if snapshot is None:
+            sublime.status_message("    Listing notes…")
+            sublime.set_timeout_async(lambda: self.first_listing(roots), 0)
+            return
+        self.show_notes(snapshot)
+        sublime.set_timeout_async(lambda: self.revalidate(roots), 0)
+
+    def first_listing(self, roots):
+        # no snapshot to show meanwhile: the fresh listing is the snapshot
+        file_list = list_all_entries(roots)
+        save_snapshot(snapshot_file(roots[0]), roots[0], file_list)
+        sublime.set_timeout(lambda: self.show_notes(file_list), 0)
+
+    def show_notes(self, file_list):
+        self.file_list = file_list
+        self.fresh_list = None
         rlist = setup_notes_list(self.file_list)
         window = sublime.active_window()
-        window.show_quick_panel(rlist, self.open_note)
+        if ST3 and settings().get("note_preview", True):
+            self.preview = NotePreview(window, file_list)
+            window.show_quick_panel(rlist, self.open_note, 0, 0, self.preview.highlight)
+        else:
+            self.preview = None
+            window.show_quick_panel(rlist, self.open_note)
+
+    def revalidate(self, roots):
+        file_list = list_all_entries(roots)
+        if file_list != self.file_list:
+            save_snapshot(snapshot_file(roots[0]), roots[0], file_list)
+            # reopening the panel would throw away what the user typed: the
+            # open panel stays as it is, and only a stale pick is redone
+            self.fresh_list = file_list
 
     def open_note(self, index):
+        if self.preview is not None:
+            self.preview.close()
         if index == -1:
             return
-        file_path = self.file_list[index][1]
+        file_path = self.file_list.path(index)
+        if not os.path.exists(file_path) and self.fresh_list is not None:
+            sublime.status_message("    Note moved or deleted meanwhile, pick it again.")
+            self.show_notes(self.fresh_list)
+            return
         sublime.run_command("notes_open", {"file_path": file_path})
 
 
 class NotesOpenCommand(sublime_plugin.ApplicationCommand):
 
-    def run(self, file_path):
-        sublime.set_timeout(lambda: self.async_open(file_path), 0)
+    def run(self, file_path, line=None):
+        sublime.set_timeout(lambda: self.async_open(file_path, line), 0)
 
-    def async_open(self, file_path):
-        view = sublime.active_window().open_file(file_path, sublime.ENCODED_POSITION)
+    def async_open(self, file_path, line=None):
+        position = file_path if line is None else "{0}:{1}".format(file_path, line)
+        view = sublime.active_window().open_file(position, sublime.ENCODED_POSITION)
         f_id = file_id(file_path)
         view.settings().set("is_note", True)
         if db.get(f_id):
@@ -150,22 +319,20 @@ class NotesNewCommand(sublime_plugin.ApplicationCommand):
         if not os.path.exists(directory):
             os.makedirs(directory)
 
-        if any(title.endswith("." + ext) for ext in settings().get("note_file_extensions")):
+        if config().is_note(title):
             ext = ""
         else:
-            ext = "." + settings().get("note_save_extension")
+            ext = "." + config().save_extension
 
         file = os.path.join(directory, title + ext)
         if not os.path.exists(file):
             open(file, 'w+').close()
+            get_catalog(self.notes_dir).add(file)
         view = sublime.active_window().open_file(file)
         color_scheme = settings().get("note_color_scheme")
         if color_scheme:
             view.settings().set("color_scheme", color_scheme)
-            f_id = file_id(file)
-            if not db.get(f_id):
-                db[f_id] = {}
-            db[f_id]["color_scheme"] = color_scheme
+            set_color_scheme(file, color_scheme)
             save_to_brain()
         self.insert_title_scheduled = False
         self.insert_title(title, tag, view)
@@ -183,15 +350,29 @@ class NotesNewCommand(sublime_plugin.ApplicationCommand):
 class NotesEvents(sublime_plugin.EventListener):
 
     def on_load_async(self, view):
-        root = get_root()
         if view.settings().get("is_note") or not view.file_name():
             return
-        if os.path.realpath(view.file_name()).startswith(root):
+        window = view.window() or sublime.active_window()
+        get_roots(window)  # make sure the roots of this window are indexed
+        if root_index.root_of(view.file_name()) is not None:
             f_id = file_id(view.file_name())
             view.settings().set("is_note", True)
             if db.get(f_id) and db[f_id]["color_scheme"]:
                 view.settings().set("color_scheme", db[f_id]["color_scheme"])
 
+    def on_post_save_async(self, view):
+        if not view.settings().get("is_note"):
+            return
+        root = root_index.root_of(view.file_name())
+        if root is None:
+            return
+        # only marks the catalog dirty: rewriting it is O(notes), it is
+        # persisted by the next listing, refresh or unload
+        get_catalog(root).touch(view.file_name())
+
+    def on_load_project_async(self, window):
+        forget_window(window)
+
 
 class NoteInsertTitleCommand(sublime_plugin.TextCommand):
 
@@ -220,7 +401,6 @@ class NoteChangeColorCommand(sublime_plugin.WindowCommand):
             self.window.show_quick_panel(self.colors, self.on_select, 0, self.colors.index(current_color))
 
     def on_select(self, index):
-        global db
         if index == -1:
             self.window.active_view().settings().set("color_scheme", self.original_cs)
         else:
@@ -232,10 +412,7 @@ class NoteChangeColorCommand(sublime_plugin.WindowCommand):
 
             view = self.window.active_view()
             view.settings().set("color_scheme", path)
-            f_id = file_id(view.file_name())
-            if not db.get(f_id):
-                db[f_id] = {}
-            db[f_id]["color_scheme"] = path
+            set_color_scheme(view.file_name(), path)
             save_to_brain()
 
     def on_highlight(self, index):
@@ -255,25 +432,22 @@ class NoteChangeColorCommand(sublime_plugin.WindowCommand):
 class NoteArchiveCommand(sublime_plugin.WindowCommand):
 
     def run(self):
-        window = sublime.active_window()
         self.notes_dir = get_root()
         self.archive_note()
-        sublime.status_message("    Note Archived.")
 
     def archive_note(self):
         file_path = self.window.active_view().file_name()
-        f_id = file_id(file_path)
-        archive_dir = os.path.join(self.notes_dir, settings().get("archive_dir"))
-        new_file_path = os.path.join(archive_dir, f_id)
+        # archived in the archive directory of the root the note lives in
+        root = root_index.root_of(file_path) or self.notes_dir
+        archive_dir = os.path.join(root, config().archive_dir)
+        new_file_path = os.path.join(archive_dir, os.path.relpath(file_path, root))
 
         if not os.path.exists(archive_dir):
             os.makedirs(archive_dir)
         if not os.path.isfile(new_file_path):
-            os.renames(file_path, new_file_path)
             self.window.run_command("close_file")
-
-            # update color scheme db
-            update_color(file_path, new_file_path)
+            # notes_move reports "1 note(s) archived." once it is done
+            sublime.run_command("notes_move", {"moves": [[file_path, new_file_path]], "verb": "archived"})
 
     def is_enabled(self):
         is_note = self.window.active_view().settings().get("is_note")
@@ -287,8 +461,15 @@ class NoteUnarchiveCommand(sublime_plugin.ApplicationCommand):
 
     def run(self):
         self.notes_dir = get_root()
-        archive_dir = os.path.join(self.notes_dir, settings().get("archive_dir"))
-        self.file_list = find_notes(self, archive_dir, [])
+        self.file_list = find_notes(self, self.notes_dir, archived=True)
+        pack = get_archive_pack(self.notes_dir)
+        if len(pack):
+            # packed notes are listed from the pack index, alongside loose
+            # ones, which keep their titles
+            archive_dir = config().archive_dir
+            packed = NoteList.from_entries(self.notes_dir, [(os.path.join(archive_dir, relpath), mtime)
+                                                            for relpath, mtime in pack.notes()])
+            self.file_list = NoteList.merge([self.file_list, packed])
         rlist = setup_notes_list(self.file_list)
         window = sublime.active_window()
         if rlist:
@@ -299,17 +480,18 @@ class NoteUnarchiveCommand(sublime_plugin.ApplicationCommand):
     def unarchive_note(self, index):
         if index == -1:
             return
-        file_path = self.file_list[index][1]
-        new_file_path = file_path.replace(os.path.sep + settings().get("archive_dir"), '')
+        file_path = self.file_list.path(index)
+        new_file_path = file_path.replace(os.path.sep + config().archive_dir, '')
         # print(file_path)
         # print(new_file_path)
         if not os.path.isfile(new_file_path):
-            os.renames(file_path, new_file_path)
-
-            # update color scheme db
-            update_color(file_path, new_file_path)
+            sublime.set_timeout_async(lambda: self.restore(file_path, new_file_path), 0)
 
-            sublime.run_command("notes_open", {"file_path": new_file_path})
+    def restore(self, file_path, new_file_path):
+        if not os.path.isfile(file_path):
+            unpack_note(self.notes_dir, file_path)
+        sublime.set_timeout(lambda: sublime.run_command(
+            "notes_move", {"moves": [[file_path, new_file_path]], "open": new_file_path, "verb": "unarchived"}), 0)
 
     def is_enabled(self):
         return True
@@ -325,6 +507,7 @@ class NoteRemoveCommand(sublime_plugin.WindowCommand):
             self.window.active_view().set_scratch(True)
             self.window.run_command("close_file")
             os.remove(f_path)
+            get_catalog().remove(f_path)
 
     def is_enabled(self):
         is_note = self.window.active_view().settings().get("is_note")
@@ -340,9 +523,9 @@ class NoteRenameCommand(sublime_plugin.WindowCommand):
         self.window.show_input_panel("New Name:", "", self.rename_note, None, None)
 
     def rename_note(self, title):
-        global db
-        self.notes_dir = os.path.expanduser(root)
         self.file_path = self.window.active_view().file_name()
+        # new names are relative to the root the note lives in
+        self.notes_dir = root_index.root_of(self.file_path) or get_root(self.window)
         filename = title.split("/")
         if len(filename) > 1:
             title = filename[len(filename) - 1]
@@ -355,20 +538,16 @@ class NoteRenameCommand(sublime_plugin.WindowCommand):
         if not os.path.exists(directory):
             os.makedirs(directory)
 
-        if any(title.endswith("." + ext) for ext in settings().get("note_file_extensions")):
+        if config().is_note(title):
             ext = ""
         else:
-            ext = "." + settings().get("note_save_extension")
+            ext = "." + config().save_extension
 
         new_file_path = os.path.join(directory, title + ext)
         # pardir = os.path.abspath(os.path.join(self.file_path, '..'))
         if not os.path.isfile(new_file_path):
-            os.rename(self.file_path, new_file_path)
             self.window.run_command("close_file")
-            sublime.run_command("notes_open", {"file_path": new_file_path})
-
-            # update color scheme db
-            update_color(self.file_path, new_file_path)
+            sublime.run_command("notes_move", {"moves": [[self.file_path, new_file_path]], "open": new_file_path, "verb": "renamed"})
 
         else:
             sublime.error_message("Note already exists!")
@@ -382,14 +561,19 @@ class NoteRenameCommand(sublime_plugin.WindowCommand):
             return False
 
 
+def set_color_scheme(path, color_scheme):
+    f_id = file_id(path)
+    record = dict(db.get(f_id) or {})
+    record["color_scheme"] = color_scheme
+    db.set(f_id, record)
+
+
 def save_to_brain():
-    # print("SAVING TO DISK-----------------")
-    # print(db)
-    with open(db_json_file, 'w', encoding='utf-8') as f:
-        json.dump(db, f, indent=4, sort_keys=True)
+    # appends the changed records to the journal, see lib/journal.py
+    db.flush()
 
 
-def cleanup_brain():
+def cleanup_brain(root):
     # print("Cleaning Up My Brain -----------------")
     # print(db)
     # print(len(db))
@@ -405,26 +589,51 @@ def cleanup_brain():
     save_to_brain()
 
 
+def start_watcher(root):
+    global watcher
+    options = config().watcher
+    if not options.enabled:
+        return
+    watcher = NotesWatcher(get_catalog(root),
+                           poll_interval=options.poll_interval,
+                           full_scan_interval=options.full_scan_interval,
+                           max_dirs_per_poll=options.max_dirs_per_poll,
+                           use_inotify=options.use_inotify)
+    watcher.start()
+
+
+def reload_config():
+    # catalogs, the brain and the watcher were built for the old roots,
+    # extensions and options: persist them and start over
+    for store in list(metadata_caches.values()) + list(archive_packs.values()):
+        store.save()
+    plugin_unloaded()
+    plugin_loaded()
+
+
 def plugin_loaded():
-    global db, root, db_json_file
+    global db, brain_root, catalogs, metadata_caches, archive_packs, snippets, watcher
     # creating directory structure and files in root
-    db = {}
-    root = get_root()
-    brain = os.path.join(root, brain_dir())
-    inbox = os.path.join(root, brain_dir(), 'Inbox.note')
-    db_json_file = os.path.join(root, brain_dir(), 'brain.json')
-
-    if not os.path.exists(brain):
-        os.makedirs(brain)
-    if not os.path.isfile(inbox):
-        open(inbox, mode='a', encoding='utf-8').close()
-
-    try:
-        with open(db_json_file, 'r') as f:
-            db = json.load(f)
-        cleanup_brain()
-    except:
-        db = {}
+    catalogs = {}
+    metadata_caches = {}
+    archive_packs = {}
+    snippets = SnippetCache(max_lines=config().preview_lines)
+    watcher = None
+    root = brain_root = get_root()
+    ensure_inbox(root)
+    db = JournaledStore(os.path.join(root, brain_dir(), 'brain.json'))
+    db.load()
+    cleanup_brain(root)
+
+    start_watcher(root)
+    on_config_change("notes", reload_config)
+
+
+def plugin_unloaded():
+    if watcher:
+        watcher.stop()
+    for catalog in catalogs.values():
+        catalog.save()
 
 if not ST3:
     plugin_loaded()
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+import sublime, sublime_plugin
+import os
+
+from .notes_config import config, settings, get_root
+from .notes import fresh_catalog, pack_notes
+from .notes_links import move_notes, report_moves
+from .notes_query import run_query
+from .lib.query import QueryError
+
+
+def archive_candidates(root, policies):
+    """Return [(policy, relpaths)] of the active notes each policy archives.
+
+    A policy is a query (see notes_query), optionally wrapped in an object
+    with a "name". Notes matched by several policies are listed once, under
+    the first one.
+    """
+    seen = set()
+    candidates = []
+    for policy in policies:
+        query = policy.get("query", "") if isinstance(policy, dict) else policy
+        if not query.strip():
+            continue
+        # policies only ever apply to active notes
+        relpaths = [relpath for relpath, _ in run_query(root, query + " archived:no") if relpath not in seen]
+        seen.update(relpaths)
+        candidates.append((policy, relpaths))
+    return candidates
+
+
+class NotesAutoArchiveCommand(sublime_plugin.WindowCommand):
+
+    def run(self):
+        self.root = get_root(self.window)
+        policies = settings().get("archive_policies") or []
+        if not policies:
+            sublime.error_message("No archive policies: add some to \"archive_policies\" in the PlainNotes settings.")
+            return
+        sublime.set_timeout_async(lambda: self.plan(policies), 0)
+
+    def plan(self, policies):
+        try:
+            candidates = archive_candidates(self.root, policies)
+        except QueryError as e:
+            sublime.error_message("Invalid archive policy: {0}".format(e))
+            return
+        archive_dir = os.path.join(self.root, config().archive_dir)
+        self.moves = [[os.path.join(self.root, relpath), os.path.join(archive_dir, relpath)]
+                      for _, relpaths in candidates for relpath in relpaths]
+        if not self.moves:
+            sublime.status_message("    No notes to archive.")
+            return
+        lines = [u"Dry run: {0} note(s) would be archived.".format(len(self.moves)), u""]
+        for policy, relpaths in candidates:
+            name = policy.get("name") or policy.get("query") if isinstance(policy, dict) else policy
+            lines.append(u"{0} ({1} note(s))".format(name, len(relpaths)))
+            lines.extend(u"  " + relpath for relpath in relpaths)
+            lines.append(u"")
+        sublime.set_timeout(lambda: self.confirm(u"\n".join(lines)), 0)
+
+    def confirm(self, summary):
+        view = self.window.new_file()
+        view.set_scratch(True)
+        view.set_name(u"Archive policies")
+        view.settings().set("word_wrap", False)
+        view.run_command("append", {"characters": summary})
+        if sublime.ok_cancel_dialog(u"Archive {0} note(s)?".format(len(self.moves)), "Archive"):
+            sublime.set_timeout_async(self.archive, 0)
+
+    def archive(self):
+        # one batch: links are fixed and the brain is written once
+        report_moves(*move_notes(self.root, self.moves), verb="archived")
+
+
+class NotesPackArchiveCommand(sublime_plugin.WindowCommand):
+
+    def run(self):
+        root = get_root(self.window)
+        sublime.set_timeout_async(lambda: self.pack(root), 0)
+
+    def pack(self, root):
+        catalog = fresh_catalog(root)
+        paths = [os.path.join(root, relpath) for relpath, _, _ in catalog.iter_notes() if catalog.is_archived(relpath)]
+        packed = pack_notes(root, paths)
+        sublime.status_message("    {0} archived note(s) packed.".format(len(packed)))
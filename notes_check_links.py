@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+import sublime, sublime_plugin
+import os
+
+from .notes import fresh_catalog
+from .notes_config import config, settings, get_root, brain_dir, on_config_change
+from .lib.linkcheck import LinkChecker
+
+# lets double-clicking a report line open the note at that line
+RESULT_FILE_REGEX = r'^(\S.*):$'
+RESULT_LINE_REGEX = r'^\s+(\d+):'
+
+
+def get_link_checker(root):
+    checker = link_checkers.get(root)
+    if checker is None:
+        s = settings()
+        proxies = dict((scheme, s.get(scheme + '_proxy')) for scheme in ('http', 'https') if s.get(scheme + '_proxy'))
+        checker = LinkChecker(root, os.path.join(root, brain_dir(), 'linkcheck.json'),
+                              workers=config().worker_threads,
+                              url_workers=s.get("link_check_max_connections", 4),
+                              timeout=s.get("link_check_timeout", 5),
+                              proxies=proxies,
+                              url_ttl=s.get("link_check_url_ttl", 24 * 3600))
+        checker.load()
+        link_checkers[root] = checker
+    return checker
+
+
+class NotesCheckLinksCommand(sublime_plugin.WindowCommand):
+
+    def run(self, check_remote=None):
+        if check_remote is None:
+            check_remote = settings().get("link_check_remote", False)
+        root = get_root()
+        view = self.window.new_file()
+        view.set_scratch(True)
+        view.set_name(u"⚠ Broken links")
+        view.settings().set("result_file_regex", RESULT_FILE_REGEX)
+        view.settings().set("result_line_regex", RESULT_LINE_REGEX)
+        view.settings().set("result_base_dir", root)
+        view.settings().set("word_wrap", False)
+        view.run_command("append", {"characters": u"Checking links{0}…\n\n".format(" and URLs" if check_remote else "")})
+        sublime.set_timeout_async(lambda: self.check(view, root, check_remote), 0)
+
+    def check(self, view, root, check_remote):
+        checker = get_link_checker(root)
+        report = checker.run(fresh_catalog(root).iter_notes(), check_remote)
+        checker.save()
+        lines = []
+        for relpath in sorted(report):
+            lines.append(relpath + u":")
+            for line, kind, target, reason in report[relpath]:
+                lines.append(u"  {0}: {1} {2} ({3})".format(line, kind, target, reason))
+            lines.append(u"")
+        count = sum(len(problems) for problems in report.values())
+        lines.append(u"{0} broken reference(s) in {1} note(s).".format(count, len(report)))
+        text = u"\n".join(lines) + u"\n"
+        sublime.set_timeout(lambda: view.run_command("append", {"characters": text}), 0)
+
+
+def forget_link_checkers():
+    # built with the old brain directory, workers and proxies
+    for checker in link_checkers.values():
+        checker.save()
+    link_checkers.clear()
+
+
+def plugin_loaded():
+    global link_checkers
+    link_checkers = {}
+    on_config_change("notes_check_links", forget_link_checkers)
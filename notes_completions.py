@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+
+import sublime, sublime_plugin
+import os
+import re
+
+from .notes import fresh_catalog
+from .notes_config import get_root, on_config_change
+from .lib.trie import NoteTitles, note_title
+from .lib.links import relative_link
+
+try:
+    from urllib.parse import quote
+except ImportError:
+    from urllib import quote
+
+# an unclosed [[ or ]( right before the caret, and what was typed after it
+WIKI_CONTEXT_RE = re.compile(r'\[\[([^\[\]|#]*)$')
+MARKDOWN_CONTEXT_RE = re.compile(r'\]\(<?([^()\s>]*)$')
+MAX_COMPLETIONS = 100
+# what, typed right before the caret, opens the completions
+LINK_OPENERS = ('[[', '](')
+
+
+def get_note_titles(root):
+    """The title trie of a root, or None while it is being built."""
+    titles = note_titles.get(root)
+    if titles is None:
+        note_titles[root] = False
+        sublime.set_timeout_async(lambda: build_note_titles(root), 0)
+    return titles or None
+
+
+def build_note_titles(root):
+    note_titles[root] = NoteTitles().follow(fresh_catalog(root))
+
+
+def completion(typed, prefix, text, annotation):
+    """A completion replacing `prefix`, the tail of `typed`, to make `text`.
+
+    Sublime only replaces the word at the caret, so the part of `text`
+    before that word has to match what was typed already.
+    """
+    head = len(typed) - len(prefix)
+    if text.lower().startswith(typed.lower()):
+        contents = text[head:]
+    elif head == 0:
+        contents = text
+    else:
+        return None
+    return [u"{0}\t{1}".format(text, annotation), contents.replace('$', '\\$')]
+
+
+class NoteLinkCompletions(sublime_plugin.EventListener):
+
+    def on_query_completions(self, view, prefix, locations):
+        if not view.settings().get("is_note") or not view.file_name():
+            return None
+        point = locations[0]
+        before = view.substr(sublime.Region(view.line(point).begin(), point))
+        wiki = WIKI_CONTEXT_RE.search(before)
+        markdown = None if wiki else MARKDOWN_CONTEXT_RE.search(before)
+        if not (wiki or markdown):
+            return None
+        root = get_root()
+        titles = get_note_titles(root)
+        if titles is None:
+            return None
+        source = os.path.relpath(view.file_name(), root)
+        completions = []
+        if wiki:
+            typed = wiki.group(1)
+            for relpath in titles.find(typed, MAX_COMPLETIONS):
+                item = completion(typed, prefix, note_title(relpath), "note")
+                if item and item not in completions:
+                    completions.append(item)
+        else:
+            typed = markdown.group(1)
+            # look the typed path up relative to the root, titles too while
+            # no folder was typed
+            key = os.path.normpath(os.path.join(os.path.dirname(source), typed)) if typed else ''
+            if key == os.curdir:
+                key = ''
+            elif typed.endswith('/'):
+                key += '/'
+            found = titles.find(key.replace(os.path.sep, '/'), MAX_COMPLETIONS)
+            if '/' not in typed:
+                found += [p for p in titles.find(typed, MAX_COMPLETIONS) if p not in found]
+            for relpath in found:
+                if relpath == source:
+                    continue
+                link = relative_link(source, relpath)
+                if ' ' in link:
+                    link = quote(link)
+                item = completion(typed, prefix, link, note_title(relpath))
+                if item:
+                    completions.append(item)
+        return (completions, sublime.INHIBIT_WORD_COMPLETIONS | sublime.INHIBIT_EXPLICIT_COMPLETIONS)
+
+    def on_modified(self, view):
+        # only link openers pop the completions up, not every bracket of the prose
+        if not view.settings().get("is_note") or len(view.sel()) != 1:
+            return
+        point = view.sel()[0].b
+        if view.substr(sublime.Region(point - 2, point)) in LINK_OPENERS:
+            view.run_command("auto_complete", {"disable_auto_insert": True})
+
+    def on_activated_async(self, view):
+        # build the trie before the first completion is asked for
+        if view.settings().get("is_note"):
+            get_note_titles(get_root())
+
+
+def forget_note_titles():
+    # the titles follow catalogs the notes module just dropped
+    for titles in note_titles.values():
+        if titles:
+            titles.unfollow()
+    note_titles.clear()
+
+
+def plugin_loaded():
+    global note_titles
+    note_titles = {}
+    on_config_change("notes_completions", forget_note_titles)
+
+
+def plugin_unloaded():
+    for titles in note_titles.values():
+        if titles:
+            titles.unfollow()
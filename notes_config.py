@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+
+"""
+Settings of PlainNotes, parsed once and shared by every module.
+
+`config()` returns an immutable snapshot of Notes.sublime-settings holding
+what commands and listeners need on hot paths in its final form: the
+normalized root folders, the brain and archive directories, a compiled
+note extension matcher, the exclude set used when scanning and the list
+options. The snapshot is rebuilt after the settings change, and modules
+caching anything built from it register with `on_config_change()` to drop
+it at that moment.
+
+Projects can override the roots; `get_roots()` caches them per window on
+top of the snapshot and registers them in a realpath prefix index that
+answers "is this file a note?".
+"""
+
+import sublime
+import os
+from collections import namedtuple
+
+from .lib.walker import extension_matcher
+from .lib.roots import RootIndex
+
+SETTINGS_FILE = 'Notes.sublime-settings'
+
+Config = namedtuple('Config', [
+    'root', 'roots', 'brain_dir', 'archive_dir', 'extensions', 'save_extension',
+    'is_note', 'exclude', 'list_options', 'packed_archive', 'worker_threads',
+    'preview_lines', 'export_dir', 'export_folders', 'watcher'])
+ListOptions = namedtuple('ListOptions', [
+    'display_modified_date', 'display_folder', 'display_full_path', 'display_yaml_title'])
+WatcherOptions = namedtuple('WatcherOptions', [
+    'enabled', 'use_inotify', 'poll_interval', 'full_scan_interval', 'max_dirs_per_poll'])
+WATCHER_DEFAULTS = WatcherOptions(True, True, 5, 300, 2000)
+
+_config = None
+_change_hooks = {}
+window_roots = {}
+root_index = RootIndex()
+
+
+def settings():
+    return sublime.load_settings(SETTINGS_FILE)
+
+
+def normalize_path(path):
+    return os.path.normpath(os.path.expanduser(path))
+
+
+def unique_roots(roots):
+    normalized = []
+    for root in roots:
+        root = normalize_path(root)
+        if root not in normalized:
+            normalized.append(root)
+    return tuple(normalized)
+
+
+def read_config():
+    s = settings()
+    brain_dir = s.get("jotter_dir") or ".brain"
+    extensions = tuple(s.get("note_file_extensions") or [])
+    list_options = s.get("list_options")
+    if list_options is None:
+        list_options = {"display_modified_date": True, "display_folder": True}
+    watcher = s.get("watcher") or {}
+    export_dir = s.get("export_dir")
+    return Config(
+        root=normalize_path(s.get("root")),
+        roots=unique_roots([s.get("root")] + (s.get("roots") or [])),
+        brain_dir=brain_dir,
+        archive_dir=s.get("archive_dir"),
+        extensions=extensions,
+        save_extension=s.get("note_save_extension"),
+        is_note=extension_matcher(extensions),
+        exclude=frozenset([brain_dir]),
+        list_options=ListOptions(*[bool(list_options.get(option)) for option in ListOptions._fields]),
+        packed_archive=bool(s.get("packed_archive")),
+        worker_threads=s.get("worker_threads", 8),
+        preview_lines=s.get("note_preview_lines", 15),
+        export_dir=normalize_path(export_dir) if export_dir else None,
+        export_folders=tuple(os.path.normpath(folder) for folder in s.get("export_folders") or []),
+        watcher=WatcherOptions(*[watcher.get(option, default) for option, default
+                                 in zip(WatcherOptions._fields, WATCHER_DEFAULTS)]))
+
+
+def config():
+    global _config
+    if _config is None:
+        _config = read_config()
+        settings().add_on_change("notes_config", on_settings_change)
+    return _config
+
+
+def on_config_change(key, callback):
+    """Call `callback` after the settings change, before the next `config()`.
+
+    One callback per `key`, so a module reloaded by Sublime Text replaces
+    its own.
+    """
+    _change_hooks[key] = callback
+
+
+def on_settings_change():
+    global _config
+    _config = None
+    window_roots.clear()
+    root_index.clear()
+    for callback in list(_change_hooks.values()):
+        callback()
+
+
+def brain_dir():
+    return config().brain_dir
+
+
+def get_roots(window=None):
+    """Note roots of a window, the primary one (brain, inbox) first.
+
+    Cached per window until the settings or the window's project change.
+    """
+    if window is None:
+        window = sublime.active_window()
+    window_id = window.id() if window else None
+    roots = window_roots.get(window_id)
+    if roots is None:
+        view = window.active_view() if window else None
+        project_settings = (view.settings().get('PlainNotes') if view else None) or {}
+        if project_settings:
+            roots = unique_roots([project_settings.get('root', settings().get("root"))] +
+                                 project_settings.get('roots', settings().get("roots") or []))
+        else:
+            roots = config().roots
+        window_roots[window_id] = roots
+        root_index.add(roots)
+    return roots
+
+
+def get_root(window=None):
+    return get_roots(window)[0]
+
+
+def forget_window(window):
+    window_roots.pop(window.id(), None)
+
+
+def plugin_unloaded():
+    settings().clear_on_change("notes_config")
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+
+import sublime, sublime_plugin
+import os
+import re
+
+from .notes import get_catalog, fresh_catalog
+from .notes_config import config, settings, get_root, brain_dir, on_config_change
+from .lib.duplicates import Fingerprints, clusters
+
+# double-clicking a note line opens it
+RESULT_FILE_REGEX = r'^  (?:keep|extra)  (.+)$'
+CLUSTER_RE = re.compile(r'^Cluster (\d+)')
+
+
+def get_fingerprints(root):
+    fingerprints = fingerprint_caches.get(root)
+    if fingerprints is None:
+        fingerprints = Fingerprints(root, os.path.join(root, brain_dir(), 'fingerprints.json'))
+        fingerprints.load()
+        fingerprint_caches[root] = fingerprints
+    return fingerprints
+
+
+class NotesFindDuplicatesCommand(sublime_plugin.WindowCommand):
+
+    def run(self):
+        self.root = get_root()
+        sublime.set_timeout_async(self.find_duplicates, 0)
+
+    def find_duplicates(self):
+        catalog = fresh_catalog(self.root)
+        fingerprints = get_fingerprints(self.root).sync(catalog.iter_notes())
+        fingerprints.save()
+        threshold = settings().get("duplicate_threshold", 0.8)
+        found = clusters(fingerprints.signatures(lambda relpath: not catalog.is_archived(relpath)), threshold)
+        if not found:
+            sublime.status_message("    No near-duplicate notes.")
+            return
+        # keep the most recently modified note of each cluster
+        mtimes = dict((relpath, mtime) for relpath, mtime, _ in catalog.iter_notes())
+        groups = [sorted(group, key=lambda p: -mtimes.get(p, 0)) for _, group in sorted(found, reverse=True)]
+        lines = [u"Near-duplicate notes, {0}% similar or more. Double-click a note to open it;".format(int(threshold * 100)),
+                 u"run 'PlainNotes: Archive duplicate extras' on a cluster (or here for all) to archive its extras.", u""]
+        for n, group in enumerate(groups):
+            lines.append(u"Cluster {0} ({1} notes)".format(n + 1, len(group)))
+            for i, relpath in enumerate(group):
+                lines.append(u"  {0}  {1}".format("keep " if i == 0 else "extra", relpath))
+            lines.append(u"")
+        sublime.set_timeout(lambda: self.show_report(groups, u"\n".join(lines)), 0)
+
+    def show_report(self, groups, text):
+        view = self.window.new_file()
+        view.set_scratch(True)
+        view.set_name(u"≈ Duplicate notes")
+        view.settings().set("result_file_regex", RESULT_FILE_REGEX)
+        view.settings().set("result_base_dir", self.root)
+        view.settings().set("word_wrap", False)
+        view.settings().set("notes_duplicates", {"root": self.root, "clusters": groups})
+        view.run_command("append", {"characters": text})
+
+
+class NotesArchiveDuplicatesCommand(sublime_plugin.TextCommand):
+
+    def run(self, edit):
+        report = self.view.settings().get("notes_duplicates")
+        groups = report["clusters"]
+        chosen = set()
+        for region in self.view.sel():
+            row = self.view.rowcol(region.begin())[0]
+            while row >= 0:
+                line = self.view.substr(self.view.line(self.view.text_point(row, 0)))
+                if not line.strip():
+                    break
+                m = CLUSTER_RE.match(line)
+                if m:
+                    chosen.add(int(m.group(1)) - 1)
+                    break
+                row -= 1
+        if not chosen:
+            chosen = set(range(len(groups)))
+        extras = [relpath for i in sorted(chosen) for relpath in groups[i][1:]]
+        root = report["root"]
+        catalog = get_catalog(root)
+        archive_dir = os.path.join(root, config().archive_dir)
+        moves = [[os.path.join(root, relpath), os.path.join(archive_dir, relpath)]
+                 for relpath in extras if catalog.stat(relpath) is not None]
+        if moves and sublime.ok_cancel_dialog(u"Archive {0} duplicate note(s)?".format(len(moves)), "Archive"):
+            sublime.run_command("notes_move", {"moves": moves})
+
+    def is_enabled(self):
+        return bool(self.view.settings().get("notes_duplicates"))
+
+
+def forget_fingerprints():
+    for fingerprints in fingerprint_caches.values():
+        fingerprints.save()
+    fingerprint_caches.clear()
+
+
+def plugin_loaded():
+    global fingerprint_caches
+    fingerprint_caches = {}
+    on_config_change("notes_duplicates", forget_fingerprints)
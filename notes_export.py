@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+import sublime, sublime_plugin
+import os
+import time
+
+from .notes import fresh_catalog
+from .notes_config import config, get_root, brain_dir, on_config_change
+from .lib.export import HtmlExport
+
+
+def get_exporter(root, out_dir):
+    exporter = exporters.get((root, out_dir))
+    if exporter is None:
+        exporter = HtmlExport(root, out_dir, os.path.join(root, brain_dir(), 'export.json'),
+                              config().extensions, workers=config().worker_threads)
+        exporter.load()
+        exporters[(root, out_dir)] = exporter
+    return exporter
+
+
+def in_folders(relpath, folders):
+    return not folders or any(relpath.startswith(folder + os.path.sep) for folder in folders)
+
+
+class NotesExportHtmlCommand(sublime_plugin.WindowCommand):
+
+    def run(self):
+        out_dir = config().export_dir
+        if not out_dir:
+            sublime.error_message("No export folder: set \"export_dir\" in the PlainNotes settings.")
+            return
+        root = get_root(self.window)
+        sublime.status_message("    Exporting notes…")
+        sublime.set_timeout_async(lambda: self.export(root, out_dir), 0)
+
+    def export(self, root, out_dir):
+        started = time.time()
+        folders = config().export_folders
+        catalog = fresh_catalog(root)
+        notes = [note for note in catalog.iter_notes()
+                 if not catalog.is_archived(note[0]) and in_folders(note[0], folders)]
+        exporter = get_exporter(root, out_dir)
+        exported, unchanged, removed = exporter.run(notes)
+        exporter.save()
+        sublime.status_message("    {0} note(s) exported, {1} unchanged, {2} removed in {3:.1f}s.".format(
+            len(exported), len(unchanged), len(removed), time.time() - started))
+
+
+def forget_exporters():
+    # built with the old extensions and workers
+    for exporter in exporters.values():
+        exporter.save()
+    exporters.clear()
+
+
+def plugin_loaded():
+    global exporters
+    exporters = {}
+    on_config_change("notes_export", forget_exporters)
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+import sublime, sublime_plugin
+import os
+
+from .notes import get_catalog, fresh_catalog
+from .notes_config import get_root, brain_dir, on_config_change
+from .lib.headings import HeadingIndex
+
+
+def get_heading_index(root):
+    index = heading_indexes.get(root)
+    if index is None:
+        index = HeadingIndex(root, os.path.join(root, brain_dir(), 'headings.json'))
+        index.load()
+        heading_indexes[root] = index
+    return index
+
+
+def synced_heading_index(root):
+    index = get_heading_index(root).sync(fresh_catalog(root).iter_notes())
+    index.save()
+    return index
+
+
+class NotesGotoHeadingCommand(sublime_plugin.WindowCommand):
+
+    def run(self):
+        self.root = get_root()
+        sublime.set_timeout_async(self.list_headings, 0)
+
+    def list_headings(self):
+        catalog = get_catalog(self.root)
+        index = synced_heading_index(self.root)
+        self.headings = index.headings(lambda relpath: not catalog.is_archived(relpath))
+        if not self.headings:
+            sublime.status_message("    No headings found.")
+            return
+        items = [[text, u"{0}  {1}".format("#" * level, relpath)] for relpath, level, text, _ in self.headings]
+        sublime.set_timeout(lambda: self.window.show_quick_panel(items, self.open_heading), 0)
+
+    def open_heading(self, index):
+        if index == -1:
+            return
+        relpath, _, _, line = self.headings[index]
+        sublime.run_command("notes_open", {"file_path": os.path.join(self.root, relpath), "line": line})
+
+
+class NoteHeadingsEvents(sublime_plugin.EventListener):
+
+    def on_post_save_async(self, view):
+        if not view.settings().get("is_note"):
+            return
+        root = get_root()
+        index = heading_indexes.get(root)
+        if index is None:
+            return
+        relpath = os.path.relpath(view.file_name(), root)
+        stat = get_catalog(root).stat(relpath)
+        if stat is not None:
+            # persisted on the next listing
+            index.update(relpath, stat[0], view.substr(sublime.Region(0, view.size())))
+
+
+def forget_heading_indexes():
+    for index in heading_indexes.values():
+        index.save()
+    heading_indexes.clear()
+
+
+def plugin_loaded():
+    global heading_indexes
+    heading_indexes = {}
+    on_config_change("notes_headings", forget_heading_indexes)
+
+
+def plugin_unloaded():
+    for index in heading_indexes.values():
+        index.save()
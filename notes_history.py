@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+
+import sublime, sublime_plugin
+import os
+import time
+import difflib
+
+from .notes_config import config, settings, get_roots, get_root, brain_dir, root_index, on_config_change
+from .lib.history import NoteHistory
+
+
+def get_history(root):
+    history = histories.get(root)
+    if history is None:
+        history = NoteHistory(os.path.join(root, brain_dir(), 'history'))
+        history.load()
+        histories[root] = history
+    return history
+
+
+def snapshot(view):
+    """Record the saved content of a note view; runs on the async thread."""
+    file_name = view.file_name()
+    if not file_name or not config().is_note(file_name) or not settings().get("history", True):
+        return
+    get_roots(view.window() or sublime.active_window())  # make sure the roots are indexed
+    root = root_index.root_of(file_name)
+    if root is None:
+        return
+    try:
+        with open(file_name, 'rb') as f:
+            data = f.read()
+    except (IOError, OSError):
+        return
+    get_history(root).snapshot(os.path.relpath(file_name, root), data)
+
+
+class NoteHistoryCommand(sublime_plugin.WindowCommand):
+
+    def run(self):
+        self.view = self.window.active_view()
+        self.root = root_index.root_of(self.view.file_name()) or get_root(self.window)
+        self.relpath = os.path.relpath(self.view.file_name(), self.root)
+        sublime.set_timeout_async(self.list_versions, 0)
+
+    def list_versions(self):
+        self.history = get_history(self.root)
+        self.versions = self.history.history(self.relpath)
+        if not self.versions:
+            sublime.status_message("    No history for this note yet.")
+            return
+        items = [[time.strftime("%d/%m/%Y %H:%M:%S", time.localtime(when)), sha[:10]]
+                 for when, sha in self.versions]
+        sublime.set_timeout(lambda: self.window.show_quick_panel(items, self.choose_action), 0)
+
+    def choose_action(self, index):
+        if index == -1:
+            return
+        self.version = self.versions[index]
+        actions = ["Diff with the current note", "Restore this version"]
+        sublime.set_timeout(lambda: self.window.show_quick_panel(actions, self.on_action), 0)
+
+    def on_action(self, index):
+        if index == -1:
+            return
+        text = self.history.read(self.version[1]).decode('utf-8', 'replace')
+        if index == 0:
+            self.show_diff(text)
+        else:
+            # into the buffer, so the restore can be undone and is saved as a new version
+            self.view.run_command("note_set_content", {"text": text})
+
+    def show_diff(self, text):
+        current = self.view.substr(sublime.Region(0, self.view.size()))
+        label = time.strftime("%d/%m/%Y %H:%M:%S", time.localtime(self.version[0]))
+        diff = difflib.unified_diff(text.splitlines(True), current.splitlines(True),
+                                    u"{0} ({1})".format(self.relpath, label), u"{0} (current)".format(self.relpath))
+        view = self.window.new_file()
+        view.set_scratch(True)
+        view.set_name(u"History: " + os.path.basename(self.relpath))
+        view.set_syntax_file("Packages/Diff/Diff.sublime-syntax")
+        view.run_command("append", {"characters": u"".join(diff) or u"No differences.\n"})
+
+    def is_enabled(self):
+        view = self.window.active_view()
+        return bool(view and view.file_name() and view.settings().get("is_note"))
+
+
+class NoteSetContentCommand(sublime_plugin.TextCommand):
+
+    def run(self, edit, text):
+        self.view.replace(edit, sublime.Region(0, self.view.size()), text)
+
+
+class NoteHistoryEvents(sublime_plugin.EventListener):
+
+    def on_post_save_async(self, view):
+        snapshot(view)
+
+
+def forget_histories():
+    for history in histories.values():
+        history.save()
+    histories.clear()
+
+
+def plugin_loaded():
+    global histories
+    histories = {}
+    on_config_change("notes_history", forget_histories)
+
+
+def plugin_unloaded():
+    for history in histories.values():
+        history.save()
@@ -1,31 +1,15 @@
 # -*- coding: utf-8 -*-
 
 import sublime, sublime_plugin
-import os, fnmatch, re
+import os, re
+
+from .lib.walker import walk
+from .notes_config import config, get_root
 
 TAB_SIZE = 2
 COL_WIDTH = 30
 
 
-def settings():
-    return sublime.load_settings('Notes.sublime-settings')
-
-
-def get_root():
-    project_settings = sublime.active_window().active_view().settings().get('PlainNotes')
-    if project_settings:
-        return os.path.normpath(os.path.expanduser(project_settings.get('root',settings().get("root"))))
-    else:
-        return os.path.normpath(os.path.expanduser(settings().get("root")))
-
-def brain_dir():
-    brain_settings = settings().get("jotter_dir")
-    if brain_settings:
-        return brain_settings
-    else:
-        return ".brain"
-
-
 class NotesBufferCommand(sublime_plugin.WindowCommand):
     def run(self):
         view = self.window.new_file()
@@ -44,7 +28,7 @@ class NotesBufferRefreshCommand(sublime_plugin.TextCommand):
         v.set_read_only(False)
         v.erase(edit, sublime.Region(0, self.view.size()))
         root = get_root()
-        lines = self.list_files(root)
+        lines = list(self.list_files(root))
 
         v.settings().set('notes_buffer_files', lines)
 
@@ -52,26 +36,23 @@ class NotesBufferRefreshCommand(sublime_plugin.TextCommand):
         v.set_read_only(True)
 
     def list_files(self, path):
-        lines = []
-        for root, dirs, files in os.walk(path, topdown=False):
+        cfg = config()
+        archive_dir = cfg.archive_dir
+        for root, dirs, files in walk(path, cfg.is_note, exclude=cfg.exclude, topdown=False):
             level = root.replace(path, '').count(os.sep) - 1
             indent = ' ' * TAB_SIZE * (level)
             relpath = os.path.relpath(root, path)
             if not relpath.startswith("."):
-                line_str = u'{0}▣ {1}'.format(indent, os.path.relpath(root, path))
-                lines.append((line_str, root))
-            if relpath.startswith(settings().get("archive_dir")):
+                line_str = u'{0}▣ {1}'.format(indent, relpath)
+                yield (line_str, root)
+            if relpath.startswith(archive_dir):
                 line_str = u'{0}▣ {1}'.format(indent, 'Archive')
-                lines.append((line_str, root))
-            if not relpath.startswith(brain_dir()):
-                subindent = ' ' * TAB_SIZE * (level + 1)
-                for f in files:
-                    for ext in settings().get("note_file_extensions"):  # display only files with given extension
-                        if fnmatch.fnmatch(f, "*." + ext):
-                            line_str = u'{0}≡ {1}'.format(subindent, re.sub(r'\.note$', '', f))
-                            line_path = os.path.normpath(os.path.join(root, f))
-                            lines.append((line_str, line_path))
-        return lines
+                yield (line_str, root)
+            subindent = ' ' * TAB_SIZE * (level + 1)
+            for f in files:
+                line_str = u'{0}≡ {1}'.format(subindent, re.sub(r'\.note$', '', f.name))
+                line_path = os.path.normpath(f.path)
+                yield (line_str, line_path)
 
 
 class NotesBufferOpenCommand(sublime_plugin.TextCommand):
@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+
+import sublime, sublime_plugin
+import os
+
+from .notes import get_catalog, fresh_catalog, update_color, save_to_brain, pack_notes
+from .notes_config import config, get_root, get_roots, brain_dir, root_index, on_config_change
+from .notes_query import run_query
+from .lib.helpers import read_text, write_atomic
+from .lib.links import LinkGraph, rewrite_links
+from .lib.query import QueryError
+
+STATUS_KEY = "notes_backlinks"
+
+
+def get_link_graph(root):
+    graph = link_graphs.get(root)
+    if graph is None:
+        graph = LinkGraph(root, os.path.join(root, brain_dir(), 'links.json'))
+        graph.load()
+        link_graphs[root] = graph
+    return graph
+
+
+def synced_link_graph(root):
+    graph = get_link_graph(root).sync(fresh_catalog(root).iter_notes())
+    graph.save()
+    return graph
+
+
+def note_relpath(view, root):
+    file_name = view.file_name()
+    if not file_name or not view.settings().get("is_note"):
+        return None
+    return os.path.relpath(file_name, root)
+
+
+def show_backlink_count(view, graph, relpath):
+    count = len(graph.backlinks(relpath))
+    if count:
+        view.set_status(STATUS_KEY, u"⇠ {0} backlink{1}".format(count, "" if count == 1 else "s"))
+    else:
+        view.erase_status(STATUS_KEY)
+
+
+def open_views():
+    views = {}
+    for window in sublime.windows():
+        for view in window.views():
+            if view.file_name():
+                views[view.file_name()] = view
+    return views
+
+
+def move_notes(root, moves):
+    """Move notes and rewrite every link pointing at them in one pass.
+
+    `moves` is a list of (old path, new path) pairs under `root`. Notes
+    whose target already exists are not moved. Notes with unsaved changes
+    or that are not UTF-8 are moved all the same, but their links are left
+    as they are. The brain and the link graph are written once at the end.
+
+    Returns (moved, skipped, unlinked): the old paths of the notes moved
+    and not moved, and the paths of the notes whose links were not
+    updated.
+    """
+    graph = synced_link_graph(root)
+    catalog = get_catalog(root)
+    views = open_views()
+    moved, skipped, unlinked = [], [], []
+    relmoves = {}
+    for old_path, new_path in moves:
+        if (os.path.exists(new_path) or not os.path.isfile(old_path) or
+                root_index.root_of(new_path) != root):
+            skipped.append(old_path)
+        else:
+            relmoves[os.path.relpath(old_path, root)] = os.path.relpath(new_path, root)
+
+    # every note linking to a moved note, plus the moved notes themselves
+    sources = set(relmoves)
+    for old in relmoves:
+        sources.update(graph.backlinks(old))
+    rewritten = {}
+    for source in sources:
+        path = os.path.join(root, source)
+        view = views.get(path)
+        if view is not None and view.is_dirty():
+            unlinked.append(path)
+            continue
+        try:
+            text = read_text(path)
+        except UnicodeDecodeError:
+            unlinked.append(path)
+            continue
+        except (IOError, OSError):
+            continue
+        new_text = rewrite_links(text, source, relmoves.get(source, source), relmoves)
+        if new_text != text:
+            write_atomic(path, new_text)
+            rewritten[source] = new_text
+
+    for old, new in relmoves.items():
+        old_path, new_path = os.path.join(root, old), os.path.join(root, new)
+        os.renames(old_path, new_path)
+        catalog.move(old_path, new_path)
+        update_color(old_path, new_path, save=False)
+        graph.remove(old)
+        view = views.get(old_path)
+        if view is not None:
+            view.retarget(new_path)
+        moved.append(old_path)
+    save_to_brain()
+
+    for source in rewritten:
+        if source not in relmoves:
+            catalog.touch(os.path.join(root, source))
+    reparse = dict((relmoves.get(source, source), text) for source, text in rewritten.items())
+    for new in relmoves.values():
+        reparse.setdefault(new, None)
+    for relpath, text in reparse.items():
+        stat = catalog.stat(relpath)
+        if stat is not None:
+            graph.update(relpath, stat[0], text)
+    catalog.save()
+    graph.save()
+    if config().packed_archive:
+        archived = [os.path.join(root, new) for new in relmoves.values() if catalog.is_archived(new)]
+        if archived:
+            pack_notes(root, archived)
+    return moved, skipped, unlinked
+
+
+def report_moves(moved, skipped, unlinked, verb="moved"):
+    problems = []
+    if skipped:
+        problems.append("Could not move:\n" + "\n".join(skipped))
+    if unlinked:
+        problems.append("Links not updated in (unsaved changes or not UTF-8):\n" + "\n".join(unlinked))
+    if problems:
+        sublime.error_message("\n\n".join(problems))
+    sublime.status_message("    {0} note(s) {1}.".format(len(moved), verb))
+
+
+class NotesMoveCommand(sublime_plugin.ApplicationCommand):
+    """Move notes, fix the links to them and carry their color schemes
+    along. Runs on the async thread; `open` is opened once it is moved, and
+    `verb` names the move in the final status message."""
+
+    def run(self, moves, open=None, verb="moved"):
+        get_roots()  # registers the roots of the active window in root_index
+        sublime.set_timeout_async(lambda: self.move(moves, open, verb), 0)
+
+    def move(self, moves, open_path, verb):
+        by_root = {}
+        outside = []
+        for old_path, new_path in moves:
+            root = root_index.root_of(old_path)
+            if root is None:
+                outside.append(old_path)
+            else:
+                by_root.setdefault(root, []).append([old_path, new_path])
+        moved, skipped, unlinked = [], outside, []
+        for root, root_moves in by_root.items():
+            results = move_notes(root, root_moves)
+            moved += results[0]
+            skipped += results[1]
+            unlinked += results[2]
+        report_moves(moved, skipped, unlinked, verb)
+        if open_path is not None and os.path.isfile(open_path):
+            sublime.set_timeout(lambda: sublime.run_command("notes_open", {"file_path": open_path}), 0)
+
+
+class NotesMoveMatchingCommand(sublime_plugin.WindowCommand):
+
+    def run(self):
+        self.root = get_root()
+        self.window.show_input_panel("Move notes matching query:", "", self.on_query, None, None)
+
+    def on_query(self, query):
+        sublime.set_timeout_async(lambda: self.query(query), 0)
+
+    def query(self, query):
+        try:
+            self.file_list = run_query(self.root, query)
+        except QueryError as e:
+            sublime.error_message("Invalid query: {0}".format(e))
+            return
+        if not len(self.file_list):
+            sublime.status_message(u"    No notes match '{0}'.".format(query))
+            return
+        sublime.set_timeout(lambda: self.window.show_input_panel(
+            "Move {0} note(s) to folder:".format(len(self.file_list)), "", self.on_folder, None, None), 0)
+
+    def on_folder(self, folder):
+        directory = os.path.normpath(os.path.join(self.root, folder))
+        moves = [[self.file_list.path(i), os.path.join(directory, self.file_list.names[i])]
+                 for i in range(len(self.file_list))]
+        if sublime.ok_cancel_dialog("Move {0} note(s) to '{1}' and update the links to them?".format(
+                len(moves), folder or "/"), "Move"):
+            sublime.run_command("notes_move", {"moves": moves})
+
+
+class NoteShowBacklinksCommand(sublime_plugin.WindowCommand):
+
+    def run(self):
+        self.root = get_root()
+        relpath = note_relpath(self.window.active_view(), self.root)
+        sublime.set_timeout_async(lambda: self.list_backlinks(relpath), 0)
+
+    def list_backlinks(self, relpath):
+        self.sources = synced_link_graph(self.root).backlinks(relpath)
+        if not self.sources:
+            sublime.status_message("    No notes link to this note.")
+            return
+        items = [[os.path.splitext(os.path.basename(source))[0], source] for source in self.sources]
+        sublime.set_timeout(lambda: self.window.show_quick_panel(items, self.open_source), 0)
+
+    def open_source(self, index):
+        if index == -1:
+            return
+        sublime.run_command("notes_open", {"file_path": os.path.join(self.root, self.sources[index])})
+
+    def is_enabled(self):
+        is_note = self.window.active_view().settings().get("is_note")
+        if is_note:
+            return is_note
+        else:
+            return False
+
+
+class NoteBacklinksEvents(sublime_plugin.EventListener):
+
+    def on_activated_async(self, view):
+        root = get_root()
+        relpath = note_relpath(view, root)
+        if relpath is None:
+            return
+        graph = link_graphs.get(root)
+        if graph is None:
+            # first note shown for this root: load and catch up once
+            graph = synced_link_graph(root)
+        show_backlink_count(view, graph, relpath)
+
+    def on_post_save_async(self, view):
+        root = get_root()
+        relpath = note_relpath(view, root)
+        if relpath is None:
+            return
+        stat = get_catalog(root).stat(relpath)
+        if stat is None:
+            return
+        # only the saved note is re-parsed, from the buffer; persisted on
+        # the next backlinks listing or move
+        graph = get_link_graph(root)
+        graph.update(relpath, stat[0], view.substr(sublime.Region(0, view.size())))
+        show_backlink_count(view, graph, relpath)
+
+
+def forget_link_graphs():
+    for graph in link_graphs.values():
+        graph.save()
+    link_graphs.clear()
+
+
+def plugin_loaded():
+    global link_graphs
+    link_graphs = {}
+    on_config_change("notes_links", forget_link_graphs)
+
+
+def plugin_unloaded():
+    for graph in link_graphs.values():
+        graph.save()
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+import sublime, sublime_plugin
+
+from .notes import fresh_catalog, setup_notes_list
+from .notes_config import config, get_root
+from .notes_tags import synced_tag_index
+from .lib.notelist import NoteList
+from .lib.query import Note, QueryError, parse
+from .lib.tags import folder_of
+
+
+def run_query(root, query):
+    predicate, archived_given = parse(query)
+    archive_dir = config().archive_dir
+    catalog = fresh_catalog(root)
+    tag_index = synced_tag_index(root)
+    matches = []
+    for relpath, mtime, size in catalog.iter_notes():
+        archived = catalog.is_archived(relpath)
+        if archived and not archived_given:
+            continue
+        note = Note(relpath, folder_of(relpath, archive_dir).lower(), mtime, size, archived,
+                    set(tag.lower() for tag in tag_index.tags_of(relpath)))
+        if predicate(note):
+            matches.append((relpath, mtime))
+    return NoteList.from_entries(root, matches)
+
+
+class NotesQueryCommand(sublime_plugin.WindowCommand):
+
+    last_query = ""
+
+    def run(self):
+        self.root = get_root()
+        self.window.show_input_panel("Query (tag: folder: modified: archived: size:):",
+                                     NotesQueryCommand.last_query, self.on_done, None, None)
+
+    def on_done(self, query):
+        NotesQueryCommand.last_query = query
+        sublime.set_timeout_async(lambda: self.query(query), 0)
+
+    def query(self, query):
+        try:
+            self.file_list = run_query(self.root, query)
+        except QueryError as e:
+            sublime.error_message("Invalid query: {0}".format(e))
+            sublime.set_timeout(self.run, 0)
+            return
+        if not len(self.file_list):
+            sublime.status_message(u"    No notes match '{0}'.".format(query))
+            return
+        rlist = setup_notes_list(self.file_list)
+        sublime.set_timeout(lambda: self.window.show_quick_panel(rlist, self.open_note), 0)
+
+    def open_note(self, index):
+        if index == -1:
+            return
+        sublime.run_command("notes_open", {"file_path": self.file_list.path(index)})
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+import sublime, sublime_plugin
+import os
+
+from .notes import get_catalog, fresh_catalog
+from .notes_config import config, settings, get_root
+from .lib import replace
+
+
+class NotesReplaceCommand(sublime_plugin.WindowCommand):
+
+    def run(self):
+        self.root = get_root()
+        self.window.show_input_panel("Find in notes:", "", self.on_find, None, None)
+
+    def on_find(self, find):
+        if not find:
+            return
+        self.find = find
+        self.window.show_input_panel(u"Replace '{0}' with:".format(find), "", self.on_replace, None, None)
+
+    def on_replace(self, replacement):
+        self.replacement = replacement
+        self.view = self.window.new_file()
+        self.view.set_scratch(True)
+        self.view.set_name(u"✎ Replace in notes")
+        self.view.set_syntax_file("Packages/Diff/Diff.sublime-syntax")
+        self.view.run_command("append", {"characters": u"Replacing '{0}' with '{1}'\n\n".format(self.find, replacement)})
+        sublime.set_timeout_async(self.plan, 0)
+
+    def paths(self):
+        # same root, extensions and excludes as the notes list
+        catalog = fresh_catalog(self.root)
+        include_archived = settings().get("replace_include_archived", False)
+        for relpath, _, _ in catalog.iter_notes():
+            if include_archived or not catalog.is_archived(relpath):
+                yield os.path.join(self.root, relpath)
+
+    def plan(self):
+        self.plans = []
+        undecodable = []
+        workers = config().worker_threads
+        for plan in replace.plan_replacement(list(self.paths()), self.find, self.replacement, workers, undecodable):
+            self.plans.append(plan)
+            self.show_plan(plan)
+        changes = sum(plan.count for plan in self.plans)
+        self.append(u"{0} replacement(s) in {1} note(s).\n".format(changes, len(self.plans)))
+        if undecodable:
+            self.append(u"Skipped (not UTF-8, left as they are):\n" + u"\n".join(sorted(undecodable)) + u"\n\n")
+        if self.plans:
+            sublime.set_timeout(lambda: self.confirm(changes), 0)
+
+    def show_plan(self, plan):
+        lines = [os.path.relpath(plan.path, self.root) + u":"]
+        for number, old, new in plan.lines:
+            lines.append(u"- {0}: {1}".format(number, old))
+            lines.append(u"+ {0}: {1}".format(number, new))
+        self.append(u"\n".join(lines) + u"\n\n")
+
+    def append(self, text):
+        view = self.view
+        sublime.set_timeout(lambda: view.run_command("append", {"characters": text}), 0)
+
+    def confirm(self, changes):
+        if sublime.ok_cancel_dialog(u"Apply {0} replacement(s) in {1} note(s)?".format(changes, len(self.plans)), "Replace"):
+            # leave notes with unsaved changes alone
+            dirty = set(v.file_name() for w in sublime.windows() for v in w.views() if v.is_dirty())
+            plans = [plan for plan in self.plans if plan.path not in dirty]
+            unsaved = [plan.path for plan in self.plans if plan.path in dirty]
+            sublime.set_timeout_async(lambda: self.apply(plans, unsaved), 0)
+
+    def apply(self, plans, unsaved):
+        written, skipped = replace.apply(plans)
+        skipped.extend(unsaved)
+        catalog = get_catalog(self.root)
+        for path in written:
+            catalog.touch(path)
+        catalog.save()
+        self.append(u"Replaced in {0} note(s).\n".format(len(written)))
+        if skipped:
+            self.append(u"Skipped (modified since the preview or unsaved):\n" + u"\n".join(skipped) + u"\n")
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+import sublime, sublime_plugin
+import os
+
+from .notes import get_catalog, fresh_catalog
+from .notes_config import settings, get_root, brain_dir, on_config_change
+from .lib.search import SearchIndex, snippet
+
+
+def get_search_index(root):
+    index = indexes.get(root)
+    if index is None:
+        index = SearchIndex(root, os.path.join(root, brain_dir(), 'search_index.z'))
+        index.load()
+        indexes[root] = index
+    return index
+
+
+def synced_index(root):
+    # active and archived notes alike, with the catalog's root and excludes
+    index = get_search_index(root)
+    index.sync(fresh_catalog(root).iter_notes())
+    index.save()
+    return index
+
+
+class NotesSearchCommand(sublime_plugin.WindowCommand):
+
+    def run(self):
+        self.root = get_root()
+        # bring the index up to date while the query is being typed
+        sublime.set_timeout_async(lambda: synced_index(self.root), 0)
+        self.window.show_input_panel("Search notes:", "", self.on_done, None, None)
+
+    def on_done(self, query):
+        sublime.set_timeout_async(lambda: self.search(query), 0)
+
+    def search(self, query):
+        index = synced_index(self.root)
+        hits = index.search(query, settings().get("search_max_results", 50))
+        self.results = []
+        items = []
+        for relpath, score in hits:
+            path = os.path.join(self.root, relpath)
+            line, text = snippet(path, query)
+            self.results.append((path, line))
+            items.append([relpath, u'{0}: {1}'.format(line, text)])
+        if not items:
+            sublime.status_message(u"    No notes match '{0}'.".format(query))
+            return
+        sublime.set_timeout(lambda: self.window.show_quick_panel(items, self.open_hit), 0)
+
+    def open_hit(self, index):
+        if index == -1:
+            return
+        path, line = self.results[index]
+        sublime.run_command("notes_open", {"file_path": path, "line": line})
+
+
+class NotesSearchEvents(sublime_plugin.EventListener):
+
+    def on_post_save_async(self, view):
+        if not view.settings().get("is_note"):
+            return
+        root = get_root()
+        index = indexes.get(root)
+        if index is None:
+            return
+        # persisted on the next search
+        relpath = os.path.relpath(view.file_name(), root)
+        stat = get_catalog(root).stat(relpath)
+        if stat is not None:
+            index.update(relpath, stat[0])
+
+
+def forget_search_indexes():
+    for index in indexes.values():
+        index.save()
+    indexes.clear()
+
+
+def plugin_loaded():
+    global indexes
+    indexes = {}
+    on_config_change("notes_search", forget_search_indexes)
+
+
+def plugin_unloaded():
+    for index in indexes.values():
+        index.save()
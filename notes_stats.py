@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+import sublime, sublime_plugin
+import os
+
+from .notes import fresh_catalog
+from .notes_config import get_root, brain_dir, on_config_change
+from .lib.stats import NoteStats
+
+# double-clicking one of the largest notes opens it
+RESULT_FILE_REGEX = r'^\s+[\d,]+ words  (.+)$'
+BAR_WIDTH = 40
+
+
+def get_stats(root):
+    stats = stats_caches.get(root)
+    if stats is None:
+        stats = NoteStats(root, os.path.join(root, brain_dir(), 'stats.json'))
+        stats.load()
+        stats_caches[root] = stats
+    return stats
+
+
+def format_report(root, report):
+    notes, words, open_tasks, done, cancelled, images = report["total"]
+    lines = [u"Notes statistics: {0}".format(root), u"",
+             u"{0:,} notes, {1:,} words, {2:,} images".format(notes, words, images),
+             u"Tasks: {0:,} open, {1:,} done, {2:,} cancelled".format(open_tasks, done, cancelled),
+             u"", u"Folders", u"{0:>8} {1:>10} {2:>6} {3:>6} {4:>6} {5:>7}  {6}".format(
+                 "notes", "words", "☐", "✔", "✘", "images", "folder")]
+    for folder, row in sorted(report["folders"].items()):
+        lines.append(u"{0:>8,} {1:>10,} {2:>6,} {3:>6,} {4:>6,} {5:>7,}  {6}".format(
+            *(row + [folder or u"."])))
+
+    lines += [u"", u"Growth (notes by month of last change, running total)"]
+    modified = report["modified"]
+    most = max([n for _, n in modified] or [1])
+    running = 0
+    for month, n in modified:
+        running += n
+        lines.append(u"  {0} {1:>6,} {2:>8,}  {3}".format(month, n, running, u"█" * max(1, n * BAR_WIDTH // most)))
+
+    lines += [u"", u"Largest notes"]
+    for words, relpath in report["largest"]:
+        lines.append(u"  {0:>10,} words  {1}".format(words, relpath))
+    return u"\n".join(lines) + u"\n"
+
+
+class NotesStatisticsCommand(sublime_plugin.WindowCommand):
+
+    def run(self):
+        root = get_root(self.window)
+        view = self.window.new_file()
+        view.set_scratch(True)
+        view.set_name(u"∑ Notes statistics")
+        view.settings().set("result_file_regex", RESULT_FILE_REGEX)
+        view.settings().set("result_base_dir", root)
+        view.settings().set("word_wrap", False)
+        view.run_command("append", {"characters": u"Counting…\n"})
+        sublime.set_timeout_async(lambda: self.count(view, root), 0)
+
+    def count(self, view, root):
+        catalog = fresh_catalog(root)
+        stats = get_stats(root).sync(catalog.iter_notes())
+        stats.save()
+        text = format_report(root, stats.report(lambda relpath: not catalog.is_archived(relpath)))
+        sublime.set_timeout(lambda: self.show(view, text), 0)
+
+    def show(self, view, text):
+        view.run_command("select_all")
+        view.run_command("right_delete")
+        view.run_command("append", {"characters": text})
+
+
+def forget_stats():
+    for stats in stats_caches.values():
+        stats.save()
+    stats_caches.clear()
+
+
+def plugin_loaded():
+    global stats_caches
+    stats_caches = {}
+    on_config_change("notes_stats", forget_stats)
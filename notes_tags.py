@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+import sublime, sublime_plugin
+
+from .notes import get_metadata, fresh_catalog, list_entries, setup_notes_list
+from .notes_config import config, get_root, on_config_change
+from .lib.tags import TagIndex
+
+
+def get_tag_index(root):
+    tag_index = tag_indexes.get(root)
+    if tag_index is None:
+        tag_index = tag_indexes[root] = TagIndex(config().archive_dir)
+    return tag_index
+
+
+def synced_tag_index(root):
+    metadata = get_metadata(root)
+    tag_index = get_tag_index(root).sync(fresh_catalog(root).iter_notes(), metadata)
+    metadata.save()
+    return tag_index
+
+
+class NotesListByTagCommand(sublime_plugin.WindowCommand):
+
+    def run(self):
+        self.root = get_root()
+        sublime.set_timeout_async(self.list_tags, 0)
+
+    def list_tags(self):
+        self.tag_index = synced_tag_index(self.root)
+        # the notes of a tag are listed from the active notes only
+        catalog = fresh_catalog(self.root)
+        self.tags = self.tag_index.counts(lambda relpath: not catalog.is_archived(relpath))
+        if not self.tags:
+            sublime.status_message("    No tagged notes.")
+            return
+        items = [[tag, "{0} note{1}".format(count, "" if count == 1 else "s")] for tag, count in self.tags]
+        sublime.set_timeout(lambda: self.window.show_quick_panel(items, self.list_notes), 0)
+
+    def list_notes(self, index):
+        if index == -1:
+            return
+        # listing may refresh the catalog
+        sublime.set_timeout_async(lambda: self.show_notes(self.tags[index][0]), 0)
+
+    def show_notes(self, tag):
+        tagged = self.tag_index.notes_with(tag)
+        file_list = list_entries(self.root)
+        self.file_list = file_list.select(lambda i: file_list.relpath(i) in tagged)
+        if not len(self.file_list):
+            sublime.status_message("    Only archived notes have this tag.")
+            return
+        rlist = setup_notes_list(self.file_list)
+        sublime.set_timeout(lambda: self.window.show_quick_panel(rlist, self.open_note), 0)
+
+    def open_note(self, index):
+        if index == -1:
+            return
+        sublime.run_command("notes_open", {"file_path": self.file_list.path(index)})
+
+
+def forget_tag_indexes():
+    # built with the old archive directory
+    tag_indexes.clear()
+
+
+def plugin_loaded():
+    global tag_indexes
+    tag_indexes = {}
+    on_config_change("notes_tags", forget_tag_indexes)